@@ -1,9 +1,15 @@
+import inspect
 import streamlit as st
-import os
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import google.generativeai as genai
+from data_layer import load_star, combo_count
+from version_layer import data_version
+from query_layer import (load_filter_index, load_search_index, load_prefix_index, PrefixIndex, load_cube, cube_totals,
+                         summarize, rank, top_rows, top_lists, derive, memo, view_cells, view_agg,
+                         search_regex)
+from sql_layer import load_db
 
 # ══════════════════════════════════════════════
 #  페이지 설정
@@ -202,186 +208,87 @@ p { font-size:15px !important; }
 # ══════════════════════════════════════════════
 #  데이터 로드
 # ══════════════════════════════════════════════
-def _csv_mtime():
-    """파일 수정시각 기반 캐시 키 — csv 변경 시 자동 갱신"""
-    _candidates = [
-        os.path.dirname(os.path.abspath(__file__)),
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs"),
-        "/mnt/user-data/outputs",
-    ]
-    def _find(fname):
-        for d in _candidates:
-            p = os.path.join(d, fname)
-            if os.path.exists(p):
-                return p
-        return None
-    t = 0
-    for fname in ["forecast_data.csv", "actual_data.csv"]:
-        p = _find(fname)
-        if p:
-            t += int(os.path.getmtime(p))
-    return t
-
-@st.cache_data(show_spinner=False)
-def load_data(_mtime=0):
-    try:
-        _dir = os.path.dirname(os.path.abspath(__file__))
-        _candidates = [
-            _dir,
-            os.path.join(_dir, "outputs"),
-            "/mnt/user-data/outputs",
-        ]
-        def _find(fname):
-            for d in _candidates:
-                p = os.path.join(d, fname)
-                if os.path.exists(p):
-                    return p
-            raise FileNotFoundError(fname)
-        f = pd.read_csv(_find("forecast_data.csv"), dtype={"combo": str})
-        a = pd.read_csv(_find("actual_data.csv"),   dtype={"combo": str})
-    except Exception:
-        np.random.seed(7)
-        dates  = ["2025-06","2025-07","2025-08","2025-10",
-                  "2025-11","2025-12","2026-01","2026-02"]
-        brands = ["데스커","일룸","퍼시스","시디즈"]
-        series_list = ["ACCESSORY","IBLE","SPOON","SODA",
-                       "T60","RINGO","T20","GX","AROUND","PLT"]
-        supply_pool = ['시디즈(평택)', '베트남', '외주/상품']
-        rows, a_rows = [], []
-        for ym in dates:
-            for b in brands:
-                for s in series_list:
-                    sup = np.random.choice(supply_pool + [np.nan], p=[0.28,0.28,0.28,0.16])
-                    rows.append({'ym':ym,'brand':b,'series':s,
-                                 'combo':f"{s[:6]}-{b[:2]}",'name':f"{b} {s}",
-                                 'forecast':int(np.random.randint(200,4000)),'supply':sup})
-                    a_rows.append({'ym':ym,'combo':f"{s[:6]}-{b[:2]}",
-                                   'actual':max(0,int(np.random.normal(1800,900)))})
-        f = pd.DataFrame(rows)
-        a = pd.DataFrame(a_rows)
-
-    for col in ['ym','series','brand','combo','supply','name']:
-        if col not in f.columns: f[col] = np.nan
-    for col in ['ym','combo','actual']:
-        if col not in a.columns: a[col] = np.nan
-
-    for df in [f, a]:
-        for col in df.select_dtypes(include=['object','string']).columns:
-            df[col] = df[col].astype(str).str.strip()
-        if 'brand' in df.columns:
-            df['brand'] = df['brand'].replace({'알로소': '시디즈'})
-        if 'supply' in df.columns:
-            SUPPLY_NORM = {
-                '시디즈':      '시디즈(평택)', '의자내작':    '시디즈(평택)',
-                '시디즈제품':  '시디즈(평택)', '시디즈평택':  '시디즈(평택)',
-                '의자평택상품':'시디즈(평택)', '의자양지상품':'시디즈(평택)',
-                '제품':        '시디즈(평택)', '평택의자':    '시디즈(평택)',
-                'VN의자':      '베트남',       '베트남의자':  '베트남',
-                '시디즈VN':    '베트남',       '시디즈vn':    '베트남',
-                'FVN2':        '베트남',       '베트남상품':  '베트남',
-                '베트남제품':  '베트남',
-                '의자외작':    '외주/상품',    '수입상품':    '베트남',
-                '외주상품':    '외주/상품',    '상품':        '외주/상품',
-                '진영':        '외주/상품',    '웰시트':      '외주/상품',
-                '이화하이':    '외주/상품',    '웰켐':        '외주/상품',
-                '한국스틸웨어':'외주/상품',    '다진':        '외주/상품',
-                '에브라임':    '외주/상품',    '의자안성상품':'외주/상품',
-                '의자상품':    '외주/상품',
-                '': '<NA>', 'nan': '<NA>', 'NaN': '<NA>', 'None': '<NA>',
-            }
-            df['supply'] = df['supply'].astype(str).str.strip().replace(SUPPLY_NORM)
-            _valid = {'시디즈(평택)', '베트남', '외주/상품', '<NA>'}
-            df['supply'] = df['supply'].apply(lambda v: v if v in _valid else '<NA>')
-
-    # ── combo 기반 supply 보정 (원본 실적 파일 기준 매핑) ──
-    # actual의 combo→supply 매핑을 forecast에도 적용
-    if 'actual' not in f.columns and 'combo' in a.columns and 'supply' in a.columns:
-        combo_sup_ref = a.drop_duplicates('combo').set_index('combo')['supply'].to_dict()
-        f['supply'] = f.apply(
-            lambda r: combo_sup_ref.get(r['combo'], r['supply']), axis=1
-        )
-
-    f = f.dropna(subset=['series','brand','combo'])
-    f = f[~f['series'].astype(str).str.strip().isin(['nan','NaN','None',''])]
-    f = f[~f['series'].astype(str).str.isnumeric()]
-    f = f[f['series'].astype(str).str.len() >= 2]
-    brand_values = set(f['brand'].dropna().astype(str).str.strip().unique())
-    f = f[~f['series'].astype(str).isin(brand_values)]
-    return f, a
-
-f_df, a_df = load_data(_mtime=_csv_mtime())
-# forecast에만 있는 경우: actual=0, actual에만 있는 경우: forecast=0
-_a_cols = ["ym","combo","brand","series","name","supply","actual"]
-_a_for_merge = a_df[[c for c in _a_cols if c in a_df.columns]].copy()
-_a_for_merge = _a_for_merge.rename(columns={"brand":"brand_a","series":"series_a","name":"name_a","supply":"supply_a"})
-
-mg_all = pd.merge(f_df, _a_for_merge[["ym","combo","actual"]], on=["ym","combo"], how="outer")
-
-# outer join으로 생긴 누락 컬럼 채우기 (actual에만 있는 행)
-for _col in ["brand","series","name","supply","forecast"]:
-    if _col not in mg_all.columns:
-        mg_all[_col] = pd.NA
-# actual에만 있는 행의 brand/series/name/supply를 actual_data에서 채움
-_a_meta = a_df[["ym","combo","brand","series","name","supply"]].drop_duplicates(["ym","combo"])
-mg_all = mg_all.merge(_a_meta, on=["ym","combo"], how="left", suffixes=("","_from_a"))
-for _col in ["brand","series","name","supply"]:
-    _col_a = _col + "_from_a"
-    if _col_a in mg_all.columns:
-        mg_all[_col] = mg_all[_col].fillna(mg_all[_col_a])
-        mg_all.drop(columns=[_col_a], inplace=True)
-mg_all["actual"]   = pd.to_numeric(mg_all["actual"],  errors='coerce').fillna(0).astype(int)
-mg_all["forecast"] = pd.to_numeric(mg_all["forecast"],errors='coerce').fillna(0).astype(int)
-mg_all["차이"]      = mg_all["actual"] - mg_all["forecast"]
-mg_all["오차량"]    = mg_all["차이"].abs()
-mg_all["달성률(%)"] = np.where(mg_all["forecast"]>0,(mg_all["actual"]/mg_all["forecast"]*100).round(1),0)
-try:    mg_all["ym_dt"] = pd.to_datetime(mg_all["ym"]+"-01")
-except: mg_all["ym_dt"] = mg_all["ym"]
+# 사이드바 옵션·KPI·추이는 월별 사전 집계(큐브)만 사용 — 팩트는 조회 월 선택 후 로드
+data_ver = data_version()     # 원본 감시 스레드가 발행한 내용 해시 토큰
+olap     = load_cube(data_ver)
+db       = load_db(data_ver)     # 내장 DB (DASHBOARD_DB 설정 시) — 없으면 None
 
 
 # ══════════════════════════════════════════════
 #  유틸
 # ══════════════════════════════════════════════
-def apply_filters(df, ym=None, ym_range=None, brands=None, supply=None):
+def apply_filters(df, ym=None, ym_range=None, brands=None, supply=None, series=None, search=None):
     """
     ym       : 단일 월 문자열 (단일 조회 모드)
     ym_range : (시작월, 종료월) 튜플 (누적 범위 모드)
+    series   : 시리즈 1개 (드릴다운)
+    search   : 콤보/시리즈/품목명 대소문자 무시 검색 (정규식 — 특수문자가 없거나 잘못된 식이면 문자 그대로)
+    star 는 사전 구축된 인덱스로 행 위치를 찾고 해당 행에만 속성을 붙임 (전체 스캔 없음)
+    검색은 n-gram 색인으로 일치 콤보를 찾아 행 위치를 먼저 줄임 (부분 일치가 없으면 초성 · 자모 유사 검색)
+    내장 DB 는 조건 전체를 SQL WHERE 로 보내 결과 행만 받음
     """
-    d = df.copy()
-    if ym_range:
-        start, end = ym_range
-        d = d[(d["ym"] >= start) & (d["ym"] <= end)]
-    elif ym:
-        d = d[d["ym"] == ym]
-    if brands: d = d[d["brand"].isin(brands)]
-    if supply and supply != "전체": d = d[d["supply"] == supply]
+    if db is not None and df is db:
+        return db.rows(ym=ym, ym_range=ym_range, brands=brands, supply=supply,
+                       series=series, search=search)
+    if df is star:
+        pos = mg_index.positions(ym=ym, ym_range=ym_range, brands=brands, supply=supply)
+        if search:
+            pos, search = search_idx.positions(star, pos, search), None
+        d = star.rows(pos)
+    else:
+        d = df.copy()
+        if ym_range:
+            start, end = ym_range
+            d = d[(d["ym"] >= start) & (d["ym"] <= end)]
+        elif ym:
+            d = d[d["ym"] == ym]
+        if brands: d = d[d["brand"].isin(brands)]
+        if supply and supply != "전체": d = d[d["supply"] == supply]
+    if series is not None: d = d[d["series"] == series]
+    if search:   # search_regex 와 같은 의미 — 정규식이 아니면 문자 그대로
+        rx = search_regex(search)
+        kw = dict(pat=rx, na=False) if rx is not None else dict(pat=search, case=False, regex=False, na=False)
+        d = d[d["combo"].str.contains(**kw)|d["series"].str.contains(**kw)|d["name"].str.contains(**kw)]
     return d
 
+def combo_prefixes(flt):
+    """
+    (콤보 접두어 색인, 필터 결과의 코드 순 누적합) — 필터별 1회 (memo)
+    star 는 로드 시 만든 색인에 필터 행 위치의 합계만 얹고, 내장 DB 는 콤보별 GROUP BY 결과로 색인 구성
+    """
+    def _build():
+        if star is db:
+            r = db.rollup("combo", **flt)
+            idx = PrefixIndex(r["combo"])
+            return idx, idx.totals(np.arange(len(r)), r["forecast"], r["actual"], r["n"])
+        pos = mg_index.positions(**flt)
+        f = star.fact
+        return prefix_idx, prefix_idx.totals(f["combo_id"].to_numpy()[pos], f["forecast"].to_numpy()[pos],
+                                             f["actual"].to_numpy()[pos])
+    return memo("prefix", data_ver, flt, _build)
+
 def fmt_int(v): return f"{int(v):,}"
 def fmt_pct(v): return f"{v:.1f}%"
 
 # ══════════════════════════════════════════════
 #  규칙 기반 챗봇 엔진 (API 키 없을 때 fallback)
 # ══════════════════════════════════════════════
-def rule_based_reply(question: str, df: pd.DataFrame, sel_ym, sel_brands, sel_supply) -> str:
-    """키워드 매칭 → 데이터 집계 기반 자동 답변"""
-    if df.empty:
+def rule_based_reply(question: str, cells: pd.DataFrame, sel_ym, sel_brands, sel_supply) -> str:
+    """키워드 매칭 → 데이터 집계 기반 자동 답변 (cells: 큐브 셀, olap.select 결과)"""
+    if cells.empty:
         return "현재 선택된 데이터가 없습니다. 사이드바 필터를 확인해주세요."
 
     q = question.lower()
 
     # ── 공통 집계 ──
-    t_f  = int(df["forecast"].sum())
-    t_a  = int(df["actual"].sum())
+    t_f, t_a = cube_totals(cells)
     t_r  = round(t_a / t_f * 100, 1) if t_f > 0 else 0.0
     t_d  = t_a - t_f
     month = sel_ym.replace("-", "년 ") + "월"
 
-    brand_agg = df.groupby("brand").agg(f=("forecast","sum"), a=("actual","sum")).reset_index()
-    brand_agg["r"] = np.where(brand_agg["f"]>0, (brand_agg["a"]/brand_agg["f"]*100).round(1), 0)
-
-    sr_agg = df.groupby("series").agg(f=("forecast","sum"), a=("actual","sum")).reset_index()
-    sr_agg["r"]   = np.where(sr_agg["f"]>0, (sr_agg["a"]/sr_agg["f"]*100).round(1), 0)
-    sr_agg["err"] = (sr_agg["a"] - sr_agg["f"]).abs()
+    short = {"forecast":"f","actual":"a","달성률(%)":"r","오차량":"err"}
+    brand_agg = summarize(cells, "brand").rename(columns=short)
+    sr_agg    = summarize(cells, "series").rename(columns=short)
 
     # ── 달성률 / 전체 현황 ──
     if any(k in q for k in ["달성률","달성","현황","전체","요약","분석","overview"]):
@@ -478,23 +385,22 @@ def rule_based_reply(question: str, df: pd.DataFrame, sel_ym, sel_brands, sel_su
     )
 
 
-def build_context(df, period_label, sel_brands, sel_supply):
-    if df.empty: return "현재 선택된 데이터가 없습니다."
-    t_f = int(df["forecast"].sum()); t_a = int(df["actual"].sum())
+def build_context(cells, period_label, sel_brands, sel_supply):
+    """cells: 큐브 셀 (olap.select 결과)"""
+    if cells.empty: return "현재 선택된 데이터가 없습니다."
+    t_f, t_a = cube_totals(cells)
     t_r = round(t_a/t_f*100,1) if t_f>0 else 0.0; t_d = t_a-t_f
-    brand_agg = df.groupby("brand").agg(f=("forecast","sum"),a=("actual","sum")).reset_index()
-    brand_agg["r"] = np.where(brand_agg["f"]>0,(brand_agg["a"]/brand_agg["f"]*100).round(1),0)
+    short = {"forecast":"f","actual":"a","달성률(%)":"r","오차량":"err"}
+    brand_agg = summarize(cells,"brand").rename(columns=short)
     brand_lines = "\n".join([f"  - {r['brand']}: 예측 {r['f']:,} / 실수주 {r['a']:,} / 달성률 {r['r']:.1f}%" for _,r in brand_agg.iterrows()])
-    sr_agg = df.groupby("series").agg(f=("forecast","sum"),a=("actual","sum")).reset_index()
-    sr_agg["r"] = np.where(sr_agg["f"]>0,(sr_agg["a"]/sr_agg["f"]*100).round(1),0)
-    sr_agg["err"] = (sr_agg["a"]-sr_agg["f"]).abs()
+    sr_agg = summarize(cells,"series").rename(columns=short)
     top5 = sr_agg.nlargest(5,"err")
     err_lines = "\n".join([f"  - {r['series']}: 달성률 {r['r']:.1f}% / 오차 {r['err']:,}" for _,r in top5.iterrows()])
     under = sr_agg[sr_agg["r"]<90]["series"].tolist()
     over  = sr_agg[sr_agg["r"]>110]["series"].tolist()
     return f"""=== 수요예측 대시보드 현재 데이터 ===
 조회 기간: {period_label} | 브랜드: {', '.join(sel_brands)} | 공급단: {sel_supply}
-총 품목: {len(df):,}건
+총 품목: {int(cells["n"].sum()):,}건
 
 [전체] 예측 {t_f:,} / 실수주 {t_a:,} / 달성률 {t_r:.1f}% / 오차 {t_d:+,}
 
@@ -580,8 +486,7 @@ with st.sidebar:
     st.markdown("<div style='height:2px'></div>", unsafe_allow_html=True)
 
     # actual 실적이 하나라도 있는 월만 선택 가능 (forecast만 있는 미래/과거월 제외)
-    _yms_with_actual = set(mg_all[mg_all["actual"] > 0]["ym"].unique())
-    ym_options      = sorted(_yms_with_actual)
+    ym_options      = olap.options["months"]
     ym_options_desc = list(reversed(ym_options))
 
     sel_ym       = None
@@ -614,18 +519,19 @@ with st.sidebar:
 
 
     st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
-    all_brands = sorted(mg_all["brand"].unique())
+    all_brands = olap.options["brands"]
     sel_brand_single = st.selectbox("🏷️ 브랜드", ["전체"] + all_brands)
     sel_brands = all_brands if sel_brand_single == "전체" else [sel_brand_single]
     st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
-    _known_supply = ['시디즈(평택)', '베트남', '외주/상품']
-    supply_vals = [v for v in _known_supply if v in mg_all["supply"].values]
+    supply_vals = olap.options["supply"]   # 표준 공급단 중 데이터에 있는 것
     sel_supply = st.selectbox("🏭 공급단", ["전체"] + supply_vals)
+    flt = dict(ym=sel_ym if not sel_ym_range else None, ym_range=sel_ym_range,
+               brands=sel_brands, supply=sel_supply)
 
     st.markdown("---")
     st.markdown(f"""<div style="font-size:13px;color:#94A3B8;line-height:2.2;">
-        📆 전체 기간: <b style="color:#CBD5E1">{mg_all['ym'].min()} ~ {mg_all['ym'].max()}</b><br>
-        🔢 총 콤보 수: <b style="color:#CBD5E1">{mg_all['combo'].nunique():,}개</b>
+        📆 전체 기간: <b style="color:#CBD5E1">{olap.months[0]} ~ {olap.months[-1]}</b><br>
+        🔢 총 콤보 수: <b style="color:#CBD5E1">{combo_count(data_ver):,}개</b>
     </div>""", unsafe_allow_html=True)
 
     # ════════════════════════════════════════
@@ -657,9 +563,8 @@ with st.sidebar:
         st.session_state.sb_quick = ""
 
     # 현재 필터 데이터
-    df_chat = apply_filters(mg_all, ym=sel_ym if not sel_ym_range else None, ym_range=sel_ym_range, brands=sel_brands, supply=sel_supply)
-    t_f_sb  = int(df_chat["forecast"].sum()) if not df_chat.empty else 0
-    t_a_sb  = int(df_chat["actual"].sum())   if not df_chat.empty else 0
+    cells_chat = view_cells(olap, data_ver, flt)
+    t_f_sb, t_a_sb = cube_totals(cells_chat)
     t_r_sb  = round(t_a_sb/t_f_sb*100,1)    if t_f_sb>0 else 0.0
     rate_color_sb = "#34D399" if t_r_sb>=100 else "#F87171"
 
@@ -736,7 +641,7 @@ with st.sidebar:
             st.warning("⚠️ Gemini API 키를 먼저 입력하세요.")
         else:
             st.session_state.sb_messages.append({"role": "user", "content": prompt_sb})
-            context_text = build_context(df_chat, period_label, sel_brands, sel_supply)
+            context_text = build_context(cells_chat, period_label, sel_brands, sel_supply)
             system_instruction = f"""당신은 수요예측 대시보드 전문 분석 어시스턴트입니다.
 아래 데이터를 기반으로 간결하고 실용적인 인사이트를 한국어로 제공하세요.
 사이드바에 표시되므로 답변은 반드시 300자 이내로 핵심만 작성하세요.
@@ -804,6 +709,22 @@ with st.sidebar:
             st.rerun()
 
 
+# ══════════════════════════════════════════════
+#  조회 월 팩트 로드
+# ══════════════════════════════════════════════
+# 버전별 전 기간 팩트 1개 (공유 파일 메모리 맵) — 월·기간 조회는 필터 인덱스가 연속 행 구간으로 선택
+# 팩트 · 필터 / 검색 / 접두어 색인을 월 범위마다 새로 만들지 않음
+# 내장 DB 사용 시 팩트는 DB 에 두고 조회 결과 행만 가져옴
+# 필터 결과·집계는 memo() 로 (데이터 버전, 정규화된 필터) 키 LRU 에 보관 — 세션 간 공유, 수정 금지
+if db is not None:
+    star = db
+else:
+    star     = load_star(data_ver)
+    mg_index = load_filter_index(data_ver)
+    search_idx = load_search_index(data_ver)
+    prefix_idx = load_prefix_index(data_ver)
+
+
 # ══════════════════════════════════════════════
 #  드래그앤드롭 탭
 # ══════════════════════════════════════════════
@@ -848,598 +769,657 @@ components.html("""
 </script></body></html>
 """, height=0, scrolling=False)
 
-tab1, tab2, tab3, tab4, tab_help = st.tabs([
-    "  📊 개요  ","  📈 월별 추이  ","  🔎 시리즈 분석  ","  📋 상세 데이터  ","  ❓ 사용법  "
-])
+# 선택된 탭만 실행 — 탭을 바꾸면 재실행되어 그 탭만 계산·렌더 (다른 탭의 슬라이더·표·CSV 는 건너뜀)
+# 각 탭의 집계는 memo / view_agg 결과 메모에 남아 있어 되돌아오면 메모 조회만
+TAB_LABELS = ["  📊 개요  ","  📈 월별 추이  ","  🔎 시리즈 분석  ","  📋 상세 데이터  ","  ❓ 사용법  "]
+try:
+    tab1, tab2, tab3, tab4, tab_help = st.tabs(TAB_LABELS, key="main_tab", on_change="rerun")
+except TypeError:   # 지연 실행 미지원 Streamlit — 모든 탭 실행
+    tab1, tab2, tab3, tab4, tab_help = st.tabs(TAB_LABELS)
+# 그려지지 않은 탭의 위젯 값은 세션 상태에서 지워짐 — 탭 안 위젯은 고정 key + persist_state 로 탭을 오가도 값 유지
+TAB_STATE = dict(persist_state="session") if "persist_state" in inspect.signature(st.selectbox).parameters else {}
+
+def tab_open(tab):
+    """이번 재실행에서 그릴 탭인지 — 선택 상태를 모르면 (구버전) 항상 True"""
+    return getattr(tab, "open", None) is not False
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  탭1: 개요
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 with tab1:
-    df_ov = apply_filters(mg_all, ym=sel_ym if not sel_ym_range else None, ym_range=sel_ym_range, brands=sel_brands, supply=sel_supply)
-    if df_ov.empty:
-        st.warning("선택한 조건에 해당하는 데이터가 없습니다."); st.stop()
-
-    month_label = period_label  # 단일 월 또는 기간 범위 레이블
-
-    # ── 부품류 키워드 ──
-    _PARTS_KW = ['ACCESSORY','악세사리','이지리페어','EASY REPAIR','EASY-REPAIR',
-                 '부품','PARTS','PART','리페어','REPAIR','패브릭','FABRIC','가스','실린더']
-    def _is_parts(s):
-        s_up = str(s).upper()
-        return any(kw.upper() in s_up for kw in _PARTS_KW)
-
-    _parts_mask = df_ov["series"].apply(_is_parts)
-    df_ov_product = df_ov[~_parts_mask]   # 제품만
-    df_ov_parts   = df_ov[_parts_mask]    # 부품류만
-
-    # ── KPI 분류 드롭다운 ──
-    kpi_cat = st.selectbox(
-        "📦 예측 수요 분류",
-        ["전체", "제품 (부품류 제외)", "부품류"],
-        key="kpi_cat",
-        label_visibility="collapsed",
-    )
-    if kpi_cat == "제품 (부품류 제외)":
-        df_kpi = df_ov_product
-        kpi_label = "제품만"
-    elif kpi_cat == "부품류":
-        df_kpi = df_ov_parts
-        kpi_label = "부품류만"
-    else:
-        df_kpi = df_ov
-        kpi_label = "전체"
-
-    t_f=int(df_kpi["forecast"].sum()); t_a=int(df_kpi["actual"].sum())
-    t_d=t_a-t_f; t_r=round(t_a/t_f*100,1) if t_f>0 else 0.0
-
-    c1,c2,c3,c4=st.columns(4)
-    for col,color,label,value,sub in [
-        (c1,"#3B82F6","예측 수요",fmt_int(t_f),f"{month_label} · {kpi_label}"),
-        (c2,"#10B981","실 수주",fmt_int(t_a),f"{month_label} 실수주 합계"),
-        (c3,"#F59E0B" if t_d>=0 else "#EF4444","예측 오차",("▲ +" if t_d>=0 else "▼ ")+fmt_int(abs(t_d)),"실수주 − 예측"),
-        (c4,"#8B5CF6","달성률",fmt_pct(t_r),"실수주 ÷ 예측 × 100"),
-    ]:
-        with col:
-            st.markdown(f"""<div class="kpi-wrap" style="border-left-color:{color}">
-                <div class="kpi-label">{label}</div>
-                <div class="kpi-value" style="color:{color}">{value}</div>
-                <div class="kpi-sub">{sub}</div></div>""", unsafe_allow_html=True)
-
-    st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
-    brand_agg=df_ov.groupby("brand").agg(forecast=("forecast","sum"),actual=("actual","sum")).reset_index()
-    brand_agg["달성률"]=np.where(brand_agg["forecast"]>0,(brand_agg["actual"]/brand_agg["forecast"]*100).round(1),0)
-
-    col_l,col_r=st.columns([3,2])
-    with col_l:
-        st.markdown('<div class="section-card"><div class="section-title">브랜드별 예측 vs 실수주</div>', unsafe_allow_html=True)
-        fig_bar=go.Figure()
-        fig_bar.add_trace(go.Bar(name="예측 수요",x=brand_agg["brand"],y=brand_agg["forecast"],marker_color="#93C5FD",text=brand_agg["forecast"].apply(fmt_int),textposition="outside"))
-        fig_bar.add_trace(go.Bar(name="실 수주",x=brand_agg["brand"],y=brand_agg["actual"],marker_color="#34D399",text=brand_agg["actual"].apply(fmt_int),textposition="outside"))
-        fig_bar.update_layout(barmode="group",template="plotly_white",height=320,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),legend=dict(orientation="h",yanchor="bottom",y=1.02),yaxis=dict(showgrid=True,gridcolor="#F3F4F6"))
-        st.plotly_chart(fig_bar,use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with col_r:
-        st.markdown('<div class="section-card"><div class="section-title">브랜드별 달성률</div>', unsafe_allow_html=True)
-        bar_colors=["#22C55E" if v>=95 else "#F59E0B" if v>=80 else "#EF4444" for v in brand_agg["달성률"]]
-        st.markdown('''<div style="display:flex;gap:16px;margin-bottom:8px;font-size:12px;font-weight:600;">
-            <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#22C55E;display:inline-block;"></span> 95% 이상 (목표 달성)</span>
-            <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#F59E0B;display:inline-block;"></span> 80~95% (주의)</span>
-            <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#EF4444;display:inline-block;"></span> 80% 미만 (미달)</span>
-        </div>''', unsafe_allow_html=True)
-        fig_rate=go.Figure(go.Bar(x=brand_agg["달성률"],y=brand_agg["brand"],orientation="h",marker_color=bar_colors,text=[f"{v:.1f}%" for v in brand_agg["달성률"]],textposition="outside"))
-        fig_rate.add_vline(x=100,line_dash="dot",line_color="#94A3B8",annotation_text="100%",annotation_font_size=13)
-        fig_rate.update_layout(template="plotly_white",height=320,margin=dict(l=0,r=50,t=10,b=0),font=dict(size=14),xaxis=dict(range=[0,max(135,brand_agg["달성률"].max()+20)]),yaxis=dict(tickfont=dict(size=15,color="#0F172A")))
-        st.plotly_chart(fig_rate,use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    col_pie,col_rep=st.columns([1,2])
-    with col_pie:
-        st.markdown('<div class="section-card"><div class="section-title">공급단별 예측 비중 (부품류 제외)</div>', unsafe_allow_html=True)
-        _PARTS_KEYWORDS = ['ACCESSORY','악세사리','이지리페어','EASY REPAIR','EASYREPAIR','부품','PARTS','PART','리페어','REPAIR','패브릭','FABRIC','가스','실린더']
-        _parts_mask = df_ov["series"].astype(str).str.upper().apply(
-            lambda s: any(kw.upper() in s for kw in _PARTS_KEYWORDS)
+    if tab_open(tab1):
+        cells_ov = view_cells(olap, data_ver, flt)
+        if cells_ov.empty:
+            st.warning("선택한 조건에 해당하는 데이터가 없습니다."); st.stop()
+
+        month_label = period_label  # 단일 월 또는 기간 범위 레이블
+
+        # ── 부품류 구분: 큐브의 is_parts 차원 ──
+        _parts_mask = cells_ov["is_parts"]
+        cells_ov_product = cells_ov[~_parts_mask]   # 제품만
+        cells_ov_parts   = cells_ov[_parts_mask]    # 부품류만
+
+        # ── KPI 분류 드롭다운 ──
+        kpi_cat = st.selectbox(
+            "📦 예측 수요 분류",
+            ["전체", "제품 (부품류 제외)", "부품류"],
+            key="kpi_cat", **TAB_STATE,
+            label_visibility="collapsed",
         )
-        sup_agg=(df_ov[~_parts_mask & (df_ov["supply"] != "<NA>")].groupby("supply")["forecast"].sum().reset_index())
-        if not sup_agg.empty:
-            fig_pie=go.Figure(go.Pie(labels=sup_agg["supply"],values=sup_agg["forecast"],hole=0.5,textinfo="label+percent",textfont=dict(size=14),marker=dict(colors=["#60A5FA","#34D399","#FBBF24","#A78BFA"])))
-            fig_pie.update_layout(height=290,margin=dict(l=0,r=0,t=10,b=0),showlegend=True,legend=dict(font=dict(size=13)))
-            st.plotly_chart(fig_pie,use_container_width=True)
+        if kpi_cat == "제품 (부품류 제외)":
+            cells_kpi = cells_ov_product
+            kpi_label = "제품만"
+        elif kpi_cat == "부품류":
+            cells_kpi = cells_ov_parts
+            kpi_label = "부품류만"
         else:
-            st.info("공급단 데이터 없음")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with col_rep:
-        st.markdown('<div class="section-card"><div class="section-title">자동 분석 요약</div>', unsafe_allow_html=True)
-        sr_agg2=df_ov.groupby("series").agg(f=("forecast","sum"),a=("actual","sum")).reset_index()
-        sr_agg2["달성률"]=np.where(sr_agg2["f"]>0,(sr_agg2["a"]/sr_agg2["f"]*100).round(1),0)
-        sr_agg2["오차량"]=(sr_agg2["a"]-sr_agg2["f"]).abs()
-        top_err=sr_agg2.sort_values("오차량",ascending=False).head(3)
-        under_s=sr_agg2[sr_agg2["달성률"]<90].sort_values("달성률").head(3)
-        over_s=sr_agg2[sr_agg2["달성률"]>110].sort_values("달성률",ascending=False).head(3)
-        color_r="#10B981" if t_r>=100 else "#EF4444"; trend_w="초과달성" if t_r>=100 else "미달"
-        html_r=f"""<div class="report-box"><b>{month_label}</b> 전체 달성률 <b style="color:{color_r};font-size:16px">{fmt_pct(t_r)}</b> — 예측 대비 <b style="color:{color_r}">{trend_w}</b> 상태입니다.<br><br>"""
-        if not top_err.empty:
-            html_r+="<b>📍 오차 상위 시리즈</b><br>"
-            for _,row in top_err.iterrows():
-                if row["달성률"]<90:    tag='<span class="report-tag-bad">과소예측</span>'
-                elif row["달성률"]>110: tag='<span class="report-tag-warn">과대예측</span>'
-                else:                  tag='<span class="report-tag-ok">양호</span>'
-                html_r+=f"&nbsp;&nbsp;{tag} <b>{row['series']}</b> 달성률 {row['달성률']:.1f}% (오차 {fmt_int(row['오차량'])}ea)<br>"
-        if not under_s.empty: html_r+=f"<br><b>⚠️ 과소예측 (&lt;90%)</b>: {', '.join(under_s['series'].tolist())}<br>"
-        if not over_s.empty:  html_r+=f"<b>🔺 과대예측 (&gt;110%)</b>: {', '.join(over_s['series'].tolist())}<br>"
-        html_r+="""<br><b>💡 권장 조치</b><br>&nbsp;&nbsp;① 오차 상위 품목 재고·채널 현황 즉시 점검<br>&nbsp;&nbsp;② 과소예측 품목은 반품·납기 원인 확인<br>&nbsp;&nbsp;③ 다음 예측 주기에 최근 3개월 추세 가중치 반영</div>"""
-        st.markdown(html_r, unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+            cells_kpi = cells_ov
+            kpi_label = "전체"
+
+        t_f,t_a=cube_totals(cells_kpi)
+        t_d=t_a-t_f; t_r=round(t_a/t_f*100,1) if t_f>0 else 0.0
+
+        c1,c2,c3,c4=st.columns(4)
+        for col,color,label,value,sub in [
+            (c1,"#3B82F6","예측 수요",fmt_int(t_f),f"{month_label} · {kpi_label}"),
+            (c2,"#10B981","실 수주",fmt_int(t_a),f"{month_label} 실수주 합계"),
+            (c3,"#F59E0B" if t_d>=0 else "#EF4444","예측 오차",("▲ +" if t_d>=0 else "▼ ")+fmt_int(abs(t_d)),"실수주 − 예측"),
+            (c4,"#8B5CF6","달성률",fmt_pct(t_r),"실수주 ÷ 예측 × 100"),
+        ]:
+            with col:
+                st.markdown(f"""<div class="kpi-wrap" style="border-left-color:{color}">
+                    <div class="kpi-label">{label}</div>
+                    <div class="kpi-value" style="color:{color}">{value}</div>
+                    <div class="kpi-sub">{sub}</div></div>""", unsafe_allow_html=True)
+
+        st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+        brand_agg=view_agg("brand_agg", olap, data_ver, flt)
+
+        col_l,col_r=st.columns([3,2])
+        with col_l:
+            st.markdown('<div class="section-card"><div class="section-title">브랜드별 예측 vs 실수주</div>', unsafe_allow_html=True)
+            fig_bar=go.Figure()
+            fig_bar.add_trace(go.Bar(name="예측 수요",x=brand_agg["brand"],y=brand_agg["forecast"],marker_color="#93C5FD",text=brand_agg["forecast"].apply(fmt_int),textposition="outside"))
+            fig_bar.add_trace(go.Bar(name="실 수주",x=brand_agg["brand"],y=brand_agg["actual"],marker_color="#34D399",text=brand_agg["actual"].apply(fmt_int),textposition="outside"))
+            fig_bar.update_layout(barmode="group",template="plotly_white",height=320,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),legend=dict(orientation="h",yanchor="bottom",y=1.02),yaxis=dict(showgrid=True,gridcolor="#F3F4F6"))
+            st.plotly_chart(fig_bar,use_container_width=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        with col_r:
+            st.markdown('<div class="section-card"><div class="section-title">브랜드별 달성률</div>', unsafe_allow_html=True)
+            bar_colors=["#22C55E" if v>=95 else "#F59E0B" if v>=80 else "#EF4444" for v in brand_agg["달성률"]]
+            st.markdown('''<div style="display:flex;gap:16px;margin-bottom:8px;font-size:12px;font-weight:600;">
+                <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#22C55E;display:inline-block;"></span> 95% 이상 (목표 달성)</span>
+                <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#F59E0B;display:inline-block;"></span> 80~95% (주의)</span>
+                <span style="display:flex;align-items:center;gap:5px;"><span style="width:12px;height:12px;border-radius:3px;background:#EF4444;display:inline-block;"></span> 80% 미만 (미달)</span>
+            </div>''', unsafe_allow_html=True)
+            fig_rate=go.Figure(go.Bar(x=brand_agg["달성률"],y=brand_agg["brand"],orientation="h",marker_color=bar_colors,text=[f"{v:.1f}%" for v in brand_agg["달성률"]],textposition="outside"))
+            fig_rate.add_vline(x=100,line_dash="dot",line_color="#94A3B8",annotation_text="100%",annotation_font_size=13)
+            fig_rate.update_layout(template="plotly_white",height=320,margin=dict(l=0,r=50,t=10,b=0),font=dict(size=14),xaxis=dict(range=[0,max(135,brand_agg["달성률"].max()+20)]),yaxis=dict(tickfont=dict(size=15,color="#0F172A")))
+            st.plotly_chart(fig_rate,use_container_width=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        col_pie,col_rep=st.columns([1,2])
+        with col_pie:
+            st.markdown('<div class="section-card"><div class="section-title">공급단별 예측 비중 (부품류 제외)</div>', unsafe_allow_html=True)
+            sup_agg=view_agg("sup_agg", olap, data_ver, flt)
+            if not sup_agg.empty:
+                fig_pie=go.Figure(go.Pie(labels=sup_agg["supply"],values=sup_agg["forecast"],hole=0.5,textinfo="label+percent",textfont=dict(size=14),marker=dict(colors=["#60A5FA","#34D399","#FBBF24","#A78BFA"])))
+                fig_pie.update_layout(height=290,margin=dict(l=0,r=0,t=10,b=0),showlegend=True,legend=dict(font=dict(size=13)))
+                st.plotly_chart(fig_pie,use_container_width=True)
+            else:
+                st.info("공급단 데이터 없음")
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        with col_rep:
+            st.markdown('<div class="section-card"><div class="section-title">자동 분석 요약</div>', unsafe_allow_html=True)
+            sr_agg2=view_agg("series_agg", olap, data_ver, flt)
+            top_err=rank(sr_agg2,"오차량",head=3)
+            under_s=rank(sr_agg2,"달성률",ascending=True,head=3,having=[("달성률","<",90)])
+            over_s=rank(sr_agg2,"달성률",head=3,having=[("달성률",">",110)])
+            color_r="#10B981" if t_r>=100 else "#EF4444"; trend_w="초과달성" if t_r>=100 else "미달"
+            html_r=f"""<div class="report-box"><b>{month_label}</b> 전체 달성률 <b style="color:{color_r};font-size:16px">{fmt_pct(t_r)}</b> — 예측 대비 <b style="color:{color_r}">{trend_w}</b> 상태입니다.<br><br>"""
+            if not top_err.empty:
+                html_r+="<b>📍 오차 상위 시리즈</b><br>"
+                for _,row in top_err.iterrows():
+                    if row["달성률"]<90:    tag='<span class="report-tag-bad">과소예측</span>'
+                    elif row["달성률"]>110: tag='<span class="report-tag-warn">과대예측</span>'
+                    else:                  tag='<span class="report-tag-ok">양호</span>'
+                    html_r+=f"&nbsp;&nbsp;{tag} <b>{row['series']}</b> 달성률 {row['달성률']:.1f}% (오차 {fmt_int(row['오차량'])}ea)<br>"
+            if not under_s.empty: html_r+=f"<br><b>⚠️ 과소예측 (&lt;90%)</b>: {', '.join(under_s['series'].tolist())}<br>"
+            if not over_s.empty:  html_r+=f"<b>🔺 과대예측 (&gt;110%)</b>: {', '.join(over_s['series'].tolist())}<br>"
+            html_r+="""<br><b>💡 권장 조치</b><br>&nbsp;&nbsp;① 오차 상위 품목 재고·채널 현황 즉시 점검<br>&nbsp;&nbsp;② 과소예측 품목은 반품·납기 원인 확인<br>&nbsp;&nbsp;③ 다음 예측 주기에 최근 3개월 추세 가중치 반영</div>"""
+            st.markdown(html_r, unsafe_allow_html=True)
+            st.markdown('</div>', unsafe_allow_html=True)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  탭2: 월별 추이
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 with tab2:
-    # 단일 월 모드에서는 전체 기간 데이터로 추이를 보여줌
-    df_ts=apply_filters(mg_all, ym_range=sel_ym_range, brands=sel_brands, supply=sel_supply)
-    if view_mode == "단일 월":
-        st.info(f"📌 현재 **단일 월({sel_ym})** 조회 중입니다. 사이드바에서 **기간 범위** 모드로 전환하면 여러 달의 추이를 비교할 수 있습니다.")
-        df_ts = apply_filters(mg_all, brands=sel_brands, supply=sel_supply)  # 추이는 전체 기간 표시
-    if df_ts.empty:
-        st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
-    else:
-        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-        fc1,fc2=st.columns([1,4])
-        with fc1: ts_mode=st.radio("📐 집계 기준",["브랜드별","시리즈별"],horizontal=False)
-        with fc2:
-            group_col="brand" if ts_mode=="브랜드별" else "series"
-            choices=sorted(df_ts[group_col].unique()); default_c=choices[:4] if len(choices)>4 else choices
-            ts_sel=st.multiselect(f"📌 표시할 {ts_mode[:-1]} 선택",choices,default=default_c)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        if not ts_sel:
-            st.info(f"위에서 {ts_mode[:-1]}을 하나 이상 선택하세요.")
+    if tab_open(tab2):
+        # 단일 월 모드에서는 전체 기간 데이터로 추이를 보여줌
+        ts_flt=dict(ym_range=sel_ym_range, brands=sel_brands, supply=sel_supply)
+        if view_mode == "단일 월":
+            st.info(f"📌 현재 **단일 월({sel_ym})** 조회 중입니다. 사이드바에서 **기간 범위** 모드로 전환하면 여러 달의 추이를 비교할 수 있습니다.")
+            ts_flt["ym_range"] = None  # 추이는 전체 기간 표시
+        cells_ts=memo("cells_ts", data_ver, ts_flt, lambda: olap.select_months(**ts_flt))
+        if cells_ts.empty:
+            st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
         else:
-            agg_ts=(df_ts[df_ts[group_col].isin(ts_sel)].groupby(["ym_dt",group_col]).agg(forecast=("forecast","sum"),actual=("actual","sum")).reset_index().sort_values("ym_dt"))
-            PAL_F=["#93C5FD","#86EFAC","#FDE68A","#DDD6FE","#FBCFE8"]
-            PAL_A=["#1D4ED8","#15803D","#B45309","#6D28D9","#BE185D"]
-
-            st.markdown('<div class="section-card"><div class="section-title">월별 예측 vs 실수주 추이</div>', unsafe_allow_html=True)
-            fig_ts=go.Figure()
-            for i,item in enumerate(ts_sel):
-                d=agg_ts[agg_ts[group_col]==item].sort_values("ym_dt")
-                fig_ts.add_trace(go.Scatter(x=d["ym_dt"],y=d["forecast"],name=f"{item} 예측",mode="lines+markers",line=dict(dash="dot",color=PAL_F[i%len(PAL_F)],width=2),marker=dict(size=7)))
-                fig_ts.add_trace(go.Scatter(x=d["ym_dt"],y=d["actual"],name=f"{item} 실적",mode="lines+markers",line=dict(color=PAL_A[i%len(PAL_A)],width=2.5),marker=dict(size=8)))
-            fig_ts.update_layout(template="plotly_white",height=380,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),xaxis=dict(title="기준월",showgrid=False),yaxis=dict(title="수량",showgrid=True,gridcolor="#F3F4F6"),legend=dict(orientation="h",yanchor="bottom",y=1.02),hovermode="x unified")
-            st.plotly_chart(fig_ts,use_container_width=True)
+            st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+            fc1,fc2=st.columns([1,4])
+            with fc1: ts_mode=st.radio("📐 집계 기준",["브랜드별","시리즈별"],horizontal=False,key="ts_mode",**TAB_STATE)
+            with fc2:
+                group_col="brand" if ts_mode=="브랜드별" else "series"
+                choices=sorted(cells_ts[group_col].unique()); default_c=choices[:4] if len(choices)>4 else choices
+                ts_sel=st.multiselect(f"📌 표시할 {ts_mode[:-1]} 선택",choices,default=default_c,key=f"ts_sel_{group_col}",**TAB_STATE)
             st.markdown('</div>', unsafe_allow_html=True)
 
-            st.markdown('<div class="section-card"><div class="section-title">월별 달성률 추이</div>', unsafe_allow_html=True)
-            rate_ts=agg_ts.copy()
-            rate_ts["달성률"]=np.where(rate_ts["forecast"]>0,(rate_ts["actual"]/rate_ts["forecast"]*100).round(1),0)
-            fig_rt=go.Figure()
-            for i,item in enumerate(ts_sel):
-                d=rate_ts[rate_ts[group_col]==item].sort_values("ym_dt")
-                fig_rt.add_trace(go.Scatter(x=d["ym_dt"],y=d["달성률"],name=item,mode="lines+markers",line=dict(color=PAL_A[i%len(PAL_A)],width=2.5),marker=dict(size=8)))
-            fig_rt.add_hline(y=100,line_dash="dot",line_color="#94A3B8",annotation_text="100% 기준",annotation_font_size=13)
-            fig_rt.update_layout(template="plotly_white",height=280,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),xaxis=dict(title="기준월",showgrid=False),yaxis=dict(title="달성률 (%)",showgrid=True,gridcolor="#F3F4F6"),legend=dict(orientation="h",yanchor="bottom",y=1.02),hovermode="x unified")
-            st.plotly_chart(fig_rt,use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            if not ts_sel:
+                st.info(f"위에서 {ts_mode[:-1]}을 하나 이상 선택하세요.")
+            else:
+                def _agg_ts():
+                    agg=summarize(cells_ts,["ym",group_col],where=[(group_col,"in",ts_sel)])
+                    agg.insert(0,"ym_dt",pd.to_datetime(agg["ym"].astype(str)+"-01"))
+                    return agg
+                agg_ts=memo("agg_ts", data_ver, ts_flt, _agg_ts, by=group_col, sel=tuple(ts_sel))
+                PAL_F=["#93C5FD","#86EFAC","#FDE68A","#DDD6FE","#FBCFE8"]
+                PAL_A=["#1D4ED8","#15803D","#B45309","#6D28D9","#BE185D"]
+
+                st.markdown('<div class="section-card"><div class="section-title">월별 예측 vs 실수주 추이</div>', unsafe_allow_html=True)
+                fig_ts=go.Figure()
+                for i,item in enumerate(ts_sel):
+                    d=agg_ts[agg_ts[group_col]==item].sort_values("ym_dt")
+                    fig_ts.add_trace(go.Scatter(x=d["ym_dt"],y=d["forecast"],name=f"{item} 예측",mode="lines+markers",line=dict(dash="dot",color=PAL_F[i%len(PAL_F)],width=2),marker=dict(size=7)))
+                    fig_ts.add_trace(go.Scatter(x=d["ym_dt"],y=d["actual"],name=f"{item} 실적",mode="lines+markers",line=dict(color=PAL_A[i%len(PAL_A)],width=2.5),marker=dict(size=8)))
+                fig_ts.update_layout(template="plotly_white",height=380,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),xaxis=dict(title="기준월",showgrid=False),yaxis=dict(title="수량",showgrid=True,gridcolor="#F3F4F6"),legend=dict(orientation="h",yanchor="bottom",y=1.02),hovermode="x unified")
+                st.plotly_chart(fig_ts,use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+                st.markdown('<div class="section-card"><div class="section-title">월별 달성률 추이</div>', unsafe_allow_html=True)
+                rate_ts=agg_ts.rename(columns={"달성률(%)":"달성률"})
+                fig_rt=go.Figure()
+                for i,item in enumerate(ts_sel):
+                    d=rate_ts[rate_ts[group_col]==item].sort_values("ym_dt")
+                    fig_rt.add_trace(go.Scatter(x=d["ym_dt"],y=d["달성률"],name=item,mode="lines+markers",line=dict(color=PAL_A[i%len(PAL_A)],width=2.5),marker=dict(size=8)))
+                fig_rt.add_hline(y=100,line_dash="dot",line_color="#94A3B8",annotation_text="100% 기준",annotation_font_size=13)
+                fig_rt.update_layout(template="plotly_white",height=280,margin=dict(l=0,r=0,t=10,b=0),font=dict(size=14),xaxis=dict(title="기준월",showgrid=False),yaxis=dict(title="달성률 (%)",showgrid=True,gridcolor="#F3F4F6"),legend=dict(orientation="h",yanchor="bottom",y=1.02),hovermode="x unified")
+                st.plotly_chart(fig_rt,use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  탭3: 시리즈 분석
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 with tab3:
-    df_sr=apply_filters(mg_all,ym=sel_ym if not sel_ym_range else None,ym_range=sel_ym_range,brands=sel_brands,supply=sel_supply)
-    if df_sr.empty:
-        st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
-    else:
-        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-        sf1,sf2,sf3=st.columns([1,1,2])
-        with sf1: top_n=st.slider("📊 Top N",5,30,20,key="sr_topn")
-        with sf2:
-            sr_sort=st.selectbox("🔃 정렬 기준",["차이량(실-예측) 큰 순","예측수요 큰 순","실수주 큰 순","달성률 높은 순","달성률 낮은 순"],key="sr_sort")
-        with sf3:
-            st.markdown(f"<div style='padding-top:36px;font-size:15px;color:#1D4ED8;font-weight:600'>상위 <b style='font-size:20px'>{top_n}</b>개 시리즈 · 정렬: <b>{sr_sort}</b></div>",unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        sr_agg=df_sr.groupby("series").agg(forecast=("forecast","sum"),actual=("actual","sum")).reset_index()
-        sr_agg["차이량"]=sr_agg["actual"]-sr_agg["forecast"]
-        sr_agg["오차량"]=sr_agg["차이량"].abs()
-        sr_agg["달성률(%)"]=np.where(sr_agg["forecast"]>0,(sr_agg["actual"]/sr_agg["forecast"]*100).round(1),0)
-        sr_sort_map={"차이량(실-예측) 큰 순":("오차량",False),"예측수요 큰 순":("forecast",False),"실수주 큰 순":("actual",False),"달성률 높은 순":("달성률(%)",False),"달성률 낮은 순":("달성률(%)",True)}
-        ss_col,ss_asc=sr_sort_map[sr_sort]
-        sr_top=sr_agg.sort_values(ss_col,ascending=ss_asc).head(top_n)
-        sr_plot=sr_top.sort_values("forecast",ascending=True)
-        chart_h=max(420,top_n*32)
-
-        col_l,col_r=st.columns(2)
-        with col_l:
-            st.markdown(f'<div class="section-card"><div class="section-title">예측수요 / 실수주 / 차이량 (Top {top_n})</div>', unsafe_allow_html=True)
-            fig_3bar=go.Figure()
-            fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["forecast"],name="예측수요",orientation="h",marker_color="#5B8DEF",text=sr_plot["forecast"].apply(fmt_int),textposition="outside",textfont=dict(size=11)))
-            fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["actual"],name="실수주",orientation="h",marker_color="#34D399",text=sr_plot["actual"].apply(fmt_int),textposition="outside",textfont=dict(size=11)))
-            diff_colors=["#60A5FA" if v>=0 else "#F87171" for v in sr_plot["차이량"]]
-            fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["차이량"],name="차이량(실-예측)",orientation="h",marker_color=diff_colors,text=[f"+{fmt_int(v)}" if v>=0 else fmt_int(v) for v in sr_plot["차이량"]],textposition="outside",textfont=dict(size=11)))
-            fig_3bar.update_layout(barmode="group",template="plotly_white",height=chart_h,margin=dict(l=0,r=80,t=10,b=0),font=dict(size=13),xaxis=dict(showgrid=True,gridcolor="#F3F4F6",zeroline=True,zerolinecolor="#CBD5E1"),yaxis=dict(tickfont=dict(size=13,color="#1F2937")),legend=dict(orientation="h",yanchor="bottom",y=1.01,font=dict(size=12)))
-            st.plotly_chart(fig_3bar,use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        with col_r:
-            st.markdown(f'<div class="section-card"><div class="section-title">달성률 (Top {top_n})</div>', unsafe_allow_html=True)
-            rate_colors=["#34D399" if v>=100 else "#FBBF24" if v>=90 else "#F87171" for v in sr_plot["달성률(%)"]]
-            fig_rate=go.Figure(go.Bar(y=sr_plot["series"],x=sr_plot["달성률(%)"],orientation="h",marker_color=rate_colors,text=[f"{v:.1f}%" for v in sr_plot["달성률(%)"]],textposition="outside",textfont=dict(size=12)))
-            fig_rate.add_vline(x=100,line_dash="dash",line_color="#94A3B8",annotation_text="100%",annotation_position="top")
-            x_max=max(150,float(sr_plot["달성률(%)"].max())+30)
-            fig_rate.update_layout(template="plotly_white",height=chart_h,margin=dict(l=0,r=70,t=10,b=0),font=dict(size=13),xaxis=dict(range=[0,x_max],showgrid=True,gridcolor="#F3F4F6",ticksuffix="%"),yaxis=dict(tickfont=dict(size=13,color="#1F2937")))
-            st.plotly_chart(fig_rate,use_container_width=True)
+    if tab_open(tab3):
+        cells_sr=view_cells(olap, data_ver, flt)
+        if cells_sr.empty:
+            st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
+        else:
+            st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+            sf1,sf2,sf3=st.columns([1,1,2])
+            with sf1: top_n=st.slider("📊 Top N",5,30,20,key="sr_topn",**TAB_STATE)
+            with sf2:
+                sr_sort=st.selectbox("🔃 정렬 기준",["차이량(실-예측) 큰 순","예측수요 큰 순","실수주 큰 순","달성률 높은 순","달성률 낮은 순"],key="sr_sort",**TAB_STATE)
+            with sf3:
+                st.markdown(f"<div style='padding-top:36px;font-size:15px;color:#1D4ED8;font-weight:600'>상위 <b style='font-size:20px'>{top_n}</b>개 시리즈 · 정렬: <b>{sr_sort}</b></div>",unsafe_allow_html=True)
             st.markdown('</div>', unsafe_allow_html=True)
 
-        sum_col,tbl_col=st.columns([1,3])
-        with sum_col:
-            st.markdown('<div class="section-card"><div class="section-title">달성률 구간 분포</div>', unsafe_allow_html=True)
-            bins=[0,70,90,100,110,9999]; blabels=["70% 미만","70~90%","90~100%","100~110%","110% 초과"]
-            sr_agg["구간"]=pd.cut(sr_agg["달성률(%)"],bins=bins,labels=blabels,right=False)
-            bin_cnt=sr_agg["구간"].value_counts().reindex(blabels,fill_value=0).reset_index()
-            bin_cnt.columns=["구간","건수"]
-            fig_bin=go.Figure(go.Bar(x=bin_cnt["구간"],y=bin_cnt["건수"],marker_color=["#EF4444","#F87171","#FBBF24","#34D399","#059669"],text=bin_cnt["건수"],textposition="outside",textfont=dict(size=14)))
-            fig_bin.update_layout(template="plotly_white",height=260,margin=dict(l=0,r=0,t=10,b=0))
-            st.plotly_chart(fig_bin,use_container_width=True)
+            sr_agg=view_agg("series_agg3", olap, data_ver, flt)
+            sr_sort_map={"차이량(실-예측) 큰 순":("오차량",False),"예측수요 큰 순":("forecast",False),"실수주 큰 순":("actual",False),"달성률 높은 순":("달성률(%)",False),"달성률 낮은 순":("달성률(%)",True)}
+            ss_col,ss_asc=sr_sort_map[sr_sort]
+            sr_top=memo("series_top", data_ver, flt, lambda: rank(sr_agg,ss_col,ascending=ss_asc,head=top_n), sort=ss_col, asc=ss_asc, n=top_n)
+            sr_plot=sr_top.sort_values("forecast",ascending=True)
+            chart_h=max(420,top_n*32)
+
+            col_l,col_r=st.columns(2)
+            with col_l:
+                st.markdown(f'<div class="section-card"><div class="section-title">예측수요 / 실수주 / 차이량 (Top {top_n})</div>', unsafe_allow_html=True)
+                fig_3bar=go.Figure()
+                fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["forecast"],name="예측수요",orientation="h",marker_color="#5B8DEF",text=sr_plot["forecast"].apply(fmt_int),textposition="outside",textfont=dict(size=11)))
+                fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["actual"],name="실수주",orientation="h",marker_color="#34D399",text=sr_plot["actual"].apply(fmt_int),textposition="outside",textfont=dict(size=11)))
+                diff_colors=["#60A5FA" if v>=0 else "#F87171" for v in sr_plot["차이량"]]
+                fig_3bar.add_trace(go.Bar(y=sr_plot["series"],x=sr_plot["차이량"],name="차이량(실-예측)",orientation="h",marker_color=diff_colors,text=[f"+{fmt_int(v)}" if v>=0 else fmt_int(v) for v in sr_plot["차이량"]],textposition="outside",textfont=dict(size=11)))
+                fig_3bar.update_layout(barmode="group",template="plotly_white",height=chart_h,margin=dict(l=0,r=80,t=10,b=0),font=dict(size=13),xaxis=dict(showgrid=True,gridcolor="#F3F4F6",zeroline=True,zerolinecolor="#CBD5E1"),yaxis=dict(tickfont=dict(size=13,color="#1F2937")),legend=dict(orientation="h",yanchor="bottom",y=1.01,font=dict(size=12)))
+                st.plotly_chart(fig_3bar,use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            with col_r:
+                st.markdown(f'<div class="section-card"><div class="section-title">달성률 (Top {top_n})</div>', unsafe_allow_html=True)
+                rate_colors=["#34D399" if v>=100 else "#FBBF24" if v>=90 else "#F87171" for v in sr_plot["달성률(%)"]]
+                fig_rate=go.Figure(go.Bar(y=sr_plot["series"],x=sr_plot["달성률(%)"],orientation="h",marker_color=rate_colors,text=[f"{v:.1f}%" for v in sr_plot["달성률(%)"]],textposition="outside",textfont=dict(size=12)))
+                fig_rate.add_vline(x=100,line_dash="dash",line_color="#94A3B8",annotation_text="100%",annotation_position="top")
+                x_max=max(150,float(sr_plot["달성률(%)"].max())+30)
+                fig_rate.update_layout(template="plotly_white",height=chart_h,margin=dict(l=0,r=70,t=10,b=0),font=dict(size=13),xaxis=dict(range=[0,x_max],showgrid=True,gridcolor="#F3F4F6",ticksuffix="%"),yaxis=dict(tickfont=dict(size=13,color="#1F2937")))
+                st.plotly_chart(fig_rate,use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            sum_col,tbl_col=st.columns([1,3])
+            with sum_col:
+                st.markdown('<div class="section-card"><div class="section-title">달성률 구간 분포</div>', unsafe_allow_html=True)
+                bins=[0,70,90,100,110,9999]; blabels=["70% 미만","70~90%","90~100%","100~110%","110% 초과"]
+                sr_bin=pd.cut(sr_agg["달성률(%)"],bins=bins,labels=blabels,right=False).rename("구간")
+                bin_cnt=sr_bin.value_counts().reindex(blabels,fill_value=0).reset_index()
+                bin_cnt.columns=["구간","건수"]
+                fig_bin=go.Figure(go.Bar(x=bin_cnt["구간"],y=bin_cnt["건수"],marker_color=["#EF4444","#F87171","#FBBF24","#34D399","#059669"],text=bin_cnt["건수"],textposition="outside",textfont=dict(size=14)))
+                fig_bin.update_layout(template="plotly_white",height=260,margin=dict(l=0,r=0,t=10,b=0))
+                st.plotly_chart(fig_bin,use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            with tbl_col:
+                st.markdown('<div class="section-card"><div class="section-title">시리즈별 상세 수치</div>', unsafe_allow_html=True)
+                disp=sr_top.rename(columns={"series":"시리즈","forecast":"예측수요","actual":"실수주","차이량":"차이량(실-예측)","달성률(%)":"달성률(%)"})[["시리즈","예측수요","실수주","차이량(실-예측)","달성률(%)"]].copy()
+                def color_rate(v):
+                    if isinstance(v,(int,float)):
+                        if v>=100: return "background:#D1FAE5;color:#065F46;font-weight:700"
+                        if v>=90:  return "background:#FEF9C3;color:#92400E;font-weight:700"
+                        return "background:#FEE2E2;color:#991B1B;font-weight:700"
+                    return ""
+                def color_diff(v):
+                    if isinstance(v,(int,float)):
+                        if v>0: return "color:#059669;font-weight:600"
+                        if v<0: return "color:#DC2626;font-weight:600"
+                    return ""
+                styled=(disp.style.format({"예측수요":"{:,.0f}","실수주":"{:,.0f}","차이량(실-예측)":"{:+,.0f}","달성률(%)":"{:.1f}%"}).applymap(color_rate,subset=["달성률(%)"]).applymap(color_diff,subset=["차이량(실-예측)"]))
+                st.dataframe(styled,use_container_width=True,height=280)
+                st.markdown('</div>', unsafe_allow_html=True)
+
+            # ── 시리즈 드릴다운 ──
+            st.markdown('<div class="section-card">', unsafe_allow_html=True)
+            st.markdown('<div class="section-title">🔍 시리즈 드릴다운 — 품목별 상세</div>', unsafe_allow_html=True)
+            drill_series = st.selectbox(
+                "조회할 시리즈 선택 (달성률 낮은 순)",
+                options=sr_top.sort_values("달성률(%)")["series"].tolist(),
+                format_func=lambda s: f"{s}  ·  달성률 {sr_top.loc[sr_top['series']==s,'달성률(%)'].values[0]:.1f}%  |  오차 {sr_top.loc[sr_top['series']==s,'오차량'].values[0]:,.0f}",
+                key="sr_drill", **TAB_STATE
+            )
+            if drill_series:
+                df_drill = memo("drill", data_ver, flt, lambda: apply_filters(star, **flt, series=drill_series), series=drill_series)
+                df_drill = df_drill[["ym","brand","combo","name","supply","forecast","actual","차이","달성률(%)"]].sort_values("달성률(%)")
+                df_drill["supply"] = df_drill["supply"].astype(str).replace({"<NA>": "미분류"})
+                d_f = int(df_drill["forecast"].sum())
+                d_a = int(df_drill["actual"].sum())
+                d_r = round(d_a/d_f*100,1) if d_f>0 else 0.0
+                d_d = d_a - d_f
+                kpi_color = "#10B981" if d_r>=100 else "#F59E0B" if d_r>=90 else "#EF4444"
+                sign = "+" if d_d>=0 else ""
+                kpi_html = (
+                    '<div style="display:flex;gap:12px;margin-bottom:14px;flex-wrap:wrap;">' +
+                    f'<div style="background:#EFF6FF;border-radius:10px;padding:12px 20px;border-left:4px solid #3B82F6;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">예측수요</div><div style="font-size:22px;font-weight:900;color:#3B82F6;">{d_f:,}</div></div>' +
+                    f'<div style="background:#F0FDF4;border-radius:10px;padding:12px 20px;border-left:4px solid #10B981;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">실수주</div><div style="font-size:22px;font-weight:900;color:#10B981;">{d_a:,}</div></div>' +
+                    f'<div style="background:#FFF7ED;border-radius:10px;padding:12px 20px;border-left:4px solid {kpi_color};min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">달성률</div><div style="font-size:22px;font-weight:900;color:{kpi_color};">{d_r:.1f}%</div></div>' +
+                    f'<div style="background:#FFF1F2;border-radius:10px;padding:12px 20px;border-left:4px solid #F43F5E;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">오차</div><div style="font-size:22px;font-weight:900;color:{"#10B981" if d_d>=0 else "#EF4444"};">{sign}{d_d:,}</div></div>' +
+                    f'<div style="background:#F8FAFF;border-radius:10px;padding:12px 20px;border-left:4px solid #8B5CF6;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">품목 수</div><div style="font-size:22px;font-weight:900;color:#8B5CF6;">{len(df_drill):,}건</div></div>' +
+                    '</div>'
+                )
+                st.markdown(kpi_html, unsafe_allow_html=True)
+                def cr(v):
+                    if isinstance(v,(int,float)):
+                        if v>=100: return "background:#D1FAE5;color:#065F46;font-weight:700"
+                        if v>=90:  return "background:#FEF9C3;color:#92400E;font-weight:700"
+                        return "background:#FEE2E2;color:#991B1B;font-weight:700"
+                    return ""
+                def cd(v):
+                    if isinstance(v,(int,float)):
+                        if v>0: return "color:#059669;font-weight:600"
+                        if v<0: return "color:#DC2626;font-weight:600"
+                    return ""
+                styled_drill = (
+                    df_drill.rename(columns={"ym":"월","brand":"브랜드","combo":"콤보","name":"품목명",
+                                             "supply":"공급단","forecast":"예측수요","actual":"실수주",
+                                             "차이":"차이(실-예측)","달성률(%)":"달성률(%)"})
+                    .style
+                    .format({"예측수요":"{:,.0f}","실수주":"{:,.0f}","차이(실-예측)":"{:+,.0f}","달성률(%)":"{:.1f}%"})
+                    .applymap(cr, subset=["달성률(%)"])
+                    .applymap(cd, subset=["차이(실-예측)"])
+                )
+                st.dataframe(styled_drill, use_container_width=True, height=min(400, 40+len(df_drill)*35))
             st.markdown('</div>', unsafe_allow_html=True)
 
-        with tbl_col:
-            st.markdown('<div class="section-card"><div class="section-title">시리즈별 상세 수치</div>', unsafe_allow_html=True)
-            disp=sr_top.rename(columns={"series":"시리즈","forecast":"예측수요","actual":"실수주","차이량":"차이량(실-예측)","달성률(%)":"달성률(%)"})[["시리즈","예측수요","실수주","차이량(실-예측)","달성률(%)"]].copy()
-            def color_rate(v):
-                if isinstance(v,(int,float)):
-                    if v>=100: return "background:#D1FAE5;color:#065F46;font-weight:700"
-                    if v>=90:  return "background:#FEF9C3;color:#92400E;font-weight:700"
-                    return "background:#FEE2E2;color:#991B1B;font-weight:700"
-                return ""
-            def color_diff(v):
-                if isinstance(v,(int,float)):
-                    if v>0: return "color:#059669;font-weight:600"
-                    if v<0: return "color:#DC2626;font-weight:600"
-                return ""
-            styled=(disp.style.format({"예측수요":"{:,.0f}","실수주":"{:,.0f}","차이량(실-예측)":"{:+,.0f}","달성률(%)":"{:.1f}%"}).applymap(color_rate,subset=["달성률(%)"]).applymap(color_diff,subset=["차이량(실-예측)"]))
-            st.dataframe(styled,use_container_width=True,height=280)
+            # ── 콤보 계열(코드 접두어) ──
+            st.markdown('<div class="section-card">', unsafe_allow_html=True)
+            st.markdown('<div class="section-title">🧬 콤보 계열 분석 — 코드 접두어별 합계 (모델 → 사양 → 색상)</div>', unsafe_allow_html=True)
+            px_idx, px_cs = combo_prefixes(flt)
+            px = st.text_input("콤보 코드 접두어", placeholder="예: DHT1200 (비우면 전체 모델)", key="px_prefix", **TAB_STATE).strip().upper()
+            px_hint = px_idx.complete(px, px_cs)
+            if px and px_hint:
+                st.caption("자동 완성: " + ", ".join(px_hint))
+            px_tot = px_idx.family(px_cs, px)
+            if px_tot["n"] == 0:
+                st.info(f"'{px}' 로 시작하는 콤보가 선택한 조건에 없습니다.")
+            else:
+                px_rate = round(px_tot["actual"]/px_tot["forecast"]*100,1) if px_tot["forecast"]>0 else 0.0
+                px_diff = px_tot["actual"] - px_tot["forecast"]
+                st.markdown(
+                    f"<div style='font-size:14px;color:#334155;margin-bottom:8px'><b>{px or '전체'}</b> 계열 · 콤보 <b>{px_tot['combos']:,}</b>개 — "
+                    f"예측수요 <b>{px_tot['forecast']:,}</b> / 실수주 <b>{px_tot['actual']:,}</b> / "
+                    f"달성률 <b>{px_rate:.1f}%</b> / 차이 <b>{'+' if px_diff>=0 else ''}{px_diff:,}</b></div>", unsafe_allow_html=True)
+                px_fam = memo("prefix_families", data_ver, flt, lambda: px_idx.families(px_cs, px), prefix=px)
+                px_disp = (px_fam.sort_values("forecast", ascending=False)
+                           .rename(columns={"family":"계열","forecast":"예측수요","actual":"실수주","combos":"콤보 수","차이":"차이(실-예측)"})
+                           [["계열","콤보 수","예측수요","실수주","차이(실-예측)","달성률(%)"]])
+                st.dataframe(px_disp.style.format({"예측수요":"{:,.0f}","실수주":"{:,.0f}","차이(실-예측)":"{:+,.0f}","달성률(%)":"{:.1f}%"})
+                             .applymap(color_rate, subset=["달성률(%)"]).applymap(color_diff, subset=["차이(실-예측)"]),
+                             use_container_width=True, height=min(400, 40+len(px_disp)*35))
             st.markdown('</div>', unsafe_allow_html=True)
 
-        # ── 시리즈 드릴다운 ──
-        st.markdown('<div class="section-card">', unsafe_allow_html=True)
-        st.markdown('<div class="section-title">🔍 시리즈 드릴다운 — 품목별 상세</div>', unsafe_allow_html=True)
-        drill_series = st.selectbox(
-            "조회할 시리즈 선택 (달성률 낮은 순)",
-            options=sr_top.sort_values("달성률(%)")["series"].tolist(),
-            format_func=lambda s: f"{s}  ·  달성률 {sr_top.loc[sr_top['series']==s,'달성률(%)'].values[0]:.1f}%  |  오차 {sr_top.loc[sr_top['series']==s,'오차량'].values[0]:,.0f}",
-            key="sr_drill"
-        )
-        if drill_series:
-            df_drill = df_sr[df_sr["series"] == drill_series].copy()
-            df_drill = df_drill[["ym","brand","combo","name","supply","forecast","actual","차이","달성률(%)"]].sort_values("달성률(%)")
-            df_drill["supply"] = df_drill["supply"].replace({"<NA>": "미분류"})
-            d_f = int(df_drill["forecast"].sum())
-            d_a = int(df_drill["actual"].sum())
-            d_r = round(d_a/d_f*100,1) if d_f>0 else 0.0
-            d_d = d_a - d_f
-            kpi_color = "#10B981" if d_r>=100 else "#F59E0B" if d_r>=90 else "#EF4444"
-            sign = "+" if d_d>=0 else ""
-            kpi_html = (
-                '<div style="display:flex;gap:12px;margin-bottom:14px;flex-wrap:wrap;">' +
-                f'<div style="background:#EFF6FF;border-radius:10px;padding:12px 20px;border-left:4px solid #3B82F6;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">예측수요</div><div style="font-size:22px;font-weight:900;color:#3B82F6;">{d_f:,}</div></div>' +
-                f'<div style="background:#F0FDF4;border-radius:10px;padding:12px 20px;border-left:4px solid #10B981;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">실수주</div><div style="font-size:22px;font-weight:900;color:#10B981;">{d_a:,}</div></div>' +
-                f'<div style="background:#FFF7ED;border-radius:10px;padding:12px 20px;border-left:4px solid {kpi_color};min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">달성률</div><div style="font-size:22px;font-weight:900;color:{kpi_color};">{d_r:.1f}%</div></div>' +
-                f'<div style="background:#FFF1F2;border-radius:10px;padding:12px 20px;border-left:4px solid #F43F5E;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">오차</div><div style="font-size:22px;font-weight:900;color:{"#10B981" if d_d>=0 else "#EF4444"};">{sign}{d_d:,}</div></div>' +
-                f'<div style="background:#F8FAFF;border-radius:10px;padding:12px 20px;border-left:4px solid #8B5CF6;min-width:120px;"><div style="font-size:11px;color:#64748B;font-weight:700;margin-bottom:4px;">품목 수</div><div style="font-size:22px;font-weight:900;color:#8B5CF6;">{len(df_drill):,}건</div></div>' +
-                '</div>'
-            )
-            st.markdown(kpi_html, unsafe_allow_html=True)
-            def cr(v):
-                if isinstance(v,(int,float)):
-                    if v>=100: return "background:#D1FAE5;color:#065F46;font-weight:700"
-                    if v>=90:  return "background:#FEF9C3;color:#92400E;font-weight:700"
-                    return "background:#FEE2E2;color:#991B1B;font-weight:700"
-                return ""
-            def cd(v):
-                if isinstance(v,(int,float)):
-                    if v>0: return "color:#059669;font-weight:600"
-                    if v<0: return "color:#DC2626;font-weight:600"
-                return ""
-            styled_drill = (
-                df_drill.rename(columns={"ym":"월","brand":"브랜드","combo":"콤보","name":"품목명",
-                                         "supply":"공급단","forecast":"예측수요","actual":"실수주",
-                                         "차이":"차이(실-예측)","달성률(%)":"달성률(%)"})
-                .style
-                .format({"예측수요":"{:,.0f}","실수주":"{:,.0f}","차이(실-예측)":"{:+,.0f}","달성률(%)":"{:.1f}%"})
-                .applymap(cr, subset=["달성률(%)"])
-                .applymap(cd, subset=["차이(실-예측)"])
-            )
-            st.dataframe(styled_drill, use_container_width=True, height=min(400, 40+len(df_drill)*35))
-        st.markdown('</div>', unsafe_allow_html=True)
-
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  탭4: 상세 데이터
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 with tab4:
-    df_det=apply_filters(mg_all,ym=sel_ym if not sel_ym_range else None,ym_range=sel_ym_range,brands=sel_brands,supply=sel_supply)
-    if df_det.empty:
-        st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
-    else:
-        st.markdown('<div class="filter-card">', unsafe_allow_html=True)
-        dc1,dc2,dc3=st.columns([2,2,1])
-        with dc1: search=st.text_input("🔍 검색",placeholder="콤보코드 / 시리즈명 / 품목명...")
-        with dc2: sort_by=st.selectbox("🔃 정렬 기준",["오차량 큰 순","예측수요 큰 순","실수주 큰 순","달성률 높은 순","달성률 낮은 순"])
-        with dc3: show_n=st.slider("📋 표시 행 수",10,300,50)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        sort_map={"오차량 큰 순":("오차량",False),"예측수요 큰 순":("forecast",False),"실수주 큰 순":("actual",False),"달성률 높은 순":("달성률(%)",False),"달성률 낮은 순":("달성률(%)",True)}
-        sc,sa=sort_map[sort_by]
-        df_det2=df_det.sort_values(sc,ascending=sa)
-        if search:
-            mask=(df_det2["combo"].str.contains(search,case=False,na=False)|df_det2["series"].str.contains(search,case=False,na=False)|df_det2["name"].str.contains(search,case=False,na=False))
-            df_det2=df_det2[mask]
-
-        total_rows=len(df_det2)
-        st.markdown(f"<div style='font-size:14px;color:#64748B;margin-bottom:8px'>조건에 맞는 데이터 <b style='color:#1D4ED8'>{total_rows:,}건</b> 중 상위 <b style='color:#1D4ED8'>{min(show_n,total_rows)}건</b> 표시</div>",unsafe_allow_html=True)
-
-        cols_show=["ym","brand","series","combo","name","supply","forecast","actual","차이","달성률(%)"]
-        display_det=df_det2[cols_show].head(show_n).copy()
-        display_det["supply"]=display_det["supply"].replace({"<NA>":"미분류"})
-        styled_det=(display_det.style.format({"forecast":"{:,.0f}","actual":"{:,.0f}","차이":"{:,.0f}","달성률(%)":"{:.1f}%"}).applymap(lambda v:"background:#FEE2E2;color:#991B1B" if isinstance(v,(int,float)) and v<0 else "",subset=["차이"]))
-        st.dataframe(styled_det,use_container_width=True,height=400)
-        csv_data=df_det2[cols_show].to_csv(index=False,encoding="utf-8-sig")
-        st.download_button("⬇️  CSV 다운로드",data=csv_data,file_name=f"forecast_detail_{period_label.replace(' ','').replace('~','_')}.csv",mime="text/csv")
-
-        st.markdown("<div style='height:24px'></div>",unsafe_allow_html=True)
-
-        if not df_det2.empty:
-            t_fc=int(df_det2["forecast"].sum()); t_ac=int(df_det2["actual"].sum())
-            t_diff=t_ac-t_fc; t_rate=round(t_ac/t_fc*100,1) if t_fc>0 else 0.0
-            n_rows=len(df_det2)
-            over110=df_det2[df_det2["달성률(%)"]>110]; ok90_110=df_det2[(df_det2["달성률(%)"]>=90)&(df_det2["달성률(%)"]<=110)]; under90=df_det2[df_det2["달성률(%)"]<90]
-            top5_err=df_det2.nlargest(5,"오차량")[["series","combo","name","forecast","actual","차이","달성률(%)"]]
-            top3_over=df_det2[df_det2["차이"]>0].nlargest(3,"차이")[["series","combo","name","forecast","actual","차이"]]
-            top3_under=df_det2[df_det2["차이"]<0].nsmallest(3,"차이")[["series","combo","name","forecast","actual","차이"]]
-            brand_sum=df_det2.groupby("brand").agg(forecast=("forecast","sum"),actual=("actual","sum")).reset_index()
-            brand_sum["rate"]=np.where(brand_sum["forecast"]>0,(brand_sum["actual"]/brand_sum["forecast"]*100).round(1),0)
-            sr_sum=df_det2.groupby(["combo","name","series"],as_index=False).agg(forecast=("forecast","sum"),actual=("actual","sum"))
-            sr_sum["rate"]=np.where(sr_sum["forecast"]>0,(sr_sum["actual"]/sr_sum["forecast"]*100).round(1),0)
-            month_label2 = period_label
-            filter_desc = month_label2
-            if sel_supply!="전체": filter_desc+=f" · {sel_supply}"
-            if search: filter_desc+=f" · 검색: '{search}'"
-            if t_rate>=100: rate_color="highlight-green";rate_word="초과달성"
-            elif t_rate>=90: rate_color="highlight-warn";rate_word="근접"
-            else: rate_color="highlight-red";rate_word="미달"
-            diff_sign="+" if t_diff>=0 else ""; diff_color="highlight-green" if t_diff>=0 else "highlight-red"
-            summary_html=f"""<div class="an-summary"><b>{filter_desc}</b> 기준 <b>{n_rows:,}건</b> 품목 분석 결과, 예측 수요 <b class="highlight-blue">{fmt_int(t_fc)}</b>개 대비 실 수주 <b class="highlight-blue">{fmt_int(t_ac)}</b>개 — 달성률 <b class="{rate_color}">{t_rate:.1f}% ({rate_word})</b>, 오차 <b class="{diff_color}">{diff_sign}{fmt_int(t_diff)}</b>개. &nbsp;·&nbsp; 달성률 구간: <span style="color:#EF4444;font-weight:700">미달(&lt;90%) {len(under90)}건</span> / <span style="color:#D97706;font-weight:700">근접(90~110%) {len(ok90_110)}건</span> / <span style="color:#059669;font-weight:700">초과(&gt;110%) {len(over110)}건</span></div>"""
-
-            st.markdown('<div class="analysis-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="analysis-title">🔬 현재 조건 상세 분석 · <span style="font-size:13px;color:#64748B;font-weight:500">정렬: {sort_by}</span></div>',unsafe_allow_html=True)
-            st.markdown(summary_html,unsafe_allow_html=True)
-            st.markdown("<div style='height:16px'></div>",unsafe_allow_html=True)
-
-            col_a,col_b=st.columns([3,2])
-            with col_a:
-                st.markdown('<div class="an-section"><div class="an-section-title">📌 오차 상위 5개 품목</div>',unsafe_allow_html=True)
-                for _,row in top5_err.iterrows():
-                    if row["달성률(%)"]>110: badge_cls,badge_txt="badge-over","초과"
-                    elif row["달성률(%)"]>=90: badge_cls,badge_txt="badge-ok","근접"
-                    else: badge_cls,badge_txt="badge-danger","미달"
-                    sign="+"; diff_c="#059669" if row["차이"]>=0 else "#DC2626"
-                    if row["차이"]<0: sign=""
-                    combo_str=str(row["combo"]); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"; series_str=str(row.get("series",""))
-                    st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge {badge_cls}' style='margin-top:2px;flex-shrink:0'>{badge_txt} {row['달성률(%)']:.0f}%</span><div style='min-width:0;flex:1'><div style='font-size:16px;font-weight:900;color:#1D4ED8;margin-bottom:2px'>{combo_str}</div><div style='font-size:13px;font-weight:700;color:#0F172A;margin-bottom:5px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{series_str}</span></div><div style='font-size:13px;color:#475569'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b> <b style='color:{diff_c}'>({sign}{fmt_int(row['차이'])})</b></div></div></div>",unsafe_allow_html=True)
-                st.markdown('</div>',unsafe_allow_html=True)
-
-            with col_b:
-                st.markdown('<div class="an-section"><div class="an-section-title">🏷️ 브랜드별 달성률</div>',unsafe_allow_html=True)
-                for _,row in brand_sum.sort_values("rate",ascending=False).iterrows():
-                    if row["rate"]>=100: bc,bw="#D1FAE5","#065F46"
-                    elif row["rate"]>=90: bc,bw="#FEF9C3","#92400E"
-                    else: bc,bw="#FEE2E2","#991B1B"
-                    bar_pct=min(int(row["rate"]),200)
-                    st.markdown(f"<div class='an-row' style='display:block;padding:10px 14px'><div style='display:flex;justify-content:space-between;margin-bottom:6px'><b style='color:#0F172A'>{row['brand']}</b><b style='background:{bc};color:{bw};padding:2px 10px;border-radius:99px;font-size:13px'>{row['rate']:.1f}%</b></div><div style='background:#F1F5F9;border-radius:4px;height:8px;overflow:hidden'><div style='width:{bar_pct/2}%;height:8px;background:{'#34D399' if row['rate']>=100 else '#FBBF24' if row['rate']>=90 else '#F87171'};border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
-                st.markdown('</div>',unsafe_allow_html=True)
-
-            st.markdown("<div style='height:12px'></div>",unsafe_allow_html=True)
-            col_c,col_d=st.columns(2)
-            with col_c:
-                st.markdown('<div class="an-section"><div class="an-section-title">🔺 예측 초과 상위 3개</div>',unsafe_allow_html=True)
-                if top3_over.empty:
-                    st.markdown("<div style='color:#94A3B8;font-size:14px;padding:8px'>초과 품목 없음</div>",unsafe_allow_html=True)
-                else:
-                    for _,row in top3_over.iterrows():
-                        name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
-                        st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge badge-over' style='margin-top:2px;flex-shrink:0'>+{fmt_int(row['차이'])}</span><div><div style='font-size:15px;font-weight:900;color:#1D4ED8'>{str(row['combo'])}</div><div style='font-size:13px;font-weight:700;color:#0F172A'>{name_str}</div><div style='font-size:13px;color:#475569;margin-top:4px'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b></div></div></div>",unsafe_allow_html=True)
-                st.markdown('</div>',unsafe_allow_html=True)
-
-            with col_d:
-                st.markdown('<div class="an-section"><div class="an-section-title">🔻 예측 미달 상위 3개</div>',unsafe_allow_html=True)
-                if top3_under.empty:
-                    st.markdown("<div style='color:#94A3B8;font-size:14px;padding:8px'>미달 품목 없음</div>",unsafe_allow_html=True)
-                else:
-                    for _,row in top3_under.iterrows():
-                        name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
-                        st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge badge-danger' style='margin-top:2px;flex-shrink:0'>{fmt_int(row['차이'])}</span><div><div style='font-size:15px;font-weight:900;color:#DC2626'>{str(row['combo'])}</div><div style='font-size:13px;font-weight:700;color:#0F172A'>{name_str}</div><div style='font-size:13px;color:#475569;margin-top:4px'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b></div></div></div>",unsafe_allow_html=True)
-                st.markdown('</div>',unsafe_allow_html=True)
+    if tab_open(tab4):
+        df_det=memo("detail", data_ver, flt, lambda: apply_filters(star,**flt))
+        if df_det.empty:
+            st.warning("선택한 조건에 해당하는 데이터가 없습니다.")
+        else:
+            st.markdown('<div class="filter-card">', unsafe_allow_html=True)
+            dc1,dc2,dc3=st.columns([2,2,1])
+            with dc1: search=st.text_input("🔍 검색",placeholder="콤보코드 / 시리즈명 / 품목명...",key="det_search",**TAB_STATE)
+            with dc2: sort_by=st.selectbox("🔃 정렬 기준",["오차량 큰 순","예측수요 큰 순","실수주 큰 순","달성률 높은 순","달성률 낮은 순"],key="det_sort",**TAB_STATE)
+            with dc3: show_n=st.slider("📋 표시 행 수",10,300,50,key="det_rows",**TAB_STATE)
+            st.markdown('</div>', unsafe_allow_html=True)
 
-            st.markdown("<div style='height:8px'></div>",unsafe_allow_html=True)
-            col_e,col_f=st.columns(2)
-            with col_e:
-                st.markdown('<div class="an-section"><div class="an-section-title">⚠️ 달성률 하위 품목 TOP 5</div>',unsafe_allow_html=True)
-                bot5_item=sr_sum[sr_sum["forecast"]>0].nsmallest(5,"rate")
-                for _,row in bot5_item.iterrows():
-                    pct=min(int(row["rate"]),200); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
-                    st.markdown(f"<div class='an-row' style='display:block;padding:12px 14px'><div style='display:flex;justify-content:space-between;align-items:center;margin-bottom:3px'><b style='font-size:14px;color:#DC2626'>{str(row['combo'])}</b><b style='color:#DC2626;font-size:14px'>{row['rate']:.1f}%</b></div><div style='font-size:12px;font-weight:700;color:#0F172A;margin-bottom:4px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{str(row.get('series',''))}</span></div><div style='background:#F1F5F9;border-radius:4px;height:6px;overflow:hidden'><div style='width:{pct/2}%;height:6px;background:#F87171;border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
-                st.markdown('</div>',unsafe_allow_html=True)
+            sort_map={"오차량 큰 순":("오차량",False),"예측수요 큰 순":("forecast",False),"실수주 큰 순":("actual",False),"달성률 높은 순":("달성률(%)",False),"달성률 낮은 순":("달성률(%)",True)}
+            sc,sa=sort_map[sort_by]
+            df_det2=df_det   # 전체 정렬 없음 — 표시 행 · 상위 목록만 top_rows / top_lists 로 골라 정렬
+            if search:   # 검색은 색인(또는 SQL)으로 — 일치 행 번호만 받아 조회 결과에서 추림
+                def _search_rows():
+                    if star is db:
+                        return df_det.loc[db.row_ids(**flt,search=search)]
+                    # 필터 행 위치 ∩ 검색 색인 일치 → 조회 결과(필터 행 위치 순)에서 해당 순번만 추림
+                    pos=np.arange(len(star.fact))[mg_index.positions(**flt)]
+                    return df_det.iloc[np.searchsorted(pos,search_idx.positions(star,pos,search))]
+                df_det2=memo("search_rows", data_ver, flt, _search_rows, search=search)
+                if star is not db:   # 부분 일치가 없으면 색인이 초성 → 자모 유사 검색으로 넘어감 — 가까운 순 후보 안내
+                    s_mode,_,s_top=search_idx.lookup(search,search_idx.present(star,mg_index.positions(**flt)))
+                    if s_mode in ("chosung","fuzzy"):
+                        st.caption(f"'{search}' 와 정확히 일치하는 항목이 없어 {'초성' if s_mode=='chosung' else '유사'} 검색 결과를 표시합니다 — 가까운 순: "+", ".join(s_top))
+                px_idx,px_cs=combo_prefixes(flt)
+                px_tot=px_idx.family(px_cs,search.strip())
+                if search.strip() and px_tot["n"]>0:   # 검색어가 콤보 코드 접두어이기도 하면 계열 합계 (누적합 차 — 행 재조회 없음)
+                    px_rate=round(px_tot["actual"]/px_tot["forecast"]*100,1) if px_tot["forecast"]>0 else 0.0
+                    st.caption(f"콤보 코드 '{search.strip().upper()}' 계열: 콤보 {px_tot['combos']:,}개 · 예측수요 {px_tot['forecast']:,} · 실수주 {px_tot['actual']:,} · 달성률 {px_rate:.1f}% · 자동 완성: "+", ".join(px_idx.complete(search.strip(),px_cs)))
+
+            total_rows=len(df_det2)
+            st.markdown(f"<div style='font-size:14px;color:#64748B;margin-bottom:8px'>조건에 맞는 데이터 <b style='color:#1D4ED8'>{total_rows:,}건</b> 중 상위 <b style='color:#1D4ED8'>{min(show_n,total_rows)}건</b> 표시</div>",unsafe_allow_html=True)
+
+            cols_show=["ym","brand","series","combo","name","supply","forecast","actual","차이","달성률(%)"]
+            display_det=memo("detail_head", data_ver, flt, lambda: top_rows(df_det2,sc,show_n,ascending=sa)[cols_show], search=search, sort=sc, asc=sa, n=show_n).copy()
+            display_det["supply"]=display_det["supply"].astype(str).replace({"<NA>":"미분류"})
+            styled_det=(display_det.style.format({"forecast":"{:,.0f}","actual":"{:,.0f}","차이":"{:,.0f}","달성률(%)":"{:.1f}%"}).applymap(lambda v:"background:#FEE2E2;color:#991B1B" if isinstance(v,(int,float)) and v<0 else "",subset=["차이"]))
+            st.dataframe(styled_det,use_container_width=True,height=400)
+            csv_data=lambda: df_det2.sort_values(sc,ascending=sa,kind="stable")[cols_show].to_csv(index=False,encoding="utf-8-sig")   # 누를 때만 전체 정렬
+            st.download_button("⬇️  CSV 다운로드",data=csv_data,file_name=f"forecast_detail_{period_label.replace(' ','').replace('~','_')}.csv",mime="text/csv")
+
+            st.markdown("<div style='height:24px'></div>",unsafe_allow_html=True)
+
+            if not df_det2.empty:
+                t_fc=int(df_det2["forecast"].sum()); t_ac=int(df_det2["actual"].sum())
+                t_diff=t_ac-t_fc; t_rate=round(t_ac/t_fc*100,1) if t_fc>0 else 0.0
+                n_rows=len(df_det2)
+                det_rate=df_det2["달성률(%)"].to_numpy()
+                n_over110=int((det_rate>110).sum()); n_ok90_110=int(((det_rate>=90)&(det_rate<=110)).sum()); n_under90=int((det_rate<90).sum())
+                det_top=memo("detail_top", data_ver, flt, lambda: top_lists(df_det2,{
+                    "top5_err":  ("오차량",5,False,()),
+                    "top3_over": ("차이",3,False,[("차이",">",0)]),
+                    "top3_under":("차이",3,True,[("차이","<",0)]),
+                }), search=search)
+                top5_err=det_top["top5_err"][["series","combo","name","forecast","actual","차이","달성률(%)"]]
+                top3_over=det_top["top3_over"][["series","combo","name","forecast","actual","차이"]]
+                top3_under=det_top["top3_under"][["series","combo","name","forecast","actual","차이"]]
+                def _detail_sums():
+                    if star is db:   # 집계는 SQL GROUP BY
+                        b=derive(db.rollup("brand",**flt,search=search))
+                        c=derive(db.rollup(["combo","name","series"],**flt,search=search))
+                    else:
+                        b=summarize(df_det2,"brand")
+                        c=summarize(df_det2,["combo","name","series"])
+                    c=c.rename(columns={"달성률(%)":"rate"})
+                    return b.rename(columns={"달성률(%)":"rate"}), top_lists(c,{
+                        "bot5_item":("rate",5,True,[("forecast",">",0)]),
+                        "top5_item":("rate",5,False,[("forecast",">",0)]),
+                    })
+                brand_sum,item_top=memo("detail_sums", data_ver, flt, _detail_sums, search=search)
+                month_label2 = period_label
+                filter_desc = month_label2
+                if sel_supply!="전체": filter_desc+=f" · {sel_supply}"
+                if search: filter_desc+=f" · 검색: '{search}'"
+                if t_rate>=100: rate_color="highlight-green";rate_word="초과달성"
+                elif t_rate>=90: rate_color="highlight-warn";rate_word="근접"
+                else: rate_color="highlight-red";rate_word="미달"
+                diff_sign="+" if t_diff>=0 else ""; diff_color="highlight-green" if t_diff>=0 else "highlight-red"
+                summary_html=f"""<div class="an-summary"><b>{filter_desc}</b> 기준 <b>{n_rows:,}건</b> 품목 분석 결과, 예측 수요 <b class="highlight-blue">{fmt_int(t_fc)}</b>개 대비 실 수주 <b class="highlight-blue">{fmt_int(t_ac)}</b>개 — 달성률 <b class="{rate_color}">{t_rate:.1f}% ({rate_word})</b>, 오차 <b class="{diff_color}">{diff_sign}{fmt_int(t_diff)}</b>개. &nbsp;·&nbsp; 달성률 구간: <span style="color:#EF4444;font-weight:700">미달(&lt;90%) {n_under90}건</span> / <span style="color:#D97706;font-weight:700">근접(90~110%) {n_ok90_110}건</span> / <span style="color:#059669;font-weight:700">초과(&gt;110%) {n_over110}건</span></div>"""
+
+                st.markdown('<div class="analysis-card">', unsafe_allow_html=True)
+                st.markdown(f'<div class="analysis-title">🔬 현재 조건 상세 분석 · <span style="font-size:13px;color:#64748B;font-weight:500">정렬: {sort_by}</span></div>',unsafe_allow_html=True)
+                st.markdown(summary_html,unsafe_allow_html=True)
+                st.markdown("<div style='height:16px'></div>",unsafe_allow_html=True)
+
+                col_a,col_b=st.columns([3,2])
+                with col_a:
+                    st.markdown('<div class="an-section"><div class="an-section-title">📌 오차 상위 5개 품목</div>',unsafe_allow_html=True)
+                    for _,row in top5_err.iterrows():
+                        if row["달성률(%)"]>110: badge_cls,badge_txt="badge-over","초과"
+                        elif row["달성률(%)"]>=90: badge_cls,badge_txt="badge-ok","근접"
+                        else: badge_cls,badge_txt="badge-danger","미달"
+                        sign="+"; diff_c="#059669" if row["차이"]>=0 else "#DC2626"
+                        if row["차이"]<0: sign=""
+                        combo_str=str(row["combo"]); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"; series_str=str(row.get("series",""))
+                        st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge {badge_cls}' style='margin-top:2px;flex-shrink:0'>{badge_txt} {row['달성률(%)']:.0f}%</span><div style='min-width:0;flex:1'><div style='font-size:16px;font-weight:900;color:#1D4ED8;margin-bottom:2px'>{combo_str}</div><div style='font-size:13px;font-weight:700;color:#0F172A;margin-bottom:5px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{series_str}</span></div><div style='font-size:13px;color:#475569'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b> <b style='color:{diff_c}'>({sign}{fmt_int(row['차이'])})</b></div></div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
+
+                with col_b:
+                    st.markdown('<div class="an-section"><div class="an-section-title">🏷️ 브랜드별 달성률</div>',unsafe_allow_html=True)
+                    for _,row in brand_sum.sort_values("rate",ascending=False).iterrows():
+                        if row["rate"]>=100: bc,bw="#D1FAE5","#065F46"
+                        elif row["rate"]>=90: bc,bw="#FEF9C3","#92400E"
+                        else: bc,bw="#FEE2E2","#991B1B"
+                        bar_pct=min(int(row["rate"]),200)
+                        st.markdown(f"<div class='an-row' style='display:block;padding:10px 14px'><div style='display:flex;justify-content:space-between;margin-bottom:6px'><b style='color:#0F172A'>{row['brand']}</b><b style='background:{bc};color:{bw};padding:2px 10px;border-radius:99px;font-size:13px'>{row['rate']:.1f}%</b></div><div style='background:#F1F5F9;border-radius:4px;height:8px;overflow:hidden'><div style='width:{bar_pct/2}%;height:8px;background:{'#34D399' if row['rate']>=100 else '#FBBF24' if row['rate']>=90 else '#F87171'};border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
+
+                st.markdown("<div style='height:12px'></div>",unsafe_allow_html=True)
+                col_c,col_d=st.columns(2)
+                with col_c:
+                    st.markdown('<div class="an-section"><div class="an-section-title">🔺 예측 초과 상위 3개</div>',unsafe_allow_html=True)
+                    if top3_over.empty:
+                        st.markdown("<div style='color:#94A3B8;font-size:14px;padding:8px'>초과 품목 없음</div>",unsafe_allow_html=True)
+                    else:
+                        for _,row in top3_over.iterrows():
+                            name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
+                            st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge badge-over' style='margin-top:2px;flex-shrink:0'>+{fmt_int(row['차이'])}</span><div><div style='font-size:15px;font-weight:900;color:#1D4ED8'>{str(row['combo'])}</div><div style='font-size:13px;font-weight:700;color:#0F172A'>{name_str}</div><div style='font-size:13px;color:#475569;margin-top:4px'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b></div></div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
+
+                with col_d:
+                    st.markdown('<div class="an-section"><div class="an-section-title">🔻 예측 미달 상위 3개</div>',unsafe_allow_html=True)
+                    if top3_under.empty:
+                        st.markdown("<div style='color:#94A3B8;font-size:14px;padding:8px'>미달 품목 없음</div>",unsafe_allow_html=True)
+                    else:
+                        for _,row in top3_under.iterrows():
+                            name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
+                            st.markdown(f"<div class='an-row' style='align-items:flex-start;gap:12px;padding:14px 16px'><span class='an-badge badge-danger' style='margin-top:2px;flex-shrink:0'>{fmt_int(row['차이'])}</span><div><div style='font-size:15px;font-weight:900;color:#DC2626'>{str(row['combo'])}</div><div style='font-size:13px;font-weight:700;color:#0F172A'>{name_str}</div><div style='font-size:13px;color:#475569;margin-top:4px'>예측 <b>{fmt_int(row['forecast'])}</b> → 실적 <b>{fmt_int(row['actual'])}</b></div></div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
+
+                st.markdown("<div style='height:8px'></div>",unsafe_allow_html=True)
+                col_e,col_f=st.columns(2)
+                with col_e:
+                    st.markdown('<div class="an-section"><div class="an-section-title">⚠️ 달성률 하위 품목 TOP 5</div>',unsafe_allow_html=True)
+                    bot5_item=item_top["bot5_item"]
+                    for _,row in bot5_item.iterrows():
+                        pct=min(int(row["rate"]),200); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
+                        st.markdown(f"<div class='an-row' style='display:block;padding:12px 14px'><div style='display:flex;justify-content:space-between;align-items:center;margin-bottom:3px'><b style='font-size:14px;color:#DC2626'>{str(row['combo'])}</b><b style='color:#DC2626;font-size:14px'>{row['rate']:.1f}%</b></div><div style='font-size:12px;font-weight:700;color:#0F172A;margin-bottom:4px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{str(row.get('series',''))}</span></div><div style='background:#F1F5F9;border-radius:4px;height:6px;overflow:hidden'><div style='width:{pct/2}%;height:6px;background:#F87171;border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
+
+                with col_f:
+                    st.markdown('<div class="an-section"><div class="an-section-title">✅ 달성률 상위 품목 TOP 5</div>',unsafe_allow_html=True)
+                    top5_item=item_top["top5_item"]
+                    for _,row in top5_item.iterrows():
+                        pct=min(int(row["rate"]),200); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
+                        st.markdown(f"<div class='an-row' style='display:block;padding:12px 14px'><div style='display:flex;justify-content:space-between;align-items:center;margin-bottom:3px'><b style='font-size:14px;color:#059669'>{str(row['combo'])}</b><b style='color:#059669;font-size:14px'>{row['rate']:.1f}%</b></div><div style='font-size:12px;font-weight:700;color:#0F172A;margin-bottom:4px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{str(row.get('series',''))}</span></div><div style='background:#F1F5F9;border-radius:4px;height:6px;overflow:hidden'><div style='width:{pct/2}%;height:6px;background:#34D399;border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
+                    st.markdown('</div>',unsafe_allow_html=True)
 
-            with col_f:
-                st.markdown('<div class="an-section"><div class="an-section-title">✅ 달성률 상위 품목 TOP 5</div>',unsafe_allow_html=True)
-                top5_item=sr_sum[sr_sum["forecast"]>0].nlargest(5,"rate")
-                for _,row in top5_item.iterrows():
-                    pct=min(int(row["rate"]),200); name_str=str(row.get("name","")) if str(row.get("name","")) not in ("nan","") else "—"
-                    st.markdown(f"<div class='an-row' style='display:block;padding:12px 14px'><div style='display:flex;justify-content:space-between;align-items:center;margin-bottom:3px'><b style='font-size:14px;color:#059669'>{str(row['combo'])}</b><b style='color:#059669;font-size:14px'>{row['rate']:.1f}%</b></div><div style='font-size:12px;font-weight:700;color:#0F172A;margin-bottom:4px'>{name_str}</div><div style='margin-bottom:6px'><span style='font-size:11px;background:#F1F5F9;color:#64748B;border-radius:4px;padding:2px 7px;font-weight:600'>{str(row.get('series',''))}</span></div><div style='background:#F1F5F9;border-radius:4px;height:6px;overflow:hidden'><div style='width:{pct/2}%;height:6px;background:#34D399;border-radius:4px'></div></div><div style='font-size:12px;color:#94A3B8;margin-top:4px'>예측 {fmt_int(row['forecast'])} / 실적 {fmt_int(row['actual'])}</div></div>",unsafe_allow_html=True)
                 st.markdown('</div>',unsafe_allow_html=True)
 
-            st.markdown('</div>',unsafe_allow_html=True)
-
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  도움말 탭
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 with tab_help:
+    if tab_open(tab_help):
 
-    st.markdown("""
-    <style>
-    .help-hero {
-        background: linear-gradient(135deg, #1D4ED8 0%, #1E40AF 100%);
-        border-radius: 20px; padding: 36px 40px; color: white; margin-bottom: 28px;
-        box-shadow: 0 8px 32px rgba(29,78,216,0.25);
-    }
-    .help-hero-title { font-size: 28px; font-weight: 900; letter-spacing: -0.02em; margin-bottom: 8px; }
-    .help-hero-sub   { font-size: 16px; opacity: 0.85; line-height: 1.7; }
-    .help-step-card {
-        background: white; border-radius: 16px; padding: 24px 28px;
-        box-shadow: 0 2px 12px rgba(0,0,0,0.06); margin-bottom: 16px;
-        border-left: 5px solid;
-    }
-    .help-step-num {
-        display: inline-flex; align-items: center; justify-content: center;
-        width: 32px; height: 32px; border-radius: 50%;
-        font-size: 15px; font-weight: 900; color: white;
-        margin-right: 10px; flex-shrink: 0;
-    }
-    .help-step-title { font-size: 17px; font-weight: 800; color: #0F172A; }
-    .help-step-body  { font-size: 14px; color: #475569; line-height: 2.0; margin-top: 10px; padding-left: 42px; }
-    .help-tag {
-        display: inline-block; padding: 3px 12px; border-radius: 99px;
-        font-size: 12px; font-weight: 700; margin: 2px 3px;
-    }
-    .help-tab-card {
-        background: white; border-radius: 14px; padding: 20px 24px;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05); height: 100%;
-        border-top: 4px solid;
-    }
-    .help-tab-icon  { font-size: 28px; margin-bottom: 8px; }
-    .help-tab-name  { font-size: 15px; font-weight: 800; color: #0F172A; margin-bottom: 6px; }
-    .help-tab-desc  { font-size: 13px; color: #64748B; line-height: 1.8; }
-    .help-faq-q { font-size: 15px; font-weight: 700; color: #1D4ED8; margin-bottom: 6px; }
-    .help-faq-a { font-size: 14px; color: #475569; line-height: 1.9; margin-bottom: 20px; padding-left: 4px; border-left: 3px solid #BFDBFE; padding-left: 12px; }
-    .help-tip-box {
-        background: linear-gradient(135deg, #F0FDF4 0%, #ECFDF5 100%);
-        border-radius: 12px; padding: 18px 22px;
-        border: 1.5px solid #A7F3D0; font-size: 14px;
-        color: #065F46; line-height: 2.0;
-    }
-    </style>
-
-    <!-- 히어로 배너 -->
-    <div class="help-hero">
-        <div class="help-hero-title">📦 수요예측 모니터링 대시보드</div>
-        <div class="help-hero-sub">
-            예측 수요와 실수주 데이터를 한눈에 비교하고,<br>
-            AI 어시스턴트와 함께 인사이트를 도출하는 분석 도구입니다.
+        st.markdown("""
+        <style>
+        .help-hero {
+            background: linear-gradient(135deg, #1D4ED8 0%, #1E40AF 100%);
+            border-radius: 20px; padding: 36px 40px; color: white; margin-bottom: 28px;
+            box-shadow: 0 8px 32px rgba(29,78,216,0.25);
+        }
+        .help-hero-title { font-size: 28px; font-weight: 900; letter-spacing: -0.02em; margin-bottom: 8px; }
+        .help-hero-sub   { font-size: 16px; opacity: 0.85; line-height: 1.7; }
+        .help-step-card {
+            background: white; border-radius: 16px; padding: 24px 28px;
+            box-shadow: 0 2px 12px rgba(0,0,0,0.06); margin-bottom: 16px;
+            border-left: 5px solid;
+        }
+        .help-step-num {
+            display: inline-flex; align-items: center; justify-content: center;
+            width: 32px; height: 32px; border-radius: 50%;
+            font-size: 15px; font-weight: 900; color: white;
+            margin-right: 10px; flex-shrink: 0;
+        }
+        .help-step-title { font-size: 17px; font-weight: 800; color: #0F172A; }
+        .help-step-body  { font-size: 14px; color: #475569; line-height: 2.0; margin-top: 10px; padding-left: 42px; }
+        .help-tag {
+            display: inline-block; padding: 3px 12px; border-radius: 99px;
+            font-size: 12px; font-weight: 700; margin: 2px 3px;
+        }
+        .help-tab-card {
+            background: white; border-radius: 14px; padding: 20px 24px;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.05); height: 100%;
+            border-top: 4px solid;
+        }
+        .help-tab-icon  { font-size: 28px; margin-bottom: 8px; }
+        .help-tab-name  { font-size: 15px; font-weight: 800; color: #0F172A; margin-bottom: 6px; }
+        .help-tab-desc  { font-size: 13px; color: #64748B; line-height: 1.8; }
+        .help-faq-q { font-size: 15px; font-weight: 700; color: #1D4ED8; margin-bottom: 6px; }
+        .help-faq-a { font-size: 14px; color: #475569; line-height: 1.9; margin-bottom: 20px; padding-left: 4px; border-left: 3px solid #BFDBFE; padding-left: 12px; }
+        .help-tip-box {
+            background: linear-gradient(135deg, #F0FDF4 0%, #ECFDF5 100%);
+            border-radius: 12px; padding: 18px 22px;
+            border: 1.5px solid #A7F3D0; font-size: 14px;
+            color: #065F46; line-height: 2.0;
+        }
+        </style>
+
+        <!-- 히어로 배너 -->
+        <div class="help-hero">
+            <div class="help-hero-title">📦 수요예측 모니터링 대시보드</div>
+            <div class="help-hero-sub">
+                예측 수요와 실수주 데이터를 한눈에 비교하고,<br>
+                AI 어시스턴트와 함께 인사이트를 도출하는 분석 도구입니다.
+            </div>
         </div>
-    </div>
-    """, unsafe_allow_html=True)
+        """, unsafe_allow_html=True)
 
-    # ── STEP 가이드 ──
-    st.markdown("### 🚀 시작하기 — 3단계")
-
-    steps = [
-        ("#3B82F6", "#DBEAFE", "1", "데이터 준비",
-         """CSV 파일 2개를 앱과 같은 폴더에 위치시키세요.<br>
-         <span class='help-tag' style='background:#DBEAFE;color:#1D4ED8'>forecast_data.csv</span> — 예측 데이터 (ym, brand, series, combo, name, supply, forecast 컬럼)<br>
-         <span class='help-tag' style='background:#DBEAFE;color:#1D4ED8'>actual_data.csv</span> — 실수주 데이터 (ym, combo, actual 컬럼)<br>
-         📌 파일이 없어도 샘플 데이터로 자동 실행됩니다."""),
-        ("#10B981", "#D1FAE5", "2", "필터 설정",
-         """사이드바에서 분석 조건을 선택하세요.<br>
-         <span class='help-tag' style='background:#D1FAE5;color:#065F46'>📅 기준 년월</span> 분석할 월 선택 (최신순 정렬)<br>
-         <span class='help-tag' style='background:#D1FAE5;color:#065F46'>🏷️ 브랜드</span> 보고 싶은 브랜드만 선택 (다중 선택 가능)<br>
-         <span class='help-tag' style='background:#D1FAE5;color:#065F46'>🏭 공급단</span> 특정 공급처만 필터링 (전체 선택 시 전부 표시)"""),
-        ("#8B5CF6", "#EDE9FE", "3", "AI 챗봇 활성화 (선택)",
-         """사이드바 하단에서 Gemini API 키를 입력하면 AI 분석이 활성화됩니다.<br>
-         <span class='help-tag' style='background:#EDE9FE;color:#5B21B6'>🔑 API 키 발급</span> aistudio.google.com → Get API key → Create API key<br>
-         <span class='help-tag' style='background:#EDE9FE;color:#5B21B6'>💬 빠른 질문</span> 버튼 클릭 또는 직접 질문 입력<br>
-         📌 API 키 없이도 앱의 모든 차트·분석 기능은 정상 사용 가능합니다."""),
-    ]
+        # ── STEP 가이드 ──
+        st.markdown("### 🚀 시작하기 — 3단계")
+
+        steps = [
+            ("#3B82F6", "#DBEAFE", "1", "데이터 준비",
+             """CSV 파일 2개를 앱과 같은 폴더에 위치시키세요.<br>
+             <span class='help-tag' style='background:#DBEAFE;color:#1D4ED8'>forecast_data.csv</span> — 예측 데이터 (ym, brand, series, combo, name, supply, forecast 컬럼)<br>
+             <span class='help-tag' style='background:#DBEAFE;color:#1D4ED8'>actual_data.csv</span> — 실수주 데이터 (ym, combo, actual 컬럼)<br>
+             📌 파일이 없어도 샘플 데이터로 자동 실행됩니다."""),
+            ("#10B981", "#D1FAE5", "2", "필터 설정",
+             """사이드바에서 분석 조건을 선택하세요.<br>
+             <span class='help-tag' style='background:#D1FAE5;color:#065F46'>📅 기준 년월</span> 분석할 월 선택 (최신순 정렬)<br>
+             <span class='help-tag' style='background:#D1FAE5;color:#065F46'>🏷️ 브랜드</span> 보고 싶은 브랜드만 선택 (다중 선택 가능)<br>
+             <span class='help-tag' style='background:#D1FAE5;color:#065F46'>🏭 공급단</span> 특정 공급처만 필터링 (전체 선택 시 전부 표시)"""),
+            ("#8B5CF6", "#EDE9FE", "3", "AI 챗봇 활성화 (선택)",
+             """사이드바 하단에서 Gemini API 키를 입력하면 AI 분석이 활성화됩니다.<br>
+             <span class='help-tag' style='background:#EDE9FE;color:#5B21B6'>🔑 API 키 발급</span> aistudio.google.com → Get API key → Create API key<br>
+             <span class='help-tag' style='background:#EDE9FE;color:#5B21B6'>💬 빠른 질문</span> 버튼 클릭 또는 직접 질문 입력<br>
+             📌 API 키 없이도 앱의 모든 차트·분석 기능은 정상 사용 가능합니다."""),
+        ]
 
-    for color, bg, num, title, body in steps:
-        st.markdown(f"""
-        <div class="help-step-card" style="border-left-color:{color}">
-            <div style="display:flex;align-items:center">
-                <span class="help-step-num" style="background:{color}">STEP {num}</span>
-                <span class="help-step-title">{title}</span>
-            </div>
-            <div class="help-step-body">{body}</div>
-        </div>""", unsafe_allow_html=True)
-
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-
-    # ── 탭별 기능 소개 ──
-    st.markdown("### 📑 탭별 기능 소개")
-    c1, c2, c3, c4 = st.columns(4)
-    tab_info = [
-        (c1, "#3B82F6", "📊", "개요",
-         "선택 월의 핵심 KPI(예측/실수주/달성률/오차)와 브랜드별 비교 차트, 공급단 비중, 자동 분석 요약을 한눈에 확인"),
-        (c2, "#10B981", "📈", "월별 추이",
-         "브랜드 또는 시리즈별로 여러 달의 예측·실적 추이를 꺾은선 차트로 비교. 달성률 변화 추이도 함께 확인 가능"),
-        (c3, "#F59E0B", "🔎", "시리즈 분석",
-         "시리즈별 예측·실수주·차이량을 Top N으로 정렬해 수평 막대차트로 표시. 달성률 구간 분포와 상세 표 제공"),
-        (c4, "#8B5CF6", "📋", "상세 데이터",
-         "품목 단위 전체 데이터 조회·검색·정렬. CSV 다운로드 및 오차 상위/하위 품목 동적 분석 카드 제공"),
-    ]
-    for col, color, icon, name, desc in tab_info:
-        with col:
+        for color, bg, num, title, body in steps:
             st.markdown(f"""
-            <div class="help-tab-card" style="border-top-color:{color}">
-                <div class="help-tab-icon">{icon}</div>
-                <div class="help-tab-name">{name}</div>
-                <div class="help-tab-desc">{desc}</div>
+            <div class="help-step-card" style="border-left-color:{color}">
+                <div style="display:flex;align-items:center">
+                    <span class="help-step-num" style="background:{color}">STEP {num}</span>
+                    <span class="help-step-title">{title}</span>
+                </div>
+                <div class="help-step-body">{body}</div>
             </div>""", unsafe_allow_html=True)
 
-    st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
+        st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+
+        # ── 탭별 기능 소개 ──
+        st.markdown("### 📑 탭별 기능 소개")
+        c1, c2, c3, c4 = st.columns(4)
+        tab_info = [
+            (c1, "#3B82F6", "📊", "개요",
+             "선택 월의 핵심 KPI(예측/실수주/달성률/오차)와 브랜드별 비교 차트, 공급단 비중, 자동 분석 요약을 한눈에 확인"),
+            (c2, "#10B981", "📈", "월별 추이",
+             "브랜드 또는 시리즈별로 여러 달의 예측·실적 추이를 꺾은선 차트로 비교. 달성률 변화 추이도 함께 확인 가능"),
+            (c3, "#F59E0B", "🔎", "시리즈 분석",
+             "시리즈별 예측·실수주·차이량을 Top N으로 정렬해 수평 막대차트로 표시. 달성률 구간 분포와 상세 표 제공"),
+            (c4, "#8B5CF6", "📋", "상세 데이터",
+             "품목 단위 전체 데이터 조회·검색·정렬. CSV 다운로드 및 오차 상위/하위 품목 동적 분석 카드 제공"),
+        ]
+        for col, color, icon, name, desc in tab_info:
+            with col:
+                st.markdown(f"""
+                <div class="help-tab-card" style="border-top-color:{color}">
+                    <div class="help-tab-icon">{icon}</div>
+                    <div class="help-tab-name">{name}</div>
+                    <div class="help-tab-desc">{desc}</div>
+                </div>""", unsafe_allow_html=True)
 
-    # ── FAQ ──
-    st.markdown("### ❓ 자주 묻는 질문")
-    col_faq1, col_faq2 = st.columns(2)
+        st.markdown("<div style='height:24px'></div>", unsafe_allow_html=True)
 
-    with col_faq1:
-        st.markdown("""
-        <div class='help-faq-q'>Q. 데이터 파일은 어디에 넣어야 하나요?</div>
-        <div class='help-faq-a'>앱 파일(app.py)과 같은 폴더에 <b>forecast_data.csv</b>와 <b>actual_data.csv</b>를 넣으면 자동으로 불러옵니다. 파일이 없으면 샘플 데이터로 실행됩니다.</div>
+        # ── FAQ ──
+        st.markdown("### ❓ 자주 묻는 질문")
+        col_faq1, col_faq2 = st.columns(2)
 
-        <div class='help-faq-q'>Q. 달성률은 어떻게 계산되나요?</div>
-        <div class='help-faq-a'><b>달성률(%) = 실수주 ÷ 예측수요 × 100</b><br>
-        100% 이상이면 초과달성(초록), 90~100%는 근접(노랑), 90% 미만은 미달(빨강)으로 표시됩니다.</div>
+        with col_faq1:
+            st.markdown("""
+            <div class='help-faq-q'>Q. 데이터 파일은 어디에 넣어야 하나요?</div>
+            <div class='help-faq-a'>앱 파일(app.py)과 같은 폴더에 <b>forecast_data.csv</b>와 <b>actual_data.csv</b>를 넣으면 자동으로 불러옵니다. 파일이 없으면 샘플 데이터로 실행됩니다.</div>
 
-        <div class='help-faq-q'>Q. 브랜드를 여러 개 선택할 수 있나요?</div>
-        <div class='help-faq-a'>네! 사이드바 브랜드 필터에서 원하는 브랜드를 다중 선택할 수 있습니다. 선택을 모두 해제하면 전체 브랜드가 표시됩니다.</div>
-        """, unsafe_allow_html=True)
+            <div class='help-faq-q'>Q. 달성률은 어떻게 계산되나요?</div>
+            <div class='help-faq-a'><b>달성률(%) = 실수주 ÷ 예측수요 × 100</b><br>
+            100% 이상이면 초과달성(초록), 90~100%는 근접(노랑), 90% 미만은 미달(빨강)으로 표시됩니다.</div>
 
-    with col_faq2:
-        st.markdown("""
-        <div class='help-faq-q'>Q. AI 챗봇이 답변을 못하면 어떻게 되나요?</div>
-        <div class='help-faq-a'>Gemini API 키가 없거나 한도 초과 시에도 앱의 모든 차트와 분석 기능은 정상 동작합니다. 챗봇 기능만 비활성화됩니다.</div>
+            <div class='help-faq-q'>Q. 브랜드를 여러 개 선택할 수 있나요?</div>
+            <div class='help-faq-a'>네! 사이드바 브랜드 필터에서 원하는 브랜드를 다중 선택할 수 있습니다. 선택을 모두 해제하면 전체 브랜드가 표시됩니다.</div>
+            """, unsafe_allow_html=True)
 
-        <div class='help-faq-q'>Q. CSV 다운로드는 어디서 하나요?</div>
-        <div class='help-faq-a'><b>📋 상세 데이터</b> 탭 하단의 <b>⬇️ CSV 다운로드</b> 버튼을 클릭하면 현재 필터·검색 조건이 적용된 데이터를 저장할 수 있습니다.</div>
+        with col_faq2:
+            st.markdown("""
+            <div class='help-faq-q'>Q. AI 챗봇이 답변을 못하면 어떻게 되나요?</div>
+            <div class='help-faq-a'>Gemini API 키가 없거나 한도 초과 시에도 앱의 모든 차트와 분석 기능은 정상 동작합니다. 챗봇 기능만 비활성화됩니다.</div>
 
-        <div class='help-faq-q'>Q. 탭 순서를 바꿀 수 있나요?</div>
-        <div class='help-faq-a'>네! 상단 탭을 <b>드래그 앤 드롭</b>으로 원하는 순서로 재배치할 수 있습니다.</div>
-        """, unsafe_allow_html=True)
+            <div class='help-faq-q'>Q. CSV 다운로드는 어디서 하나요?</div>
+            <div class='help-faq-a'><b>📋 상세 데이터</b> 탭 하단의 <b>⬇️ CSV 다운로드</b> 버튼을 클릭하면 현재 필터·검색 조건이 적용된 데이터를 저장할 수 있습니다.</div>
 
-    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+            <div class='help-faq-q'>Q. 탭 순서를 바꿀 수 있나요?</div>
+            <div class='help-faq-a'>네! 상단 탭을 <b>드래그 앤 드롭</b>으로 원하는 순서로 재배치할 수 있습니다.</div>
+            """, unsafe_allow_html=True)
 
-    # ── 팁 박스 ──
-    st.markdown("""
-    <div class="help-tip-box">
-        💡 <b>사용 팁</b><br>
-        &nbsp;&nbsp;① 사이드바 필터를 바꾸면 <b>모든 탭이 실시간으로 업데이트</b>됩니다.<br>
-        &nbsp;&nbsp;② AI 챗봇에 <b>"이번 달 요약해줘"</b>라고 물어보면 현재 필터 기준 데이터를 자동 분석해줍니다.<br>
-        &nbsp;&nbsp;③ 시리즈 분석 탭의 <b>Top N 슬라이더</b>로 표시 품목 수를 조절할 수 있습니다.<br>
-        &nbsp;&nbsp;④ 상세 데이터 탭의 <b>검색창</b>에 콤보코드·시리즈명·품목명을 입력해 빠르게 찾을 수 있습니다.
-    </div>
-    """, unsafe_allow_html=True)
+        st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+
+        # ── 팁 박스 ──
+        st.markdown("""
+        <div class="help-tip-box">
+            💡 <b>사용 팁</b><br>
+            &nbsp;&nbsp;① 사이드바 필터를 바꾸면 <b>모든 탭이 실시간으로 업데이트</b>됩니다.<br>
+            &nbsp;&nbsp;② AI 챗봇에 <b>"이번 달 요약해줘"</b>라고 물어보면 현재 필터 기준 데이터를 자동 분석해줍니다.<br>
+            &nbsp;&nbsp;③ 시리즈 분석 탭의 <b>Top N 슬라이더</b>로 표시 품목 수를 조절할 수 있습니다.<br>
+            &nbsp;&nbsp;④ 상세 데이터 탭의 <b>검색창</b>에 콤보코드·시리즈명·품목명을 입력해 빠르게 찾을 수 있습니다.
+        </div>
+        """, unsafe_allow_html=True)
@@ -0,0 +1,1044 @@
+"""
+수요예측 대시보드 데이터 계층
+- 원본 탐색 (평면 CSV 또는 ym=YYYY-MM 파티션 폴더) / 정규화
+- 월 파티션 정규화 저장소 (Parquet, 증분 동기화) + 월 단위 파생 집계 캐시
+- 공급단 매핑 (기본 SUPPLY_NORM + supply_map.csv 덮어쓰기)
+- 예측·실적 병합 팩트 테이블 (mg_all, 차원 컬럼은 Categorical)
+- 스타 스키마 (콤보 차원 + 월별 narrow 팩트)
+- 공유 팩트 파일 (Feather 메모리 맵 — 워커 프로세스 간 1벌 공유)
+"""
+import io
+import os
+import re
+import glob
+import json
+import codecs
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+try:
+    import pyarrow as pa   # Parquet 캐시 · 멀티스레드 CSV 파서 (없으면 캐시 없이 pandas 파서)
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as pa_feather
+    _HAS_ARROW = True
+except ImportError:
+    _HAS_ARROW = False
+
+log = logging.getLogger(__name__)
+
+
+# ══════════════════════════════════════════════
+#  경로
+# ══════════════════════════════════════════════
+APP_DIR    = os.path.dirname(os.path.abspath(__file__))
+SUPPLY_MAP_FILE = "supply_map.csv"
+CACHE_DIR  = os.path.join(APP_DIR, ".data_cache")
+
+def _candidate_dirs():
+    return [
+        APP_DIR,
+        os.path.join(APP_DIR, "outputs"),
+        "/mnt/user-data/outputs",
+    ]
+
+def find_data_file(fname):
+    """후보 디렉터리 순서대로 탐색 — 없으면 None"""
+    for d in _candidate_dirs():
+        p = os.path.join(d, fname)
+        if os.path.exists(p):
+            return p
+    return None
+
+
+# ══════════════════════════════════════════════
+#  공급단 정규화
+# ══════════════════════════════════════════════
+SUPPLY_VALID = ['시디즈(평택)', '베트남', '외주/상품']
+SUPPLY_NA    = '<NA>'
+_NULL_TOKENS = ['', 'nan', 'NaN', 'None', SUPPLY_NA]
+
+# 기본 매핑 — supply_map.csv 는 이 위에 덮어쓰는 추가·수정분 (파일이 없어도 기존 공급처는 정규화)
+SUPPLY_NORM = {
+    '시디즈':      '시디즈(평택)', '의자내작':    '시디즈(평택)',
+    '시디즈제품':  '시디즈(평택)', '시디즈평택':  '시디즈(평택)',
+    '의자평택상품':'시디즈(평택)', '의자양지상품':'시디즈(평택)',
+    '제품':        '시디즈(평택)', '평택의자':    '시디즈(평택)',
+    'VN의자':      '베트남',       '베트남의자':  '베트남',
+    '시디즈VN':    '베트남',       '시디즈vn':    '베트남',
+    'FVN2':        '베트남',       '베트남상품':  '베트남',
+    '베트남제품':  '베트남',
+    '의자외작':    '외주/상품',    '수입상품':    '베트남',
+    '외주상품':    '외주/상품',    '상품':        '외주/상품',
+    '진영':        '외주/상품',    '웰시트':      '외주/상품',
+    '이화하이':    '외주/상품',    '웰켐':        '외주/상품',
+    '한국스틸웨어':'외주/상품',    '다진':        '외주/상품',
+    '에브라임':    '외주/상품',    '의자안성상품':'외주/상품',
+    '의자상품':    '외주/상품',
+}
+
+def load_supply_map():
+    """원본 공급단 표기 → 표준 공급단 — 기본 매핑(SUPPLY_NORM) + supply_map.csv 덮어쓰기"""
+    mapping = dict(SUPPLY_NORM)
+    p = find_data_file(SUPPLY_MAP_FILE)
+    if p is None:
+        log.info("%s 없음 — 기본 공급단 매핑만 사용", SUPPLY_MAP_FILE)
+        return mapping
+    m = pd.read_csv(p, comment="#", dtype=str).dropna()
+    mapping.update(zip(m["raw"].str.strip(), m["supply"].str.strip()))
+    return mapping
+
+def normalize_supply(s, mapping):
+    """
+    공급단 정규화 — 고유값 단위로 매핑 테이블 조회 후 코드로 펼침 (행 단위 lambda 없음)
+    반환: (정규화 Series, {매핑 없는 원본값: 행 수})
+    """
+    raw = s.astype(str).str.strip()
+    codes, uniques = pd.factorize(raw)
+    table = {v: v for v in SUPPLY_VALID}
+    table.update({t: SUPPLY_NA for t in _NULL_TOKENS})
+    table.update(mapping)
+    mapped = pd.Series(uniques).map(table)
+    missing = mapped.isna().to_numpy()
+    mapped = mapped.where(mapped.isin(SUPPLY_VALID), SUPPLY_NA).to_numpy()
+    counts = np.bincount(codes, minlength=len(uniques))
+    report = {u: int(c) for u, c, miss in zip(uniques, counts, missing) if miss}
+    return pd.Series(mapped[codes], index=s.index), report
+
+
+# ══════════════════════════════════════════════
+#  부품류 분류
+# ══════════════════════════════════════════════
+# 시리즈명에 아래 키워드가 (대소문자 무관) 포함되면 부품류 — KPI 분류와 공급단 도넛이 공유
+PARTS_KW = ['ACCESSORY','악세사리','이지리페어','EASY REPAIR','EASY-REPAIR','EASYREPAIR',
+            '부품','PARTS','PART','리페어','REPAIR','패브릭','FABRIC','가스','실린더']
+
+def parts_pattern(keywords=PARTS_KW):
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+def classify_parts(series, keywords=PARTS_KW):
+    """시리즈 → 부품류 여부(bool) — 고유 시리즈만 정규식 1회 검사 후 코드로 매핑"""
+    codes, uniques = pd.factorize(series)
+    pat  = parts_pattern(keywords)
+    flag = np.array([bool(pat.search(str(v))) for v in uniques] + [False])
+    return pd.Series(flag[codes], index=series.index)   # codes == -1 (결측) → 마지막 False
+
+
+# ══════════════════════════════════════════════
+#  정규화
+# ══════════════════════════════════════════════
+QTY_COLS = ["forecast", "actual"]
+
+# ── 원본 스키마 (타입 추론 없음) ──
+# 반복이 많은 차원은 사전 인코딩(Categorical) 으로 파싱 → 정리(strip 등)를 고유값 단위로
+# 수량은 int32, 스키마에 없는 컬럼은 문자열
+SOURCE_DTYPES = {
+    "ym": "category", "brand": "category", "series": "category", "supply": "category",
+    "combo": "str", "name": "str", "forecast": "int32", "actual": "int32",
+}
+# pandas 기본 결측 표기 — pyarrow 파서도 같은 값을 결측으로
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+             "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+def _sample_frames():
+    np.random.seed(7)
+    dates  = ["2025-06","2025-07","2025-08","2025-10",
+              "2025-11","2025-12","2026-01","2026-02"]
+    brands = ["데스커","일룸","퍼시스","시디즈"]
+    series_list = ["ACCESSORY","IBLE","SPOON","SODA",
+                   "T60","RINGO","T20","GX","AROUND","PLT"]
+    supply_pool = ['시디즈(평택)', '베트남', '외주/상품']
+    rows, a_rows = [], []
+    for ym in dates:
+        for b in brands:
+            for s in series_list:
+                sup = np.random.choice(supply_pool + [np.nan], p=[0.28,0.28,0.28,0.16])
+                rows.append({'ym':ym,'brand':b,'series':s,
+                             'combo':f"{s[:6]}-{b[:2]}",'name':f"{b} {s}",
+                             'forecast':int(np.random.randint(200,4000)),'supply':sup})
+                a_rows.append({'ym':ym,'combo':f"{s[:6]}-{b[:2]}",
+                               'actual':max(0,int(np.random.normal(1800,900)))})
+    return pd.DataFrame(rows), pd.DataFrame(a_rows)
+
+def _arrow_type(dtype):
+    return {"category": pa.dictionary(pa.int32(), pa.string()),
+            "int32": pa.int32()}.get(dtype, pa.string())
+
+def read_csv(src):
+    """
+    원본 CSV → DataFrame (SOURCE_DTYPES 스키마 고정 — 월 파티션마다 타입이 달라지지 않도록)
+    pyarrow 가 있으면 멀티스레드 파서, 수량에 정수가 아닌 값이 섞이면 pandas 파서로 관대하게 재시도
+    헤더의 UTF-8 BOM(actual_data.csv 의 '\ufeffym')은 제거
+    """
+    if _HAS_ARROW:
+        try:
+            tbl = pa_csv.read_csv(
+                pa.BufferReader(src) if isinstance(src, bytes) else src,
+                read_options=pa_csv.ReadOptions(encoding="utf8"),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={c: _arrow_type(t) for c, t in SOURCE_DTYPES.items()},
+                    null_values=NA_VALUES, strings_can_be_null=True),
+            )
+            df = tbl.to_pandas()
+            for c in df.select_dtypes(include="object").columns:   # 결측 None → NaN (pandas 파서와 동일)
+                df[c] = df[c].where(df[c].notna(), np.nan)
+            return df.rename(columns=lambda c: c.lstrip("\ufeff"))
+        except pa.ArrowInvalid as e:
+            log.warning("스키마 파싱 실패 (%s) — pandas 파서로 재시도", e)
+    df = pd.read_csv(io.BytesIO(src) if isinstance(src, bytes) else src, encoding="utf-8-sig",
+                     dtype={c: t for c, t in SOURCE_DTYPES.items() if c not in QTY_COLS})
+    return df.rename(columns=lambda c: c.lstrip("\ufeff"))
+
+def read_parallel(readers):
+    """{키: reader} → {키: DataFrame} — pyarrow 파서는 GIL 을 풀어 두므로 스레드로 동시 파싱"""
+    if len(readers) <= 1:
+        return {k: r() for k, r in readers.items()}
+    with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(readers))) as ex:
+        futs = {k: ex.submit(r) for k, r in readers.items()}
+        return {k: fut.result() for k, fut in futs.items()}
+
+def clean_frame(df, required, supply_map):
+    """행 단위 정리 (문자열 strip · 브랜드/공급단 통일) — 행끼리 독립이라 월 파티션별로 적용 가능"""
+    for col in required:
+        if col not in df.columns: df[col] = np.nan
+    cat_cols = list(df.select_dtypes(include=['category']).columns)
+    for col in cat_cols:
+        # 사전만 정리 후 코드로 펼침 — 결측은 astype(str) 과 같이 'nan' (행 단위 strip 은 다시 하지 않음)
+        cats = df[col].cat.categories.astype(str).str.strip().to_numpy(dtype=object)
+        df[col] = np.append(cats, "nan")[df[col].cat.codes.to_numpy()]
+    for col in df.select_dtypes(include=['object','string']).columns.difference(cat_cols):
+        df[col] = df[col].astype(str).str.strip()
+    if 'brand' in df.columns:
+        df['brand'] = df['brand'].replace({'알로소': '시디즈'})
+    if 'supply' in df.columns:
+        df['supply'], unmapped = normalize_supply(df['supply'], supply_map)
+        if unmapped:
+            log.warning("공급단 매핑 없음 → '%s' 처리 (%s 에 추가 필요): %s",
+                        SUPPLY_NA, SUPPLY_MAP_FILE, unmapped)
+    return df
+
+def clean_forecast(f, supply_map):
+    """예측 행 정리 + 비정상 시리즈 제거 (브랜드명 시리즈는 전 월 기준이라 finish_forecast 에서)"""
+    f = clean_frame(f, ['ym','series','brand','combo','supply','name'], supply_map)
+    f = f.dropna(subset=['series','brand','combo'])
+    f = f[~f['series'].astype(str).str.strip().isin(['nan','NaN','None',''])]
+    f = f[~f['series'].astype(str).str.isnumeric()]
+    return f[f['series'].astype(str).str.len() >= 2]
+
+def clean_actual(a, supply_map):
+    return clean_frame(a, ['ym','combo','actual'], supply_map)
+
+def forecast_brands(f):
+    return sorted(set(f['brand'].dropna().astype(str).str.strip().unique()))
+
+def combo_supply_ref(a):
+    """실적의 combo → supply (월 오름차순 첫 행 기준)"""
+    if 'combo' not in a.columns or 'supply' not in a.columns:
+        return pd.Series(dtype=object)
+    return a.drop_duplicates('combo').set_index('combo')['supply']
+
+def finish_forecast(f, brands, ref):
+    """
+    전 월 기준이 필요한 예측 마무리
+    · 브랜드명과 같은 시리즈 제거 (brands: 예측 전체의 브랜드)
+    · combo 기반 supply 보정 — actual의 combo→supply 매핑을 forecast에도 적용
+    """
+    f = f[~f['series'].astype(str).isin(set(brands))]
+    if 'actual' in f.columns or ref.empty:
+        return f
+    f = f.copy()
+    f['supply'] = f['combo'].map(ref).fillna(f['supply'])
+    return f
+
+def normalize_frames(f, a, supply_map=None):
+    """문자열 정리 · 브랜드/공급단 통일 · 비정상 시리즈 제거"""
+    if supply_map is None:
+        supply_map = load_supply_map()
+    a = clean_actual(a, supply_map)
+    f = clean_forecast(f, supply_map)
+    return finish_forecast(f, forecast_brands(f), combo_supply_ref(a)), a
+
+
+# ══════════════════════════════════════════════
+#  원본 월 파티션
+# ══════════════════════════════════════════════
+# 원본은 두 형태 모두 허용 — {kind}/ym=YYYY-MM/*.csv 폴더가 있으면 우선, 없으면 평면 CSV
+KINDS    = ["forecast", "actual"]
+_YM_LINE = re.compile(rb"\d{4}-\d{2},")
+
+def find_partition_dir(kind):
+    """ym=YYYY-MM 하위 폴더를 가진 원본 폴더 (예: forecast/ym=2025-10/) — 없으면 None"""
+    for d in _candidate_dirs():
+        p = os.path.join(d, kind)
+        if os.path.isdir(p) and any(n.startswith("ym=") for n in os.listdir(p)):
+            return p
+    return None
+
+def source_files(kind):
+    d = find_partition_dir(kind)
+    if d:
+        return sorted(glob.glob(os.path.join(d, "ym=*", "*.csv")))
+    p = find_data_file(f"{kind}_data.csv")
+    return [p] if p else []
+
+def split_partitions(path):
+    """
+    CSV 원문 → (헤더, {ym: 해당 월 행 원문}) — 파싱 없이 줄 머리의 ym 으로만 분할
+    ym 으로 시작하지 않는 줄(따옴표 안 개행 등)은 직전 행에 이어 붙임
+    """
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    if raw.startswith(codecs.BOM_UTF8):
+        raw = raw[len(codecs.BOM_UTF8):]
+    lines = raw.splitlines()
+    parts, cur = {}, None
+    for ln in lines[1:]:
+        if _YM_LINE.match(ln):
+            cur = ln[:7].decode()
+            parts.setdefault(cur, []).append(ln)
+        elif cur is not None:
+            parts[cur].append(ln)
+    return lines[0] + b"\n", {ym: b"\n".join(v) + b"\n" for ym, v in parts.items()}
+
+def _read_files(files):
+    frames = read_parallel({p: (lambda p=p: read_csv(p)) for p in files})
+    return pd.concat([frames[p] for p in files], ignore_index=True)
+
+def source_partitions(kind):
+    """
+    원본 → {ym: (digest, reader)} — reader() 는 그 월 원본만 파싱
+    · 파티션 폴더 : 월 폴더 안 CSV 들 (digest = 파일명·크기·수정시각, 내용은 읽지 않음)
+    · 평면 CSV   : 줄 머리 ym 으로 분할 (digest = 월별 원문 해시)
+    """
+    d = find_partition_dir(kind)
+    if d:
+        out = {}
+        for sub in sorted(os.listdir(d)):
+            files = sorted(glob.glob(os.path.join(d, sub, "*.csv")))
+            if sub.startswith("ym=") and files:
+                sig = [(os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns) for p in files]
+                out[sub[3:]] = (_digest(repr(sig).encode()), lambda files=files: _read_files(files))
+        return out
+    p = find_data_file(f"{kind}_data.csv")
+    if p is None:
+        return {}
+    header, parts = split_partitions(p)
+    return {ym: (_digest(header, body), lambda body=body: read_csv(header + body))
+            for ym, body in parts.items()}
+
+def write_partitions(kind, src_csv, out_dir=APP_DIR):
+    """
+    평면 CSV → {out_dir}/{kind}/ym=YYYY-MM/{kind}_data.csv 로 분할 (원문 그대로)
+    내용이 바뀐 월만 다시 씀 — 월 마감분을 기존 폴더에 합칠 때 사용
+    """
+    header, parts = split_partitions(src_csv)
+    for ym, body in parts.items():
+        p = os.path.join(out_dir, kind, f"ym={ym}", f"{kind}_data.csv")
+        if os.path.exists(p):
+            with open(p, "rb") as fh:
+                if fh.read() == header + body:
+                    continue
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        with open(p + ".tmp", "wb") as fh:
+            fh.write(header + body)
+        os.replace(p + ".tmp", p)
+    return sorted(parts)
+
+
+# ══════════════════════════════════════════════
+#  정규화 저장소 (월 파티션 Parquet)
+# ══════════════════════════════════════════════
+# store/
+#   forecast_src/{digest}.parquet  정리만 된 예측 (마무리 전)   forecast/{digest}.parquet  마무리된 예측
+#   actual/{digest}.parquet        정리된 실적                   actual_ref/{digest}.parquet  월별 combo→supply 첫 행
+#   {집계명}/ym=…/{월 digest}.parquet  월 단위 파생 집계 캐시
+#   versions/{버전}.json  버전별 매니페스트 — 원본 digest · 월별 파티션 digest · 월 digest · 예측 브랜드 · 콤보 수
+#   manifest.json         마지막으로 동기화한 매니페스트 (다음 증분 동기화의 기준)
+# 파티션은 내용 digest 이름의 불변 파일 — 버전마다 매니페스트가 가리키는 파일만 읽으므로
+# 원본이 바뀌어도 이전 버전을 조회 중인 세션은 이전 내용을 그대로 읽음
+# 최근 STORE_KEEP 개 버전이 가리키지 않는 파일만 정리 (저장소 폴더 통째 삭제 없음)
+# 정규화 로직·저장소 구성이 바뀌면 올려서 기존 매니페스트를 무효화
+CACHE_SCHEMA_VER = 5
+STORE_DIR   = os.path.join(CACHE_DIR, "store")
+VERSION_DIR = os.path.join(STORE_DIR, "versions")
+STORE_PARTS = ["forecast_src", "forecast", "actual", "actual_ref"]
+STORE_KEEP  = 2          # 파일을 남겨 둘 버전 수 (synced_store 캐시 크기와 같음)
+STORE_GRACE_SEC = 600    # 이보다 최근에 쓴 파일은 정리하지 않음 (다른 워커가 동기화 중인 파티션)
+
+def content_hash(paths):
+    """원본 내용 기반 해시 — mtime 과 무관하게 내용이 같으면 같은 키"""
+    h = hashlib.sha1(f"v{CACHE_SCHEMA_VER}".encode())
+    for p in paths:
+        with open(p, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+def watched_files():
+    """버전에 반영되는 파일 — 두 원본의 파일 목록 + 공급단 매핑"""
+    files = [p for kind in KINDS for p in source_files(kind)]
+    m = find_data_file(SUPPLY_MAP_FILE)
+    return files + ([m] if m else [])
+
+def file_signature(p):
+    """파일 서명 (크기 · 수정시각 ns · inode) — 서명이 같으면 내용을 다시 해시하지 않음"""
+    s = os.stat(p)
+    return s.st_size, s.st_mtime_ns, s.st_ino
+
+_TOKEN_SIGS = OrderedDict()   # 버전 토큰 → 그 토큰을 계산할 때의 파일 서명 (감시 스레드가 기록)
+_TOKEN_KEEP = 8
+
+def note_sources(token, sigs):
+    """감시 스레드가 토큰을 계산한 파일 서명을 기록 — 동기화가 원본을 다시 해시하지 않고 stat 만으로 확인"""
+    _TOKEN_SIGS[token] = dict(sigs)
+    _TOKEN_SIGS.move_to_end(token)
+    while len(_TOKEN_SIGS) > _TOKEN_KEEP:
+        _TOKEN_SIGS.popitem(last=False)
+
+def sources_match(version):
+    """
+    원본이 아직 version 토큰의 내용인지 — 감시 스레드가 기록한 서명이 있으면 stat 비교만,
+    감시 스레드가 발행하지 않은 토큰만 전체 내용 해시
+    """
+    sigs = _TOKEN_SIGS.get(version)
+    if sigs is None:
+        return source_token() == version
+    try:
+        return {p: file_signature(p) for p in watched_files()} == sigs
+    except OSError:   # 목록 조회와 stat 사이에 삭제
+        return False
+
+def source_token(hashes=None):
+    """
+    데이터 버전 토큰 — 파일 경로 + 내용 해시 기반 (version_layer 가 발행하는 값과 같은 계산)
+    hashes: {경로: content_hash} — None 이면 지금 파일을 모두 해시, 파일이 없으면 None
+    """
+    if hashes is None:
+        hashes = {p: content_hash([p]) for p in watched_files()}
+    if not hashes:
+        return None
+    h = hashlib.sha1()
+    for p in sorted(hashes):
+        h.update(f"{p}\0{hashes[p]}\n".encode())
+    return h.hexdigest()[:16]
+
+def _digest(*chunks):
+    h = hashlib.sha1(f"v{CACHE_SCHEMA_VER}".encode())
+    for c in chunks:
+        h.update(c)
+    return h.hexdigest()[:16]
+
+def _frame_digest(*frames):
+    return _digest(*(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+                     for df in frames))
+
+def _part_path(name, key):
+    return os.path.join(STORE_DIR, name, f"{key}.parquet")
+
+def _write_tmp(p, write):
+    """p 에 원자적 기록 — 스레드·프로세스별 임시 파일에 쓴 뒤 교체 (반쯤 쓴 파일을 읽지 않도록)"""
+    os.makedirs(os.path.dirname(p), exist_ok=True)
+    tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp)
+    os.replace(tmp, p)
+
+def _write_part(df, name):
+    """파티션 → 내용 digest 이름의 불변 파일 (같은 내용이 이미 있으면 다시 쓰지 않음) — digest 반환"""
+    key = _digest(",".join(map(str, df.columns)).encode(), _frame_digest(df).encode())
+    p = _part_path(name, key)
+    try:
+        os.utime(p)   # 이미 있음 — 수정시각만 갱신 (정리 중인 다른 워커가 지우지 않도록)
+    except FileNotFoundError:
+        _write_tmp(p, lambda tmp: df.to_parquet(tmp, index=False))
+    return key
+
+def _read_parts(parts, name, months, columns=None):
+    """
+    매니페스트의 파티션 digest({이름: {ym: digest}}) 가 가리키는 파일만 읽음
+    해당 월 파티션이 없으면 건너뜀, 가리키는 파일이 없으면 예외 (다른 버전 내용으로 대신하지 않음)
+    """
+    keys = parts.get(name, {})
+    frames = [pd.read_parquet(_part_path(name, keys[m]), columns=columns) for m in months if m in keys]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def _complete(m):
+    """매니페스트가 가리키는 파티션 파일이 모두 남아 있는지"""
+    files = [_part_path(n, k) for n, keys in m.get("parts", {}).items() for k in keys.values()]
+    if m.get("ref"):
+        files.append(_part_path("actual_ref", m["ref"]))
+    return all(map(os.path.exists, files))
+
+def _manifest_path(version=None):
+    if version is None:
+        return os.path.join(STORE_DIR, "manifest.json")
+    return os.path.join(VERSION_DIR, f"{version}.json")
+
+def _read_manifest(version=None):
+    """버전별 매니페스트 (version=None 이면 마지막 동기화 결과) — 없거나 스키마가 다르면 {}"""
+    try:
+        with open(_manifest_path(version), encoding="utf-8") as fh:
+            m = json.load(fh)
+        return m if m.get("schema") == CACHE_SCHEMA_VER else {}
+    except Exception:
+        return {}
+
+def _write_manifest(m, version=None):
+    """파티션을 모두 쓴 뒤 마지막에 교체 — 매니페스트가 곧 커밋"""
+    text = json.dumps(m, ensure_ascii=False, indent=1, sort_keys=True)
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    if version is not None:
+        _write_tmp(_manifest_path(version), write)
+    _write_tmp(_manifest_path(), write)
+
+def _versions():
+    """버전별 매니페스트의 버전 — 최근 기록 순"""
+    try:
+        names = [f[:-5] for f in os.listdir(VERSION_DIR) if f.endswith(".json")]
+    except OSError:
+        return []
+    mtime = lambda v: os.path.getmtime(_manifest_path(v)) if os.path.exists(_manifest_path(v)) else 0
+    return sorted(names, key=mtime, reverse=True)
+
+def live_manifests():
+    """정리 기준 매니페스트 — 마지막 동기화 결과 + 최근 STORE_KEEP 개 버전 (이 파일들이 가리키는 파티션은 보존)"""
+    return [m for m in [_read_manifest()] + [_read_manifest(v) for v in _versions()[:STORE_KEEP]] if m]
+
+def _prune_store():
+    """
+    살아 있는 매니페스트가 가리키지 않는 파티션 · 파생 집계 파일 삭제
+    최근 STORE_GRACE_SEC 안에 쓴 파일(다른 워커의 진행 중 동기화)은 남김
+    """
+    for v in _versions()[STORE_KEEP:]:
+        try: os.remove(_manifest_path(v))
+        except OSError: pass
+    live = live_manifests()
+    keep = {n: set() for n in STORE_PARTS}
+    for m in live:
+        for n, keys in m.get("parts", {}).items():
+            keep.setdefault(n, set()).update(keys.values())
+        if m.get("ref"):
+            keep["actual_ref"].add(m["ref"])
+    month_keys = {k for m in live for k in m.get("months", {}).values()}
+    cutoff = time.time() - STORE_GRACE_SEC
+    try:
+        names = os.listdir(STORE_DIR)
+    except OSError:
+        return
+    for name in names:
+        d = os.path.join(STORE_DIR, name)
+        if name == "versions" or name == "manifest.json":
+            continue
+        if not os.path.isdir(d):   # 이전 구성의 파일 (actual_ref.parquet 등)
+            try:
+                if os.path.getmtime(d) < cutoff:
+                    os.remove(d)
+            except OSError:
+                pass
+            continue
+        for root, _, files in os.walk(d, topdown=False):
+            for f in files:
+                key = f.split(".", 1)[0]
+                if not f.endswith(".tmp") and key in (keep[name] if name in keep else month_keys):
+                    continue
+                p = os.path.join(root, f)
+                try:
+                    if os.path.getmtime(p) < cutoff:
+                        os.remove(p)
+                except OSError:
+                    pass
+            if root != d and not os.listdir(root):
+                try: os.rmdir(root)
+                except OSError: pass
+
+def _pin(manifest, version):
+    """동기화 결과를 마지막 매니페스트로, 원본 토큰이 version 과 같으면 버전별 매니페스트로도 기록"""
+    if version is not None and not sources_match(version):
+        log.warning("버전 %s 의 원본이 이미 바뀜 — 현재 원본 기준으로 조회 (버전 매니페스트 미기록)", version)
+        version = None
+    manifest = dict(manifest, version=version)
+    _write_manifest(manifest, version)
+    return manifest
+
+def sync_store(map_path=None, version=None):
+    """
+    원본 → 정규화 저장소 증분 동기화 (마지막 매니페스트 기준)
+    · 월 파티션별 digest 비교 → 새로 생기거나 바뀐 월만 파싱·정리, 사라진 월은 매니페스트에서 제외
+    · 예측 마무리(브랜드명 시리즈 제거 · combo→supply 보정)는 기준이 바뀐 월만 다시 적용
+    · 공급단 매핑·스키마 버전이 바뀌면 전체 재구축 (이전 파일은 참조가 끝난 뒤 정리)
+    version 을 주면 버전별 매니페스트로도 기록 — 같은 버전은 이후 원본을 읽지 않고 그 매니페스트 사용
+      (읽은 원본의 토큰이 version 과 같을 때만 기록 — 이미 바뀐 원본을 이전 버전 이름으로 남기지 않음,
+       이때 반환 매니페스트의 version 은 None)
+    원본이 그대로면 매니페스트만 읽고 끝남 (파티션 미접근)
+    반환: 매니페스트 — parts: {파티션: {ym: digest}}, months: {ym: 월 digest} (파생 집계 캐시 키),
+          rows: {ym: 팩트 행 수}
+    """
+    if version is not None:
+        pinned = _read_manifest(version)
+        if pinned and _complete(pinned):
+            return pinned
+    old = _read_manifest()
+    map_key = content_hash([map_path]) if map_path else ""
+    src = {k: source_partitions(k) for k in KINDS}
+    digests = {k: {ym: d for ym, (d, _) in src[k].items()} for k in KINDS}
+    if old.get("map") != map_key or not _complete(old):
+        old = {}
+    elif old.get("sources") == digests:
+        return _pin(old, version)
+    if not old and os.path.isdir(CACHE_DIR):
+        for fn in os.listdir(CACHE_DIR):   # 구 파일 단위 캐시 정리
+            if fn.endswith(".parquet"):
+                try:
+                    os.remove(os.path.join(CACHE_DIR, fn))
+                except FileNotFoundError:   # 다른 워커가 먼저 정리
+                    pass
+    supply_map = load_supply_map()
+    prev_src = old.get("sources", {})
+    parts    = {n: dict(old.get("parts", {}).get(n, {})) for n in STORE_PARTS if n != "actual_ref"}
+    brands   = dict(old.get("brands", {}))
+    columns  = dict(old.get("columns", {}))
+
+    # ── 바뀐 원본 월만 파싱(두 원본·여러 월 동시)·정리 ──
+    changed = {}
+    fresh   = {"forecast": {}, "actual": {}}
+    for kind in KINDS:
+        prev = prev_src.get(kind, {})
+        cur  = digests[kind]
+        changed[kind] = {ym for ym in set(cur) | set(prev) if cur.get(ym) != prev.get(ym)}
+    parsed = read_parallel({(kind, ym): src[kind][ym][1]
+                            for kind in KINDS for ym in changed[kind] if ym in digests[kind]})
+    for kind in KINDS:
+        name = "forecast_src" if kind == "forecast" else "actual"
+        for ym in changed[kind]:
+            if ym not in digests[kind]:
+                parts[name].pop(ym, None)
+                if kind == "forecast":
+                    brands.pop(ym, None)
+                continue
+            raw = parsed.pop((kind, ym))
+            if kind == "forecast":
+                df = clean_forecast(raw, supply_map)
+                brands[ym] = forecast_brands(df)
+            else:
+                df = clean_actual(raw, supply_map)
+            parts[name][ym] = _write_part(df, name)
+            fresh[kind][ym] = df
+            columns[kind] = list(df.columns)
+
+    # ── combo→supply 참조: 월별 첫 행만 보관, 바뀐 월만 교체 ──
+    old_ref_rows = pd.read_parquet(_part_path("actual_ref", old["ref"])) if old.get("ref") else None
+    ref_rows = [df.drop_duplicates("combo")[["ym","combo","supply"]]
+                for df in fresh["actual"].values() if "supply" in df.columns]
+    if old_ref_rows is not None:
+        ref_rows.append(old_ref_rows[~old_ref_rows["ym"].isin(changed["actual"])])
+    ref_rows = (pd.concat(ref_rows, ignore_index=True).sort_values("ym", kind="stable", ignore_index=True)
+                if ref_rows else pd.DataFrame(columns=["ym","combo","supply"]))
+    ref     = combo_supply_ref(ref_rows)
+    old_ref = combo_supply_ref(old_ref_rows) if old_ref_rows is not None else None
+
+    # ── 마무리 다시 할 예측 월 ──
+    f_months = set(digests["forecast"])
+    all_brands = sorted(set().union(*brands.values())) if brands else []
+    if old_ref is None or all_brands != old.get("all_brands"):
+        redo = set(f_months)
+    else:
+        redo = changed["forecast"] & f_months
+        both = ref.index.union(old_ref.index)
+        moved = both[ref.reindex(both).fillna(SUPPLY_NA + "?").to_numpy()
+                     != old_ref.reindex(both).fillna(SUPPLY_NA + "?").to_numpy()]
+        if len(moved):
+            fc = _read_parts(parts, "forecast_src", sorted(f_months - redo), columns=["ym","combo"])
+            if fc is not None:
+                redo |= set(fc.loc[fc["combo"].isin(moved), "ym"])
+    finished = {}
+    for ym in sorted(redo):
+        f = fresh["forecast"].get(ym)
+        if f is None:
+            f = pd.read_parquet(_part_path("forecast_src", parts["forecast_src"][ym]))
+        finished[ym] = finish_forecast(f, all_brands, ref)
+        parts["forecast"][ym] = _write_part(finished[ym], "forecast")
+    for ym in changed["forecast"] - f_months:
+        parts["forecast"].pop(ym, None)
+
+    # ── 월 digest: 마무리된 예측 + 실적 내용 기준 (바뀐 월만 새 값) ──
+    months = {ym: k for ym, k in old.get("months", {}).items()}
+    n_rows = dict(old.get("rows", {}))
+    all_months = f_months | set(digests["actual"])
+    for ym in set(months) - all_months:
+        del months[ym]
+        n_rows.pop(ym, None)
+    for ym in (redo | changed["forecast"] | changed["actual"]) & all_months:   # 예측만 사라진 월도 다시 계산
+        f = finished.get(ym)
+        if f is None and ym in f_months:
+            f = pd.read_parquet(_part_path("forecast", parts["forecast"][ym]))
+        a = fresh["actual"].get(ym)
+        if a is None and ym in digests["actual"]:
+            a = pd.read_parquet(_part_path("actual", parts["actual"][ym]))
+        frames = [df for df in (f, a) if df is not None]
+        months[ym] = _frame_digest(*frames)
+        n_rows[ym] = len(pd.Index(pd.concat([df["combo"] for df in frames])).unique())
+
+    ref_key = _write_part(ref_rows, "actual_ref")
+    combos = [_read_parts(parts, n, sorted(all_months), columns=["combo"]) for n in ("forecast", "actual")]
+    n_combos = int(pd.concat([c for c in combos if c is not None])["combo"].nunique()) if any(
+        c is not None for c in combos) else 0
+
+    manifest = {"schema": CACHE_SCHEMA_VER, "map": map_key, "sources": digests,
+                "parts": parts, "ref": ref_key,
+                "brands": brands, "all_brands": all_brands, "columns": columns,
+                "months": months, "rows": n_rows, "n_combos": n_combos}
+    manifest = _pin(manifest, version)
+    _prune_store()
+    log.info("정규화 저장소 갱신: 원본 월 재처리 forecast %s / actual %s, 예측 마무리 %d개월",
+             sorted(changed["forecast"]), sorted(changed["actual"]), len(redo))
+    return manifest
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def synced_store(version=0):
+    """
+    데이터 버전당 1회 저장소 동기화 — 저장소를 쓸 수 없으면 None (메모리 경로)
+    버전 토큰(0 = 미지정 제외)별 매니페스트를 남겨 이전 버전도 그 버전의 파티션만 읽음
+    """
+    if not _HAS_ARROW or not all(source_files(k) for k in KINDS):
+        return None
+    try:
+        return sync_store(find_data_file(SUPPLY_MAP_FILE), version or None)
+    except Exception:
+        log.exception("정규화 저장소 동기화 실패 — 원본 전체 파싱")
+        return None
+
+def cached_aggregate(name, version, build):
+    """
+    월 단위 파생 집계 캐시 — store/{name}/ym=…/{월 digest}.parquet
+    없거나 낡은 월만 build(months) 로 다시 계산 (결과에 ym 컬럼 필요), 나머지는 파일에서 읽음
+    이전 digest 파일은 다른 버전이 읽을 수 있으므로 그대로 두고 저장소 정리(_prune_store)에 맡김
+    저장소가 없으면 build(None) 결과 그대로
+    """
+    store = synced_store(version)
+    if store is None:
+        return build(None)
+    keys  = store["months"]
+    path  = lambda m: os.path.join(STORE_DIR, name, f"ym={m}", f"{keys[m]}.parquet")
+    stale = [m for m in sorted(keys) if not os.path.exists(path(m))]
+    if stale:
+        out = build(tuple(stale))
+        out = out.astype({c: object for c in out.columns
+                          if isinstance(out[c].dtype, pd.CategoricalDtype)})
+        for m in stale:
+            part = out[out["ym"] == m]
+            _write_tmp(path(m), lambda tmp: part.to_parquet(tmp, index=False))
+    frames = [pd.read_parquet(path(m)) for m in sorted(keys)]
+    return pd.concat(frames, ignore_index=True)
+
+
+# ══════════════════════════════════════════════
+#  데이터 로드
+# ══════════════════════════════════════════════
+@st.cache_data(show_spinner=False, max_entries=2)
+def _memory_frames(version=0):
+    """저장소 없이 원본 전체를 파싱 (pyarrow 미설치 등) — 원본이 없으면 샘플"""
+    try:
+        frames = read_parallel({k: (lambda k=k: _read_files(source_files(k))) for k in KINDS})
+        f, a = frames["forecast"], frames["actual"]
+    except Exception:
+        f, a = _sample_frames()
+    return normalize_frames(f, a)
+
+def load_data(version=0, months=None):
+    """
+    정규화된 (forecast, actual)
+    months 를 주면 해당 월 파티션만 읽음 (파티션 가지치기 — 다른 월 파일은 열지 않음)
+    """
+    store = synced_store(version)
+    if store is None:
+        f, a = _memory_frames(version)
+        if months is not None:
+            f, a = f[f["ym"].isin(months)], a[a["ym"].isin(months)]
+        return f, a
+    months = sorted(store["months"]) if months is None else sorted(set(months) & set(store["months"]))
+    out = []
+    for kind in KINDS:
+        df = _read_parts(store["parts"], kind, months)
+        out.append(df if df is not None else pd.DataFrame(columns=store["columns"].get(kind, [])))
+    return tuple(out)
+
+
+# ══════════════════════════════════════════════
+#  팩트 테이블 (mg_all)
+# ══════════════════════════════════════════════
+GRAIN     = ["ym", "combo"]
+ATTR_COLS = ["brand", "series", "name", "supply"]
+DIM_COLS  = GRAIN + ATTR_COLS
+
+def encode_dims(df, cols=DIM_COLS):
+    """
+    차원 컬럼 → 정렬된 사전(categories)을 가진 Categorical
+    · 반복 문자열 대신 정수 코드 저장 — 메모리 절감, isin/groupby 는 코드 비교
+    · 사전이 정렬돼 있어 코드 순서 = 문자열 순서 (ym 은 순서형: 범위 비교·min/max 가능)
+    · 파생 테이블(큐브 등)은 같은 dtype 을 물려받아 사전을 공유
+    ※ groupby 시 observed=True 필수 (미관측 조합 제외)
+    """
+    for c in cols:
+        if c in df.columns:
+            cats = sorted(df[c].dropna().unique())
+            df[c] = pd.Categorical(df[c], categories=cats, ordered=(c == "ym"))
+    return df
+
+def rollup_to_grain(df, value_col):
+    """
+    (ym, combo) 단위로 수량 합산 — 같은 월·콤보 주문 라인이 여러 건이어도 1행
+    속성 컬럼은 첫 행 값을 유지
+    """
+    df = df.assign(**{value_col: pd.to_numeric(df[value_col], errors='coerce')})
+    if not df.duplicated(GRAIN).any():
+        return df
+    attrs = [c for c in df.columns if c not in GRAIN and c != value_col]
+    agg = {value_col: "sum", **{c: "first" for c in attrs}}
+    return df.groupby(GRAIN, as_index=False, sort=False).agg(agg)[list(df.columns)]
+
+def split_actuals(a_df):
+    """실적 → (수량 팩트 [ym, combo, actual], 마스터 속성 [ym, combo, brand, series, name, supply])"""
+    a_df  = rollup_to_grain(a_df, "actual")
+    attrs = [c for c in ATTR_COLS if c in a_df.columns]
+    return a_df[GRAIN + ["actual"]], a_df[GRAIN + attrs]
+
+def build_fact_table(f_df, a_df):
+    """forecast ⟗ actual 병합 + 파생 컬럼 (차이/오차량/달성률/ym_dt/is_parts)"""
+    # 병합 전 (ym, combo) 1행으로 맞춤 → 1:1 키 조인 (라인 수만큼 예측이 복제되지 않도록)
+    f_df = rollup_to_grain(f_df, "forecast")
+    a_fact, a_meta = split_actuals(a_df)
+
+    # forecast에만 있는 경우: actual=0, actual에만 있는 경우: forecast=0
+    mg_all = pd.merge(f_df, a_fact, on=GRAIN, how="outer", validate="one_to_one")
+
+    # outer join으로 생긴 누락 컬럼 채우기 (actual에만 있는 행)
+    for _col in ATTR_COLS + ["forecast"]:
+        if _col not in mg_all.columns:
+            mg_all[_col] = pd.NA
+    # actual에만 있는 행의 brand/series/name/supply를 actual 마스터에서 채움
+    mg_all = mg_all.merge(a_meta, on=GRAIN, how="left", suffixes=("","_from_a"), validate="one_to_one")
+    for _col in ATTR_COLS:
+        _col_a = _col + "_from_a"
+        if _col_a in mg_all.columns:
+            mg_all[_col] = mg_all[_col].fillna(mg_all[_col_a])
+            mg_all.drop(columns=[_col_a], inplace=True)
+    mg_all["actual"]   = pd.to_numeric(mg_all["actual"],  errors='coerce').fillna(0).astype(int)
+    mg_all["forecast"] = pd.to_numeric(mg_all["forecast"],errors='coerce').fillna(0).astype(int)
+    mg_all["차이"]      = mg_all["actual"] - mg_all["forecast"]
+    mg_all["오차량"]    = mg_all["차이"].abs()
+    mg_all["달성률(%)"] = np.where(mg_all["forecast"]>0,(mg_all["actual"]/mg_all["forecast"]*100).round(1),0)
+    try:    mg_all["ym_dt"] = pd.to_datetime(mg_all["ym"]+"-01")
+    except: mg_all["ym_dt"] = mg_all["ym"]
+    mg_all["is_parts"] = classify_parts(mg_all["series"])
+    # ym 오름차순 정렬 보장 — 월 필터를 연속 구간(슬라이스)으로 처리하기 위한 전제
+    mg_all = mg_all.sort_values(GRAIN, kind="stable", ignore_index=True)
+    return encode_dims(mg_all)
+
+
+# ══════════════════════════════════════════════
+#  스타 스키마
+# ══════════════════════════════════════════════
+COMBO_DIM_COLS = ["combo", "name", "brand", "series", "supply", "is_parts"]
+WIDE_COLS      = ["ym","brand","series","combo","name","supply","forecast","actual",
+                  "차이","오차량","달성률(%)","ym_dt","is_parts"]
+
+class StarSchema:
+    """
+    · dim  : 콤보 마스터 — combo_id → combo / name / brand / series / supply / is_parts
+             원본 속성이 월마다 바뀌는 콤보(시리즈 표기 변경 등)는 속성 조합별 1행 (이력형)
+    · fact : 월별 narrow 팩트 — ym / combo_id / forecast / actual  (ym, combo 오름차순)
+    속성·파생 컬럼은 화면에 필요한 행에 대해서만 rows() 에서 붙임
+    · index_bits : 공유 파일에서 연 경우 팩트 행별 brand / supply 비트셋 {차원: {값: bool 배열}}
+    ※ 프로세스 내 세션 공유 객체 — in-place 수정 금지 (공유 파일 배열은 읽기 전용)
+    """
+    def __init__(self, dim, fact, index_bits=None):
+        self.dim  = dim
+        self.fact = fact
+        self.index_bits = index_bits
+        months = fact["ym"].cat.categories
+        try:    self._month_dt = pd.to_datetime(months + "-01").to_numpy()
+        except: self._month_dt = months.to_numpy()
+
+    @classmethod
+    def from_wide(cls, mg_all):
+        keys = ["combo"] + ATTR_COLS
+        combo_id = (mg_all.groupby(keys, sort=True, observed=True, dropna=False)
+                          .ngroup().to_numpy().astype(np.int32))
+        _, first = np.unique(combo_id, return_index=True)
+        dim  = mg_all.iloc[first][COMBO_DIM_COLS].reset_index(drop=True)
+        fact = pd.DataFrame({
+            "ym":       mg_all["ym"],
+            "combo_id": combo_id,
+            "forecast": mg_all["forecast"],
+            "actual":   mg_all["actual"],
+        })
+        return cls(dim, fact)
+
+    def rows(self, pos=slice(None)):
+        """팩트 행 위치 → 화면용 wide 프레임 (WIDE_COLS, index = 팩트 행 위치)"""
+        f  = self.fact.iloc[pos]
+        d  = self.dim.take(f["combo_id"].to_numpy())
+        fc = f["forecast"].to_numpy()
+        ac = f["actual"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(fc > 0, np.round(ac / fc * 100, 1), 0)
+        cols = {c: d[c].array for c in COMBO_DIM_COLS}
+        cols.update({
+            "ym":        f["ym"].array,
+            "forecast":  fc,
+            "actual":    ac,
+            "차이":      ac - fc,
+            "오차량":    np.abs(ac - fc),
+            "달성률(%)": rate,
+            "ym_dt":     self._month_dt[f["ym"].cat.codes.to_numpy()],
+        })
+        return pd.DataFrame({c: cols[c] for c in WIDE_COLS}, index=f.index)
+
+    def wide(self):
+        """전체 wide 프레임 (구 mg_all) — 큐브 등 빌드 단계 전용"""
+        return self.rows()
+
+    def months(self, months):
+        """
+        months(최소~최대 월) 의 연속 팩트 행 구간 뷰 — 팩트가 ym 오름차순이라 이분 탐색 2번, 복사 없음
+        dim · 행 위치(index) 는 그대로 (전 기간 팩트 행 위치)
+        """
+        cats  = self.fact["ym"].cat.categories
+        codes = self.fact["ym"].cat.codes.to_numpy()
+        lo = int(np.searchsorted(codes, cats.searchsorted(min(months), "left"), "left"))
+        hi = int(np.searchsorted(codes, cats.searchsorted(max(months), "right"), "left"))
+        bits = None if self.index_bits is None else {
+            dim: {v: b[lo:hi] for v, b in vals.items()} for dim, vals in self.index_bits.items()}
+        return StarSchema(self.dim, self.fact.iloc[lo:hi], index_bits=bits)
+
+    def index_frame(self):
+        """필터 인덱스용 최소 프레임 (ym, brand, supply)"""
+        d = self.dim[["brand","supply"]].take(self.fact["combo_id"].to_numpy())
+        return pd.DataFrame({"ym": self.fact["ym"].array,
+                             "brand": d["brand"].array, "supply": d["supply"].array})
+
+def build_star(version=0, months=None):
+    f_df, a_df = load_data(version, months)
+    mg = build_fact_table(f_df, a_df)
+    store = synced_store(version)
+    if months and store is not None:
+        # 행 번호를 전 기간 팩트 기준으로 맞춤 (앞선 월들의 행 수만큼 이동)
+        mg.index += sum(n for m, n in store["rows"].items() if m < min(months))
+    return StarSchema.from_wide(mg)
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_star(version=0, months=None):
+    """
+    데이터 버전별 스타 스키마 — 프로세스 내 모든 세션이 같은 객체를 공유
+    months: 조회 월 튜플 (None = 전 월) — 전 기간 객체의 해당 월 구간 뷰 (파일 · 색인을 월 범위마다 새로 만들지 않음)
+    """
+    if months is not None:
+        return load_star(version).months(months)
+    return shared_star(version) if _HAS_ARROW else build_star(version)
+
+def combo_count(version=0):
+    """전 기간 콤보 수 — 저장소 매니페스트 값 (팩트 미접근)"""
+    store = synced_store(version)
+    if store is not None:
+        return store["n_combos"]
+    return int(load_star(version).dim["combo"].nunique())
+
+
+# ══════════════════════════════════════════════
+#  공유 팩트 파일 (메모리 맵)
+# ══════════════════════════════════════════════
+# 완성된 전 기간 스타 스키마를 버전별 Feather(Arrow IPC, 무압축) 파일로 1회 기록
+# 모든 워커가 메모리 맵으로 열어 팩트 수치 컬럼·월 코드·필터 비트셋을 복사 없이 사용
+# → 워커 수와 무관하게 OS 페이지 캐시에 1벌 (콤보 차원은 작아서 각자 읽음)
+# 월 범위 조회는 이 파일의 연속 행 구간 뷰 (StarSchema.months) — 범위별 사본 없음
+# shared/{버전}/star.dim.feather / .fact.feather  (fact 파일이 마지막에 교체 = 완료 표시)
+SHARED_DIR  = os.path.join(CACHE_DIR, "shared")
+SHARED_KEEP = 2          # 남겨 둘 데이터 버전 수 (이전 버전을 아직 쓰는 워커용)
+BIT_DIMS    = ["brand", "supply"]
+
+def _shared_base(version):
+    return os.path.join(SHARED_DIR, str(version), "star")
+
+def write_shared(star, base):
+    """스타 스키마 → 공유 파일 (tmp 에 쓴 뒤 원자적 교체 — 워커끼리 동시에 써도 안전)"""
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    fact, tag = star.fact, f".{os.getpid()}.tmp"
+    cols = {"ym": fact["ym"].cat.codes.to_numpy(), "combo_id": fact["combo_id"].to_numpy(),
+            "forecast": fact["forecast"].to_numpy(), "actual": fact["actual"].to_numpy()}
+    idx  = star.index_frame()
+    bits = {}
+    for dim in BIT_DIMS:
+        codes, uniques = idx[dim].factorize()
+        bits[dim] = [str(v) for v in uniques]
+        cols.update({f"{dim}_{i}": (codes == i).view(np.uint8) for i in range(len(uniques))})
+    meta = {"ym": [str(m) for m in fact["ym"].cat.categories], "bits": bits}
+    if isinstance(fact.index, pd.RangeIndex):
+        meta["start"] = int(fact.index.start)
+    else:
+        cols["pos"] = fact.index.to_numpy(dtype=np.int64)
+    tbl = pa.table(cols).replace_schema_metadata({"star": json.dumps(meta, ensure_ascii=False)})
+    star.dim.to_feather(base + ".dim.feather" + tag)
+    pa_feather.write_feather(tbl, base + ".fact.feather" + tag,
+                             compression="uncompressed", chunksize=max(len(fact), 1))
+    os.replace(base + ".dim.feather" + tag, base + ".dim.feather")
+    os.replace(base + ".fact.feather" + tag, base + ".fact.feather")
+
+def open_shared(base):
+    """공유 파일 → StarSchema (팩트 수치·월 코드·비트셋은 메모리 맵 위 읽기 전용 뷰)"""
+    dim = pd.read_feather(base + ".dim.feather")
+    tbl = pa.ipc.open_file(pa.memory_map(base + ".fact.feather")).read_all()
+    meta = json.loads(tbl.schema.metadata[b"star"])
+    def col(c):
+        arr = tbl.column(c)
+        return arr.chunk(0).to_numpy(zero_copy_only=True) if arr.num_chunks == 1 else arr.to_numpy()
+    ym = pd.Categorical.from_codes(col("ym"), dtype=pd.CategoricalDtype(meta["ym"], ordered=True),
+                                   validate=False)
+    n = tbl.num_rows
+    index = pd.RangeIndex(meta["start"], meta["start"] + n) if "start" in meta else pd.Index(col("pos"))
+    fact = pd.DataFrame({"ym": ym, "combo_id": col("combo_id"),
+                         "forecast": col("forecast"), "actual": col("actual")},
+                        index=index, copy=False)
+    bits = {dim: {v: col(f"{dim}_{i}").view(bool) for i, v in enumerate(vals)}
+            for dim, vals in meta["bits"].items()}
+    return StarSchema(dim, fact, index_bits=bits)
+
+def _prune_shared(keep):
+    """최근 SHARED_KEEP 개 버전 폴더만 남김 (열려 있는 메모리 맵은 삭제 후에도 유효)"""
+    try:
+        dirs = [os.path.join(SHARED_DIR, d) for d in os.listdir(SHARED_DIR)]
+    except OSError:
+        return
+    dirs = sorted((d for d in dirs if os.path.isdir(d)), key=os.path.getmtime, reverse=True)
+    for d in dirs[SHARED_KEEP:]:
+        if os.path.basename(d) != str(keep):
+            shutil.rmtree(d, ignore_errors=True)
+
+def shared_star(version=0):
+    """전 기간 공유 파일이 있으면 열고, 없으면 구성해 기록한 뒤 연 객체 반환 (힙 사본은 버림)"""
+    base = _shared_base(version)
+    if os.path.exists(base + ".fact.feather"):
+        try:
+            return open_shared(base)
+        except Exception:
+            log.warning("공유 팩트 파일 손상 — 다시 기록: %s", base)
+    star = build_star(version)
+    store = synced_store(version)
+    if version and store is not None and store.get("version") != version:
+        return star   # 원본이 이미 바뀐 이전 버전 — 현재 내용을 그 버전 이름의 파일로 남기지 않음
+    try:
+        write_shared(star, base)
+        _prune_shared(version)
+        return open_shared(base)
+    except Exception:
+        log.exception("공유 팩트 파일 기록 실패 — 프로세스 내 객체 사용")
+        return star
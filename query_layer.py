@@ -0,0 +1,775 @@
+"""
+수요예측 대시보드 조회 계층
+- 필터 인덱스 (ym 구간 슬라이스 + brand/supply 비트셋)
+- 검색 색인 (콤보 차원 combo / series / name 문자 n-gram 역색인 + 한글 초성 · 자모 유사 검색)
+- 콤보 접두어 색인 (정렬 코드 + 누적합 — 계열 합계 · 자동 완성)
+- OLAP 큐브 (ym × brand × supply × series × 부품류 여부)
+- 월 누적합 축 (기간 합계 = 누적합 두 번 조회 후 차감)
+- 집계 파이프라인 (필터 → 그룹 합계 → 파생 지표 → 정렬 → 상위 N) — pandas / Polars 엔진
+- 상위 N 선택 (부분 선택 후 N 개만 정렬 — 여러 상위/하위 목록을 한 번에)
+- 결과 메모 (데이터 버전 + 정규화된 필터 키, LRU · 메모리 상한 · 적중 통계) + 자주 쓰는 뷰 예열
+"""
+import os
+import re
+import sys
+import logging
+import operator
+import threading
+import unicodedata
+import weakref
+from functools import reduce, lru_cache
+from collections import OrderedDict, defaultdict
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+from data_layer import load_star, build_star, cached_aggregate, encode_dims, SUPPLY_VALID
+
+try:
+    import polars as pl
+    _HAS_POLARS = True
+except ImportError:
+    _HAS_POLARS = False
+
+log = logging.getLogger(__name__)
+
+
+# ══════════════════════════════════════════════
+#  필터 인덱스
+# ══════════════════════════════════════════════
+class FilterIndex:
+    """
+    팩트 행 위치 인덱스 — 데이터 버전당 1회 생성
+    · ym     : 정렬된 ym 배열 → 구간 [lo, hi) 이진 탐색 (월·기간 모두 슬라이스)
+               ym 컬럼이 없는 표(기간 합계 키 등)는 항상 전체 구간
+    · brand  : 값별 bool 비트셋
+    · supply : 값별 bool 비트셋
+    bits 를 주면 (공유 팩트 파일의 비트셋) brand / supply 비트셋을 새로 만들지 않음 — df 는 ym 만 사용
+    """
+    def __init__(self, df, bits=None):
+        self.df   = df
+        self.n    = len(df)
+        self._ym  = self._ym_cats = None
+        if "ym" in df.columns:
+            ym = df["ym"]
+            if isinstance(ym.dtype, pd.CategoricalDtype):
+                # 정렬된 사전의 코드로 비교 — 문자열 비교 없음
+                self._ym_cats = ym.cat.categories.to_numpy()
+                self._ym      = ym.cat.codes.to_numpy()
+            else:
+                self._ym      = ym.to_numpy()
+            if np.any(self._ym[1:] < self._ym[:-1]):
+                raise ValueError("FilterIndex: 대상 표는 ym 오름차순이어야 합니다")
+        if bits is not None:
+            self.brand_bits, self.supply_bits = bits["brand"], bits["supply"]
+        else:
+            self.brand_bits  = self._bitsets(df["brand"])
+            self.supply_bits = self._bitsets(df["supply"])
+
+    @staticmethod
+    def _bitsets(s):
+        codes, uniques = s.factorize()
+        return {v: codes == i for i, v in enumerate(uniques)}
+
+    def ym_bounds(self, ym=None, ym_range=None):
+        if ym_range:
+            start, end = ym_range
+        elif ym:
+            start = end = ym
+        else:
+            return 0, self.n
+        if self._ym is None:
+            return 0, self.n
+        if self._ym_cats is not None:
+            # 문자열 경계 → 코드 경계 [c_lo, c_hi)
+            c_lo = np.searchsorted(self._ym_cats, start, side="left")
+            c_hi = np.searchsorted(self._ym_cats, end,   side="right")
+            lo = int(np.searchsorted(self._ym, c_lo, side="left"))
+            hi = int(np.searchsorted(self._ym, c_hi, side="left"))
+        else:
+            lo = int(np.searchsorted(self._ym, start, side="left"))
+            hi = int(np.searchsorted(self._ym, end,   side="right"))
+        return lo, max(lo, hi)
+
+    def _mask(self, bits, values, lo, hi):
+        """선택 값들의 비트셋 OR — 전체 값 선택 시 None (필터 생략)"""
+        if set(bits) <= set(values):
+            return None
+        m = np.zeros(hi - lo, dtype=bool)
+        for v in values:
+            b = bits.get(v)
+            if b is not None:
+                m |= b[lo:hi]
+        return m
+
+    def positions(self, ym=None, ym_range=None, brands=None, supply=None):
+        """조건에 맞는 행 위치 — 월 조건만 있으면 slice, 그 외 정수 배열"""
+        lo, hi = self.ym_bounds(ym, ym_range)
+        masks = []
+        if brands:
+            masks.append(self._mask(self.brand_bits, brands, lo, hi))
+        if supply and supply != "전체":
+            masks.append(self._mask(self.supply_bits, [supply], lo, hi))
+        masks = [m for m in masks if m is not None]
+        if not masks:
+            return slice(lo, hi)
+        m = masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+        return lo + np.flatnonzero(m)
+
+    def select(self, ym=None, ym_range=None, brands=None, supply=None):
+        """
+        필터 결과 DataFrame — 월 조건만 있으면 복사 없는 슬라이스 뷰
+        ※ 공유 프레임의 뷰일 수 있으므로 호출 측에서 in-place 수정 금지
+        """
+        return self.df.iloc[self.positions(ym, ym_range, brands, supply)]
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def load_filter_index(version=0, months=None):
+    """팩트 행 위치 인덱스 (StarSchema.rows 로 화면용 행 생성) — load_star 와 같은 월 범위 (보통 전 기간 1개)"""
+    star = load_star(version, months)
+    if star.index_bits is not None:   # 공유 파일의 월 코드·비트셋을 그대로 사용
+        return shared(FilterIndex(star.fact, bits=star.index_bits))
+    return shared(FilterIndex(star.index_frame()))
+
+
+# ══════════════════════════════════════════════
+#  검색 색인
+# ══════════════════════════════════════════════
+SEARCH_COLS = ["combo", "series", "name"]
+NGRAM       = 3
+FUZZY_MAX   = 2    # 자모 편집거리 상한
+FUZZY_PER   = 5    # 자모 몇 개당 오타 1개 허용
+FUZZY_SHOW  = 8    # 유사 검색 시 순위대로 보여 줄 후보 수
+_REGEX_META = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+@lru_cache(maxsize=256)
+def search_regex(query):
+    """
+    검색어 → 대소문자 무시 정규식 — 화면 검색 공통 의미 (SearchIndex · apply_filters · 내장 DB)
+    정규식 특수문자가 없거나 잘못된 정규식이면 None = 문자 그대로 부분 일치
+    """
+    if _REGEX_META.search(query):
+        try:    return re.compile(query, re.IGNORECASE)
+        except re.error: pass
+    return None
+
+# ── 한글 자모 분해 ── (호환 자모로 출력 — 키보드로 입력한 "ㅇㄹㅇㄷ" 과 같은 문자)
+_CHO   = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG  = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG  = ["", *"ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"]
+_SPLIT = {"ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+          "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ", "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ",
+          "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ"}   # 겹받침·이중모음은 타건 단위로
+_SYLLABLES = range(0xAC00, 0xD7A4)
+_JAMO_TABLE = {ord(k): v for k, v in _SPLIT.items()}
+_JAMO_TABLE.update({s: "".join(_SPLIT.get(j, j) for j in
+                               (_CHO[(s - 0xAC00) // 588] + _JUNG[(s - 0xAC00) // 28 % 21] + _JONG[(s - 0xAC00) % 28]))
+                    for s in _SYLLABLES})
+_JAMO_TABLE[ord(" ")] = None
+_CHO_TABLE = {s: _CHO[(s - 0xAC00) // 588] for s in _SYLLABLES}
+_CHO_TABLE[ord(" ")] = None
+_CHO_ONLY = re.compile(f"[{_CHO}\\s]+")
+
+def jamo_key(s):
+    """자모 분해 키 — '체어' → 'ㅊㅔㅇㅓ' (공백 제거, 겹받침·이중모음 분리)"""
+    return unicodedata.normalize("NFC", s).lower().translate(_JAMO_TABLE)
+
+def chosung_key(s):
+    """초성 키 — '올라운드 체어' → 'ㅇㄹㅇㄷㅊㅇ' (한글 음절 외 문자는 그대로, 공백 제거)"""
+    return unicodedata.normalize("NFC", s).lower().translate(_CHO_TABLE)
+
+def _ngrams(t, n):
+    return {t[j:j + n] for j in range(len(t) - n + 1)}
+
+def _gram_index(keys, n):
+    grams = defaultdict(list)
+    for k, t in enumerate(keys):
+        for g in _ngrams(t, n):
+            grams[g].append(k)
+    return {g: np.asarray(v, dtype=np.int32) for g, v in grams.items()}
+
+def _substring_distance(p, t):
+    """p 와 t 의 부분 문자열 사이 최소 편집거리 (Sellers) → (거리, 일치 끝 위치)"""
+    m = len(p)
+    col = list(range(m + 1))
+    best, end = m, 0
+    for j, c in enumerate(t, 1):
+        diag, col[0] = col[0], 0
+        for i in range(1, m + 1):
+            up = col[i]
+            col[i] = min(up + 1, col[i - 1] + 1, diag + (p[i - 1] != c))
+            diag = up
+        if col[m] < best:
+            best, end = col[m], j
+    return best, end
+
+class SearchIndex:
+    """
+    콤보 차원 문자 n-gram 역색인 — 데이터 버전별 1회 생성 (차원 행 기준이라 팩트 행 수와 무관)
+    · 고유 문자열(소문자) → 그 문자열을 가진 차원 행(combo_id) 배열
+    · NGRAM 글자 조각 → 고유 문자열 id 배열 (오름차순)
+    · 고유 문자열마다 초성 키 · 자모 키를 미리 계산해 각각 조각 색인 (초성 NGRAM 글자 · 자모 2글자)
+    · match(q) : 질의 조각 목록의 교집합 = 후보 → 후보만 부분 문자열 확인
+                 NGRAM 보다 짧은 질의는 고유 문자열만 확인, 정규식 특수문자가 있으면 고유 문자열에 정규식
+                 (str.contains(case=False) 와 같은 결과 — 잘못된 정규식은 문자 그대로 검색)
+    · lookup(q): 부분 일치가 없을 때만 초성 검색("ㅇㄹㅇㄷ") → 자모 유사 검색(오타 · 띄어쓰기 · 입력 중 음절)
+                 순서로 넘어감 — 정확히 일치하는 검색어는 match 와 같은 결과
+                 present(조회 행에 있는 콤보) 를 주면 그 콤보를 가진 문자열만 일치로 셈 (월 범위 밖 콤보 제외)
+    """
+    def __init__(self, dim, cols=SEARCH_COLS, n=NGRAM):
+        self.n = n
+        ids, rows, labels = {}, defaultdict(list), []
+        for c in cols:
+            for i, v in enumerate(dim[c].astype(object)):
+                if isinstance(v, str):
+                    k = ids.setdefault(v.lower(), len(ids))
+                    if k == len(labels):
+                        labels.append(v)
+                    rows[k].append(i)
+        self.strings = list(ids)
+        self.labels  = labels
+        self.rows    = [np.unique(rows[k]).astype(np.int32) for k in range(len(ids))]
+        self.grams   = _gram_index(self.strings, n)
+        self.cho     = [chosung_key(t) for t in self.strings]
+        self.jamo    = [jamo_key(t) for t in self.strings]
+        self.cho_grams  = _gram_index(self.cho, n)
+        self.jamo_grams = _gram_index(self.jamo, 2)
+
+    def _candidates(self, q, keys=None, grams=None):
+        keys, grams = (self.strings, self.grams) if keys is None else (keys, grams)
+        if len(q) < self.n:
+            return range(len(keys))
+        lists = sorted((grams.get(q[j:j + self.n]) for j in range(len(q) - self.n + 1)),
+                       key=lambda a: -1 if a is None else len(a))
+        if lists[0] is None:
+            return []
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+
+    def _combos(self, hit):
+        if not len(hit):
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.rows[k] for k in hit]))
+
+    def _exact(self, query):
+        pat = search_regex(query)
+        if pat is not None:
+            return [k for k, t in enumerate(self.strings) if pat.search(t)]
+        q = query.lower()
+        return [k for k in self._candidates(q) if q in self.strings[k]]
+
+    def _chosung(self, query):
+        q = chosung_key(query)
+        hit = [(self.cho[k].find(q), len(self.cho[k]), k)
+               for k in self._candidates(q, self.cho, self.cho_grams) if q in self.cho[k]]
+        return [k for *_, k in sorted(hit)]
+
+    def _fuzzy(self, query):
+        """
+        자모 키 기준 편집거리 k 이내 부분 일치 — (거리, 위치, 길이) 순
+        후보는 자모 2글자 조각 색인으로만 고름 (q-gram 하한: 서로 다른 질의 조각 D 개 중
+        오타 1개가 없앨 수 있는 조각은 최대 2개 → D - 2k 개 이상 가진 문자열만 확인, 하한이 1 이상이 되게 k 조정)
+        """
+        q = jamo_key(query)
+        qg = [self.jamo_grams[g] for g in _ngrams(q, 2) if g in self.jamo_grams]
+        if not qg:
+            return []
+        d = len(_ngrams(q, 2))
+        k = min(FUZZY_MAX, len(q) // FUZZY_PER, (d - 1) // 2)
+        cnt = np.bincount(np.concatenate(qg), minlength=len(self.jamo))
+        hit = []
+        for c in np.flatnonzero(cnt >= d - 2 * k):
+            dist, end = _substring_distance(q, self.jamo[c])
+            if dist <= k:
+                hit.append((dist, end, len(self.jamo[c]), c))
+        return [k for *_, k in sorted(hit)]
+
+    def match(self, query):
+        """검색어 → 일치하는 콤보 차원 행(combo_id) 배열 (부분 일치만)"""
+        return self._combos(self._exact(query))
+
+    def present(self, star, pos):
+        """팩트 행 위치(slice 또는 배열)에 나오는 콤보 — combo_id 별 bool"""
+        out = np.zeros(len(star.dim), dtype=bool)
+        out[star.fact["combo_id"].to_numpy()[pos]] = True
+        return out
+
+    def lookup(self, query, present=None):
+        """
+        검색어 → (방식, combo_id 배열, 순위순 일치 문자열)
+        방식: "exact"(부분 일치) · "chosung"(초성만 입력) · "fuzzy"(자모 유사) · None(결과 없음)
+        """
+        keep = (lambda hit: hit) if present is None else (lambda hit: [k for k in hit if present[self.rows[k]].any()])
+        hit = keep(self._exact(query))
+        if hit:
+            return "exact", self._combos(hit), [self.labels[k] for k in hit[:FUZZY_SHOW]]
+        for mode, find in (("chosung", self._chosung), ("fuzzy", self._fuzzy)):
+            if mode == "chosung" and not _CHO_ONLY.fullmatch(query):
+                continue
+            hit = keep(find(query))
+            if hit:
+                return mode, self._combos(hit), [self.labels[k] for k in hit[:FUZZY_SHOW]]
+        return None, np.empty(0, dtype=np.int32), []
+
+    def positions(self, star, pos, query):
+        """팩트 행 위치(slice 또는 배열) 중 검색어와 일치(lookup)하는 콤보의 행만"""
+        pos = np.arange(len(star.fact))[pos] if isinstance(pos, slice) else np.asarray(pos)
+        cid = star.fact["combo_id"].to_numpy()[pos]
+        return pos[np.isin(cid, self.lookup(query, self.present(star, pos))[1])]
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_search_index(version=0):
+    """전 기간 콤보 차원 검색 색인 — 월 범위는 조회 시 present 로 제한"""
+    return shared(SearchIndex(load_star(version).dim))
+
+
+# ══════════════════════════════════════════════
+#  콤보 접두어 색인
+# ══════════════════════════════════════════════
+PREFIX_SHOW = 10
+_SEGMENT = re.compile(r"-[^-]*|[A-Z]+|\d+|[^A-Z\d-]+")
+_DASH_SEGMENT = re.compile(r"[^-]+")
+
+def code_family(code, n):
+    """code 앞 n 글자에 이어지는 다음 마디까지 — DHT → DHT1200 → DHT1200HF → DHT1200HF-2H1 (모델 · 사양 · 색상)"""
+    rest = code[n:]
+    seg = _DASH_SEGMENT if "-" in code[:n] and not rest.startswith("-") else _SEGMENT
+    m = seg.match(rest)
+    return code[:n] + (m.group() if m else rest)
+
+class PrefixIndex:
+    """
+    콤보 코드 정렬 접두어 색인 — 고유 코드(대문자)를 정렬해 두면 같은 접두어 = 연속 구간
+    · span(p)      : 접두어 p 로 시작하는 코드 구간 [lo, hi) — 이분 탐색 2번
+    · complete(p)  : 구간 앞쪽 코드 (자동 완성) — cs 를 주면 필터 결과에 있는 코드만
+    · totals(...)  : 필터 결과를 코드 순 누적합 [forecast, actual, n, 콤보 수] 로 — 필터별 1회
+    · family(cs,p) : 접두어 합계 = 누적합 차 (행 재조회 없음)
+    · families(cs,p): 다음 마디(모델 → 사양 → 색상)별 합계 — 마디도 연속 구간이라 경계에서 누적합 차
+    """
+    def __init__(self, codes):
+        codes = pd.Series(codes, dtype=object)
+        ok = codes.notna().to_numpy()
+        self.codes, inv = np.unique(codes[ok].str.upper().to_numpy(dtype=str), return_inverse=True)
+        self.slot = np.full(len(codes), -1, dtype=np.int64)
+        self.slot[ok] = inv
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.slot.nbytes
+
+    def span(self, prefix):
+        p = prefix.upper()
+        return (int(np.searchsorted(self.codes, p, "left")),
+                int(np.searchsorted(self.codes, p + "\U0010ffff", "left")))
+
+    def complete(self, prefix, cs=None, limit=PREFIX_SHOW):
+        lo, hi = self.span(prefix)
+        idx = np.arange(lo, hi)
+        if cs is not None:
+            idx = idx[np.diff(cs[lo:hi + 1, 3]) > 0]
+        return self.codes[idx[:limit]].tolist()
+
+    def totals(self, rows, forecast, actual, n=None):
+        """rows: 입력 코드 행 번호(combo_id) — 행마다 forecast / actual (n: 행 수 가중치, 없으면 1)"""
+        s = self.slot[np.asarray(rows)]
+        ok = s >= 0
+        s, k = s[ok], len(self.codes)
+        sums = [np.bincount(s, weights=np.asarray(w)[ok], minlength=k) for w in (forecast, actual)]
+        cnt = np.bincount(s, minlength=k) if n is None else np.bincount(s, weights=np.asarray(n)[ok], minlength=k)
+        cs = np.zeros((k + 1, 4), dtype=np.int64)
+        cs[1:] = np.cumsum(np.column_stack(sums + [cnt, cnt > 0]).astype(np.int64), axis=0)
+        return cs
+
+    def family(self, cs, prefix):
+        lo, hi = self.span(prefix)
+        f, a, n, c = (cs[hi] - cs[lo]).tolist()
+        return {"forecast": f, "actual": a, "n": n, "combos": c}
+
+    def families(self, cs, prefix):
+        """
+        접두어 아래 다음 마디별 [family, forecast, actual, n, combos, 파생] — 마디 사전순, 필터 결과가 없는 마디 제외
+        같은 마디의 코드가 정렬 순서상 떨어져 있을 수 있어 (DHT1200-A · DHT12000 · DHT1200HF) 마디 키로 묶어 합산
+        """
+        lo, hi = self.span(prefix)
+        keys = pd.Series([code_family(c, len(prefix)) for c in self.codes[lo:hi]], dtype=object)
+        gid, fams = keys.factorize(sort=True)
+        per_code = np.diff(cs[lo:hi + 1], axis=0)
+        sums = np.zeros((len(fams), 4), dtype=np.int64)
+        np.add.at(sums, gid, per_code)
+        out = pd.DataFrame(sums, columns=["forecast", "actual", "n", "combos"])
+        out.insert(0, "family", list(fams))
+        return derive(out[out["n"] > 0].reset_index(drop=True))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_prefix_index(version=0):
+    """전 기간 콤보 코드 접두어 색인 (차원 행 = combo_id 순) — 월 범위는 필터 결과 누적합(totals)으로 반영"""
+    return shared(PrefixIndex(load_star(version).dim["combo"]))
+
+
+# ══════════════════════════════════════════════
+#  OLAP 큐브
+# ══════════════════════════════════════════════
+CUBE_DIMS = ["ym", "brand", "supply", "series", "is_parts"]
+KEY_DIMS  = CUBE_DIMS[1:]          # 월을 뺀 나머지 차원
+MEASURES  = ["forecast", "actual", "n"]
+
+class MonthAxis:
+    """
+    월 축 누적합 — 키(월 외 차원 조합) × 월 dense 배열을 월 방향으로 누적
+    [start, end] 기간 합계 = cum[:, e] - cum[:, s]  (기간 길이와 무관하게 키당 O(1))
+    """
+    def __init__(self, cells, key_cols):
+        ym = cells["ym"].to_numpy()
+        self.months = np.sort(pd.unique(ym))
+        key_id = cells.groupby(key_cols, sort=True, dropna=False, observed=True).ngroup().to_numpy()
+        self.keys = (cells[key_cols].drop_duplicates()
+                                    .sort_values(key_cols, ignore_index=True))
+        m_idx = np.searchsorted(self.months, ym)
+        dense = np.zeros((len(MEASURES), len(self.keys), len(self.months) + 1), dtype=np.int64)
+        for i, col in enumerate(MEASURES):
+            np.add.at(dense[i], (key_id, m_idx + 1), cells[col].to_numpy())
+        self.cum   = dense.cumsum(axis=2)
+        self.index = FilterIndex(self.keys)
+        self._key_arrays = {c: self.keys[c].array for c in key_cols}   # Categorical 유지
+
+    def month_bounds(self, start=None, end=None):
+        s = 0 if start is None else int(np.searchsorted(self.months, start, side="left"))
+        e = len(self.months) if end is None else int(np.searchsorted(self.months, end, side="right"))
+        return s, max(s, e)
+
+    def window(self, start=None, end=None, brands=None, supply=None):
+        """기간 [start, end] 키별 합계 — 해당 기간에 행이 없는 키(n=0)는 제외"""
+        s, e = self.month_bounds(start, end)
+        pos = np.arange(len(self.keys))[self.index.positions(brands=brands, supply=supply)]
+        tot = self.cum[:, pos, e] - self.cum[:, pos, s]
+        keep = tot[MEASURES.index("n")] > 0
+        pos, tot = pos[keep], tot[:, keep]
+        data = {c: arr[pos] for c, arr in self._key_arrays.items()}
+        data.update({c: tot[i] for i, c in enumerate(MEASURES)})
+        return pd.DataFrame(data)
+
+class Cube:
+    """
+    팩트(wide) 사전 집계 큐브 — 셀당 forecast / actual 합계와 품목 행 수(n)
+    뷰는 select() 로 셀을 자른 뒤 rollup() / cube_totals() 로 합산
+    · select()        : 기간 합계 셀 (ym 차원 없음, 월 누적합 축으로 계산)
+    · select_months() : 월별 셀 (시계열용)
+    · options         : 사이드바 선택지 — 실적이 있는 월 / 브랜드 / 공급단 (데이터에 있는 표준 공급단만)
+    """
+    def __init__(self, df=None, cells=None):
+        self.cells  = self.aggregate(df) if cells is None else cells
+        self.index  = FilterIndex(self.cells)
+        self.axis   = MonthAxis(self.cells, KEY_DIMS)
+        self.months = list(self.axis.months)   # 데이터가 있는 전 월 (오름차순)
+        ym_tot = rollup(self.cells, "ym")
+        self.options = {
+            "months": sorted(set(ym_tot.loc[ym_tot["actual"] > 0, "ym"])),
+            "brands": sorted(self.cells["brand"].unique()),
+            "supply": [v for v in SUPPLY_VALID if v in self.cells["supply"].values],
+        }
+
+    @staticmethod
+    def aggregate(df):
+        return (
+            df.groupby(CUBE_DIMS, sort=True, dropna=False, observed=True)
+              .agg(forecast=("forecast","sum"), actual=("actual","sum"), n=("forecast","size"))
+              .reset_index()
+        )
+
+    def select(self, ym=None, ym_range=None, brands=None, supply=None, parts=None):
+        """parts: None=전체, True=부품류만, False=제품만"""
+        start, end = ym_range if ym_range else (ym, ym)
+        cells = self.axis.window(start, end, brands=brands, supply=supply)
+        if parts is not None:
+            cells = cells[cells["is_parts"] == parts]
+        return cells
+
+    def select_months(self, ym=None, ym_range=None, brands=None, supply=None, parts=None):
+        cells = self.index.select(ym=ym, ym_range=ym_range, brands=brands, supply=supply)
+        if parts is not None:
+            cells = cells[cells["is_parts"] == parts]
+        return cells
+
+def rollup(cells, by):
+    """큐브 셀 → by 기준 합계 [by..., forecast, actual, n] (by 오름차순)"""
+    return (cells.groupby(by, sort=True, observed=True)
+                 .agg(forecast=("forecast","sum"), actual=("actual","sum"), n=("n","sum"))
+                 .reset_index())
+
+def cube_totals(cells):
+    """(예측 합계, 실수주 합계)"""
+    return int(cells["forecast"].sum()), int(cells["actual"].sum())
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_cube(version=0):
+    """
+    큐브 셀은 월 단위로 저장소에 캐시 — 바뀐 월만 그 월 팩트 파티션을 읽어 다시 집계
+    (셀 사전이 월마다 달라 합친 뒤 차원을 다시 인코딩, 누적합 축은 셀에서 재계산)
+    """
+    cells = cached_aggregate("cells", version,
+                             lambda months: Cube.aggregate(build_star(version, months).wide()))
+    cells = encode_dims(cells, CUBE_DIMS[:-1]).sort_values(CUBE_DIMS, ignore_index=True)
+    return shared(Cube(cells=cells))
+
+
+# ══════════════════════════════════════════════
+#  집계 파이프라인
+# ══════════════════════════════════════════════
+ENGINE_ENV = "DASHBOARD_ENGINE"     # pandas (기본) | polars
+DERIVED    = ["차이", "오차량", "달성률(%)"]
+_OPS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+        ">": operator.gt, ">=": operator.ge}
+
+def query_engine():
+    """설정된 집계 엔진 — polars 미설치면 pandas"""
+    engine = os.environ.get(ENGINE_ENV, "").strip().lower() or "pandas"
+    if engine == "polars" and not _HAS_POLARS:
+        log.warning("%s=polars 이지만 polars 미설치 — pandas 사용", ENGINE_ENV)
+        engine = "pandas"
+    return engine if engine in ("pandas", "polars") else "pandas"
+
+def derive(agg):
+    """합계 표에 파생 지표 추가 — 차이(실-예측) / 오차량 / 달성률(%) (예측 0 이면 0)"""
+    fc = agg["forecast"].to_numpy()
+    ac = agg["actual"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(fc > 0, np.round(ac / fc * 100, 1), 0)
+    return agg.assign(**{"차이": ac - fc, "오차량": np.abs(ac - fc), "달성률(%)": rate})
+
+def _cond(col, op, value):
+    """(컬럼, 연산자, 값) 조건 → 양 엔진 공통 비교 (op: == != < <= > >= in)"""
+    if op == "in":
+        return col.is_in(list(value)) if _HAS_POLARS and isinstance(col, pl.Expr) else col.isin(value)
+    return _OPS[op](col, value)
+
+def _agg_pandas(df, by, where):
+    for c, op, v in where:
+        df = df[_cond(df[c], op, v)]
+    n = ("n", "sum") if "n" in df.columns else ("forecast", "size")
+    return (df.groupby(by, sort=True, observed=True)
+              .agg(forecast=("forecast","sum"), actual=("actual","sum"), n=n)
+              .reset_index())
+
+def _agg_polars(df, by, where):
+    """LazyFrame 로 필터·그룹 합계 — 키는 문자열 사전순 정렬 후 원래 dtype 으로 복원"""
+    cols = list(dict.fromkeys([*by, *(c for c, _, _ in where), "forecast", "actual"]
+                              + (["n"] if "n" in df.columns else [])))
+    lf = pl.from_pandas(df[cols]).lazy().with_columns(pl.col(pl.Categorical).cast(pl.Utf8))
+    for c, op, v in where:
+        lf = lf.filter(_cond(pl.col(c), op, v))
+    n = pl.col("n").sum() if "n" in df.columns else pl.len().alias("n")
+    out = (lf.drop_nulls(by)
+             .group_by(by).agg(pl.col("forecast").sum(), pl.col("actual").sum(), n.cast(pl.Int64))
+             .sort(by)
+             .collect().to_pandas())
+    return out.astype({c: df[c].dtype for c in by})
+
+def rank(agg, sort=None, ascending=False, head=None, having=()):
+    """
+    파생 지표까지 붙은 합계 표 → having 조건 → 정렬 → 상위 N (엔진 공통)
+    head 가 있으면 전체 정렬 없이 top_positions 로 N 개만 골라 정렬
+    """
+    for c, op, v in having:
+        agg = agg[_cond(agg[c], op, v)]
+    if sort is not None and head is not None:
+        return agg.iloc[top_positions(agg[sort].to_numpy(), head, ascending)]
+    if sort is not None:
+        agg = agg.sort_values(sort, ascending=ascending)
+    return agg if head is None else agg.head(head)
+
+def summarize(df, by, where=(), having=(), sort=None, ascending=False, head=None, engine=None):
+    """
+    뷰 공통 집계 — df: 큐브 셀(n 합산) 또는 팩트 행(n = 행 수)
+    where  : 집계 전 조건 [(컬럼, 연산자, 값), ...]
+    having : 파생 지표 계산 후 조건 (같은 형식)
+    반환 [by..., forecast, actual, n, 차이, 오차량, 달성률(%)] — sort 미지정 시 by 오름차순
+    ※ 엔진은 필터·그룹 합계만 담당, 파생 지표·정렬은 공통 경로 (두 엔진 결과 동일)
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    engine = engine or query_engine()
+    agg = _agg_polars(df, by, where) if engine == "polars" else _agg_pandas(df, by, where)
+    return rank(derive(agg), sort, ascending, head, having)
+
+
+# ══════════════════════════════════════════════
+#  상위 N 선택
+# ══════════════════════════════════════════════
+def top_positions(values, k, ascending=False):
+    """
+    values 중 상위(ascending=True 면 하위) k 개의 위치 — 순위 순
+    argpartition 과 같은 O(n) 선택(np.partition 으로 k 번째 값) 후 뽑힌 k 개만 정렬
+    동점은 원래 위치 순 (DataFrame.nlargest / nsmallest keep="first" 와 같은 결과)
+    """
+    v = np.asarray(values, dtype=np.float64)
+    v = v if ascending else -v
+    if k <= 0 or not len(v):
+        return np.empty(0, dtype=np.int64)
+    if k < len(v):
+        kth = np.partition(v, k - 1)[k - 1]
+        pick = np.flatnonzero(v < kth)
+        pick = np.concatenate([pick, np.flatnonzero(v == kth)[:k - len(pick)]])
+    else:
+        pick = np.arange(len(v))
+    return pick[np.lexsort((pick, v[pick]))]
+
+def top_rows(df, sort, k, ascending=False, mask=None):
+    """df(mask 가 True 인 행) 중 sort 기준 상위 k 행 — 정렬은 고른 k 행만"""
+    pos = np.arange(len(df)) if mask is None else np.flatnonzero(np.asarray(mask))
+    return df.iloc[pos[top_positions(df[sort].to_numpy()[pos], k, ascending)]]
+
+def top_lists(df, specs, mask=None):
+    """
+    한 표에서 여러 상위/하위 목록을 한 번에 — 목록마다 O(n) 선택, 전체 정렬 없음
+    specs: {이름: (정렬 컬럼, k, ascending, having)} — having 은 rank 와 같은 [(컬럼, 연산자, 값), ...]
+    mask : 공통 행 조건 (예: 검색 일치) — 결과는 {이름: DataFrame} (호출 측에서 memo 로 필터별 1회, 메모 크기는 프레임별 합산)
+    """
+    base = np.ones(len(df), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    out = {}
+    for name, (sort, k, ascending, having) in specs.items():
+        m = base
+        for c, op, v in having:
+            m = m & np.asarray(_cond(df[c], op, v), dtype=bool)
+        out[name] = top_rows(df, sort, k, ascending, m)
+    return out
+
+
+# ══════════════════════════════════════════════
+#  결과 메모 (LRU)
+# ══════════════════════════════════════════════
+RESULT_CACHE_ENV = "DASHBOARD_RESULT_CACHE_MB"
+RESULT_CACHE_MB  = 256
+
+def filter_key(ym=None, ym_range=None, brands=None, supply=None, **extra):
+    """
+    필터 → 정규화 튜플 — 결과가 같은 표기는 같은 키
+    (단일 월 = 같은 월 기간, 브랜드 순서 무관, 공급단 '전체' = 미지정)
+    extra: 결과를 바꾸는 그 밖의 인자 (시리즈 · 검색어 · 정렬 등, 해시 가능 값)
+    """
+    start, end = ym_range if ym_range else (ym, ym)
+    brands = tuple(sorted(set(brands))) if brands else None
+    supply = None if not supply or supply == "전체" else supply
+    return (start, end, brands, supply) + tuple(sorted(extra.items()))
+
+# 로더(cache_resource)가 만든 공유 객체 — 결과에 함께 담겨도 그 결과의 크기로 세지 않음
+_SHARED = weakref.WeakValueDictionary()
+
+def shared(obj):
+    """obj 를 공유 객체로 등록하고 그대로 반환"""
+    _SHARED[id(obj)] = obj
+    return obj
+
+def _nbytes(obj):
+    """결과 크기(바이트) — dict · list · tuple 은 값을 재귀 합산, 공유 객체(색인 · 큐브)는 0"""
+    if _SHARED.get(id(obj)) is obj:
+        return 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(map(_nbytes, obj.values()))
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(map(_nbytes, obj))
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    return sys.getsizeof(obj)
+
+class ResultCache:
+    """
+    필터·집계 결과 메모 — 프로세스 내 모든 세션 공유
+    · 키   : (데이터 버전, 결과 이름, filter_key) — 버전이 바뀌면 이전 키는 LRU 로 자연히 밀려남
+    · 상한 : 결과 크기(바이트) 합계 — 초과 시 가장 오래 안 쓴 결과부터 제거
+    · 통계 : hits / misses / evictions (stats())
+    ※ 반환 객체는 세션 간 공유 — 호출 측에서 in-place 수정 금지
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[0]
+            self.misses += 1
+        value = compute()   # 잠금 밖에서 계산 — 다른 키 조회를 막지 않음
+        size  = _nbytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, n) = self._data.popitem(last=False)
+                self.bytes -= n
+                self.evictions += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                    "entries": len(self._data), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+@st.cache_resource(show_spinner=False)
+def result_cache():
+    mb = float(os.environ.get(RESULT_CACHE_ENV, RESULT_CACHE_MB))
+    return ResultCache(int(mb * (1 << 20)))
+
+def memo(name, version, flt, compute, **extra):
+    """compute() 결과를 (버전, 이름, 정규화된 필터 + extra) 키로 메모"""
+    return result_cache().get((version, name, filter_key(**flt, **extra)), compute)
+
+
+# ══════════════════════════════════════════════
+#  뷰 집계 · 예열
+# ══════════════════════════════════════════════
+# 화면과 예열이 같은 정의·같은 메모 키를 사용 (이름 = 메모 키)
+VIEW_AGGS = {
+    "brand_agg":   lambda c: summarize(c, "brand").rename(columns={"달성률(%)": "달성률"}),
+    "sup_agg":     lambda c: summarize(c[~c["is_parts"]], "supply",
+                                       where=[("supply", "!=", "<NA>")])[["supply", "forecast"]],
+    "series_agg":  lambda c: summarize(c, "series").rename(
+                                 columns={"forecast": "f", "actual": "a", "달성률(%)": "달성률"}),
+    "series_agg3": lambda c: summarize(c, "series").rename(columns={"차이": "차이량"}),
+}
+WARM_ENV    = "DASHBOARD_WARM_MONTHS"
+WARM_MONTHS = 3
+
+def view_cells(cube, version, flt):
+    """필터 조건의 기간 합계 셀 (KPI · 챗봇 · 탭1/3 공통)"""
+    return memo("cells", version, flt, lambda: cube.select(**flt))
+
+def view_agg(name, cube, version, flt):
+    return memo(name, version, flt, lambda: VIEW_AGGS[name](view_cells(cube, version, flt)))
+
+def warm_views(cube, version, n_months=None):
+    """
+    자주 쓰는 조회 조건의 셀·집계를 결과 메모에 미리 계산
+    최근 n_months 개 월(실적 있는 월) × (전체 + 브랜드별) × (전체 + 공급단별) — 사이드바와 같은 필터 표기
+    반환: 예열한 필터 조합 수
+    """
+    n_months = int(os.environ.get(WARM_ENV, WARM_MONTHS)) if n_months is None else n_months
+    opts = cube.options
+    brand_sets = [opts["brands"]] + [[b] for b in opts["brands"]]
+    n = 0
+    for ym in reversed(opts["months"][-n_months:] if n_months > 0 else []):
+        for brands in brand_sets:
+            for supply in ["전체"] + opts["supply"]:
+                flt = dict(ym=ym, ym_range=None, brands=brands, supply=supply)
+                for name in VIEW_AGGS:
+                    view_agg(name, cube, version, flt)
+                n += 1
+    return n
@@ -0,0 +1,240 @@
+"""
+수요예측 대시보드 SQL 조회 계층 (선택 — 환경변수 DASHBOARD_DB=duckdb|sqlite 일 때만 사용)
+- 정규화 저장소의 월 파티션을 월 digest 단위로 내장 DB 에 적재 (새 digest 만 추가) — ym / brand / supply / combo 인덱스
+- 버전마다 자기 매니페스트의 월 digest 행만 조회 — 이전 버전 세션도 이전 내용 그대로
+- 필터·검색·집계를 SQL 로 내려 보내고 결과 행만 pandas 로 받음 (팩트 전체를 메모리에 올리지 않음)
+- 화면 밖 배치 작업도 같은 경로 사용:  FactDB.open().sync(version).rollup("brand", ym="2026-01")
+"""
+import os
+import re
+import copy
+import sqlite3
+import logging
+import threading
+import streamlit as st
+import numpy as np
+import pandas as pd
+
+from data_layer import CACHE_DIR, WIDE_COLS, synced_store, build_star, live_manifests
+from query_layer import search_regex
+
+try:
+    import duckdb
+    _HAS_DUCKDB = True
+except ImportError:
+    _HAS_DUCKDB = False
+
+log = logging.getLogger(__name__)
+
+DB_ENV    = "DASHBOARD_DB"
+DB_COLS   = ["row_id","ym","brand","series","combo","name","supply","is_parts","forecast","actual"]
+DB_INDEX  = ["part", "ym", "brand", "supply", "combo"]
+DB_SCHEMA_VER = 2   # 테이블 구성이 바뀌면 올림 — 이전 파일은 쓰지 않음
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    part     VARCHAR,     -- 월 digest (저장소 매니페스트 months 값)
+    row_id   BIGINT,      -- 월 안의 팩트 행 위치 (조회 시 앞선 월 행 수를 더해 전 기간 위치로)
+    ym       VARCHAR, brand VARCHAR, series VARCHAR, combo VARCHAR, name VARCHAR, supply VARCHAR,
+    is_parts INTEGER, forecast BIGINT, actual BIGINT
+);
+CREATE TABLE IF NOT EXISTS parts (digest VARCHAR PRIMARY KEY, ym VARCHAR);
+"""
+
+
+# ══════════════════════════════════════════════
+#  팩트 DB
+# ══════════════════════════════════════════════
+def db_engine():
+    """설정된 엔진 ('duckdb' / 'sqlite') — 미설정·미설치면 None (pandas 경로)"""
+    engine = os.environ.get(DB_ENV, "").strip().lower()
+    if engine == "duckdb" and not _HAS_DUCKDB:
+        log.warning("%s=duckdb 이지만 duckdb 미설치 — sqlite 사용", DB_ENV)
+        engine = "sqlite"
+    return engine if engine in ("duckdb", "sqlite") else None
+
+class FactDB:
+    """
+    월별 팩트(wide, 파생 컬럼 제외)를 월 digest 단위로 담은 내장 DB
+    · sync()   : 버전의 월 digest 중 없는 것만 적재하고 그 버전에 묶인 FactDB 반환 (연결 · 잠금 공유)
+    · rows()   : 필터·검색 결과 행 (WIDE_COLS, index = 전 기간 팩트 행 위치)
+    · rollup() : GROUP BY 합계 [by..., forecast, actual, n] (by 오름차순)
+    버전에 묶이지 않은 객체(months=None)는 적재된 모든 월 digest 를 조회 (배치 작업 · 테스트용)
+    ※ 세션 스레드가 공유 — 연결 사용은 잠금으로 직렬화, 적재는 digest 당 1회 (다른 워커와는 DB 트랜잭션으로)
+    ※ duckdb 파일은 프로세스 1개 전용 (파일 잠금 — 다른 프로세스는 열 수 없음), 여러 워커 프로세스면 sqlite
+    """
+    def __init__(self, path, engine="sqlite"):
+        self.path   = path
+        self.engine = engine
+        self.months = None   # {ym: 월 digest} — sync() 가 버전에 묶음
+        self.base   = {}     # {ym: 앞선 월들의 팩트 행 수}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if engine == "duckdb":
+            self.con = duckdb.connect(path)
+        else:
+            self.con = sqlite3.connect(path, timeout=60, check_same_thread=False)
+            # X REGEXP P → regexp(P, X) — 검색 정규식 (대소문자 무시, 컴파일 결과는 re 모듈 캐시)
+            self.con.create_function("regexp", 2, lambda p, v: v is not None and re.search(p, v, re.IGNORECASE) is not None,
+                                     deterministic=True)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        with self._lock:
+            for stmt in filter(str.strip, _SCHEMA.split(";")):
+                self.con.execute(stmt)
+            for c in DB_INDEX:
+                self.con.execute(f"CREATE INDEX IF NOT EXISTS idx_facts_{c} ON facts ({c})")
+
+    @classmethod
+    def open(cls, engine=None):
+        engine = engine or db_engine() or "sqlite"
+        return cls(os.path.join(CACHE_DIR, f"facts.v{DB_SCHEMA_VER}.{engine}"), engine)
+
+    # ── 적재 ──
+    def sync(self, version=0):
+        """
+        저장소 월 digest 중 DB 에 없는 것만 적재 → 이 버전에 묶인 FactDB 반환 — 저장소가 없으면 적재 불가
+        살아 있는 매니페스트(data_layer.live_manifests)가 가리키지 않는 월 digest 행은 삭제
+        """
+        store = synced_store(version)
+        if store is None:
+            raise RuntimeError("정규화 저장소 없음 (pyarrow 필요) — 내장 DB 를 적재할 수 없습니다")
+        keys = store["months"]
+        with self._sync_lock:
+            with self._lock:
+                have = {d for (d,) in self.con.execute("SELECT digest FROM parts").fetchall()}
+            stale = [m for m in sorted(keys) if keys[m] not in have]
+            for m in stale:
+                self._load_month(m, build_star(version, (m,)).wide(), keys[m])
+            live = set(keys.values()).union(*(s["months"].values() for s in live_manifests()))
+            gone = sorted(have - live)
+            if gone:
+                marks = ",".join("?" * len(gone))
+                with self._lock:
+                    self.con.execute(f"DELETE FROM facts WHERE part IN ({marks})", gone)
+                    self.con.execute(f"DELETE FROM parts WHERE digest IN ({marks})", gone)
+                    self.con.commit()
+        if stale or gone:
+            log.info("내장 DB 갱신: 적재 %s / 삭제 %d개 월 digest", stale, len(gone))
+        return self.at(store)
+
+    def at(self, store):
+        """매니페스트의 월 digest 에 묶인 FactDB (연결 · 잠금 공유, 적재는 하지 않음)"""
+        view = copy.copy(self)
+        view.months = dict(store["months"])
+        view.base, n = {}, 0
+        for m in sorted(store["rows"]):
+            view.base[m] = n
+            n += store["rows"][m]
+        return view
+
+    def _load_month(self, ym, wide, digest):
+        """월 digest 1개 적재 — 이미 있으면 (다른 워커가 먼저 적재) 건너뜀"""
+        df = wide.reset_index(drop=True).assign(part=digest, row_id=np.arange(len(wide)))[["part", *DB_COLS]]
+        df = df.astype(object).where(df.notna(), None)
+        df["is_parts"] = df["is_parts"].map(lambda v: None if v is None else int(v))
+        rows = list(df.itertuples(index=False, name=None))
+        marks = ",".join("?" * (len(DB_COLS) + 1))
+        with self._lock:
+            self.con.execute("BEGIN TRANSACTION" if self.engine == "duckdb" else "BEGIN IMMEDIATE")
+            try:
+                if self.con.execute("SELECT 1 FROM parts WHERE digest = ?", [digest]).fetchone():
+                    self.con.rollback()
+                    return
+                self.con.execute("INSERT INTO parts VALUES (?, ?)", [digest, ym])
+                self.con.executemany(f"INSERT INTO facts VALUES ({marks})", rows)
+                self.con.commit()
+            except Exception:
+                self.con.rollback()
+                raise
+
+    # ── 조회 ──
+    def sql(self, query, params=()):
+        """임의 SELECT → DataFrame (배치 작업용)"""
+        with self._lock:
+            cur  = self.con.execute(query, list(params))
+            cols = [d[0] for d in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=cols)
+
+    def _where(self, ym=None, ym_range=None, brands=None, supply=None, series=None, search=None):
+        """필터 → (WHERE 절, 파라미터) — app_final.apply_filters 와 같은 의미 (검색은 search_regex 기준)"""
+        conds, params = [], []
+        if self.months is not None:   # 이 버전의 월 digest 행만
+            keys = list(self.months.values())
+            conds.append(f"part IN ({','.join('?' * len(keys))})" if keys else "1 = 0"); params += keys
+        if ym_range:
+            conds.append("ym BETWEEN ? AND ?"); params += list(ym_range)
+        elif ym:
+            conds.append("ym = ?"); params.append(ym)
+        if brands:
+            conds.append(f"brand IN ({','.join('?' * len(brands))})"); params += list(brands)
+        if supply and supply != "전체":
+            conds.append("supply = ?"); params.append(supply)
+        if series is not None:
+            conds.append("series = ?"); params.append(series)
+        if search:
+            rx = search_regex(search)
+            if rx is not None:   # 대소문자 무시 정규식 부분 일치
+                test = "regexp_matches({}, ?, 'i')" if self.engine == "duckdb" else "{} REGEXP ?"
+                pat  = rx.pattern
+            else:                # 대소문자 무시 문자 그대로 부분 일치 (%, _ 도 문자 그대로)
+                test = "lower({}) LIKE ? ESCAPE '\\'"
+                pat  = "%" + search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conds.append("(" + " OR ".join(test.format(c) for c in ("combo","series","name")) + ")")
+            params += [pat] * 3
+        return (" WHERE " + " AND ".join(conds)) if conds else "", params
+
+    def row_ids(self, **filters):
+        """조건에 맞는 팩트 행 번호만 (전 기간 행 위치 순)"""
+        where, params = self._where(**filters)
+        df = self.sql(f"SELECT ym, row_id FROM facts{where} ORDER BY ym, row_id", params)
+        return self._positions(df)
+
+    def _positions(self, df):
+        """(ym, 월 안 행 위치) → 전 기간 팩트 행 위치"""
+        base = df["ym"].map(self.base).fillna(0).to_numpy(dtype=np.int64)
+        return base + df["row_id"].to_numpy(dtype=np.int64)
+
+    def rows(self, **filters):
+        """조건에 맞는 팩트 행 + 파생 컬럼 (StarSchema.rows 와 같은 모양)"""
+        where, params = self._where(**filters)
+        df = self.sql(f"SELECT {', '.join(DB_COLS)} FROM facts{where} ORDER BY ym, row_id", params)
+        df.index = self._positions(df)
+        fc = df["forecast"].to_numpy(dtype=np.int64)
+        ac = df["actual"].to_numpy(dtype=np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(fc > 0, np.round(ac / fc * 100, 1), 0)
+        df = df.assign(
+            forecast=fc, actual=ac, is_parts=df["is_parts"].astype(bool),
+            **{"차이": ac - fc, "오차량": np.abs(ac - fc), "달성률(%)": rate},
+        )
+        try:    df["ym_dt"] = pd.to_datetime(df["ym"] + "-01")
+        except: df["ym_dt"] = df["ym"]
+        return df[WIDE_COLS]
+
+    def rollup(self, by, **filters):
+        """GROUP BY 합계 — 키가 NULL 인 행은 제외 (pandas groupby 기본과 동일)"""
+        by = [by] if isinstance(by, str) else list(by)
+        where, params = self._where(**filters)
+        keys = " AND ".join(f"{c} IS NOT NULL" for c in by)
+        where = f"{where} AND {keys}" if where else f" WHERE {keys}"
+        cols = ", ".join(by)
+        return self.sql(
+            f"SELECT {cols}, SUM(forecast) AS forecast, SUM(actual) AS actual, COUNT(*) AS n "
+            f"FROM facts{where} GROUP BY {cols} ORDER BY {cols}", params,
+        ).astype({"forecast": np.int64, "actual": np.int64, "n": np.int64})
+
+@st.cache_resource(show_spinner=False)
+def shared_db(engine):
+    """엔진별 DB 연결 — 프로세스당 1개, 버전별 FactDB 가 함께 씀"""
+    return FactDB.open(engine)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_db(version=0):
+    """설정 시 데이터 버전에 묶인 FactDB — 미설정이거나 적재 실패면 None"""
+    engine = db_engine()
+    if engine is None:
+        return None
+    try:
+        return shared_db(engine).sync(version)
+    except Exception:
+        log.exception("내장 DB 준비 실패 — pandas 경로 사용")
+        return None
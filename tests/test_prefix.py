@@ -0,0 +1,63 @@
+"""
+콤보 접두어 색인 검사 — 계열 합계 · 자동 완성을 같은 코드에 대한 pandas groupby 결과와 비교
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_layer import PrefixIndex, code_family
+
+CODES = ["DHT1200-A", "DHT12000", "DHT1200HF", "DHT1200HF-2H1", "dht1300", "T50-1", "T500", "T50X", None]
+ROWS  = pd.DataFrame({
+    "combo_id": [0, 1, 2, 3, 4, 5, 6, 7, 0, 2, 8],
+    "forecast": [10, 20, 30, 40, 50, 60, 70, 80, 5, 7, 9],
+    "actual":   [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11],
+})
+
+@pytest.mark.parametrize("code, n, want", [
+    ("DHT1200HF-2H1", 3, "DHT1200"),
+    ("DHT1200HF-2H1", 7, "DHT1200HF"),
+    ("DHT1200HF-2H1", 9, "DHT1200HF-2H1"),
+    ("DHT1200-A", 7, "DHT1200-A"),
+    ("T50-1", 1, "T50"),
+])
+def test_code_family(code, n, want):
+    assert code_family(code, n) == want
+
+def _expected(prefix):
+    """같은 코드의 pandas groupby — 접두어로 시작하는 행만, 다음 마디별 합계"""
+    df = ROWS.assign(code=[CODES[i] for i in ROWS["combo_id"]]).dropna(subset=["code"])
+    df["code"] = df["code"].str.upper()
+    df = df[df["code"].str.startswith(prefix.upper())]
+    df["family"] = [code_family(c, len(prefix)) for c in df["code"]]
+    out = df.groupby("family").agg(forecast=("forecast", "sum"), actual=("actual", "sum"),
+                                   n=("code", "size"), combos=("code", "nunique")).reset_index()
+    return out
+
+@pytest.mark.parametrize("prefix", ["", "DHT", "DHT1200", "T", "T5", "T50", "X"])
+def test_families_match_groupby(prefix):
+    idx = PrefixIndex(CODES)
+    cs = idx.totals(ROWS["combo_id"], ROWS["forecast"], ROWS["actual"])
+    got = idx.families(cs, prefix)[["family", "forecast", "actual", "n", "combos"]]
+    want = _expected(prefix)
+    assert got["family"].is_unique
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), want, check_dtype=False)
+    fam = idx.family(cs, prefix)
+    assert [fam["forecast"], fam["actual"], fam["n"], fam["combos"]] == want[["forecast", "actual", "n", "combos"]].sum().tolist()
+
+def test_families_groups_non_contiguous_codes():
+    # 정렬 순서: DHT1200-A < DHT12000 < DHT1200HF — DHT1200 계열이 DHT12000 을 사이에 두고 떨어져 있음
+    idx = PrefixIndex(["DHT1200-A", "DHT12000", "DHT1200HF"])
+    cs = idx.totals([0, 1, 2], [1, 2, 4], [0, 0, 0])
+    got = idx.families(cs, "DHT")
+    assert got["family"].tolist() == ["DHT1200", "DHT12000"]
+    assert got["forecast"].tolist() == [5, 2]
+    assert got["combos"].tolist() == [2, 1]
+
+def test_complete_limits_to_present_codes():
+    idx = PrefixIndex(CODES)
+    assert idx.complete("dht12") == ["DHT1200-A", "DHT12000", "DHT1200HF", "DHT1200HF-2H1"]
+    assert idx.complete("DHT12", limit=2) == ["DHT1200-A", "DHT12000"]
+    cs = idx.totals([1, 3], [1, 1], [1, 1])
+    assert idx.complete("DHT12", cs) == ["DHT12000", "DHT1200HF-2H1"]
+    assert idx.complete("Z") == []
@@ -0,0 +1,35 @@
+"""
+상위 목록 선택 · 결과 메모 크기 검사 — top_lists 의 {이름: DataFrame} 결과가 프레임 크기 합으로 계산되는지
+"""
+import numpy as np
+import pandas as pd
+
+from query_layer import top_rows, top_lists, ResultCache, _nbytes
+
+DF = pd.DataFrame({
+    "combo":  [f"C{i:04d}" for i in range(2000)],
+    "오차량": np.arange(2000) % 97,
+    "차이":   (np.arange(2000) % 31) - 15,
+})
+
+SPECS = {
+    "top5_err":   ("오차량", 5, False, ()),
+    "top3_over":  ("차이", 3, False, [("차이", ">", 0)]),
+    "top3_under": ("차이", 3, True, [("차이", "<", 0)]),
+}
+
+def test_top_lists_matches_stable_sort():
+    out = top_lists(DF, SPECS)
+    want = DF.sort_values("오차량", ascending=False, kind="stable").head(5)
+    pd.testing.assert_frame_equal(out["top5_err"], want)
+    assert (out["top3_over"]["차이"] == 15).all() and (out["top3_under"]["차이"] == -15).all()
+    pd.testing.assert_frame_equal(top_rows(DF, "차이", 3, True), out["top3_under"])
+
+def test_dict_result_counted_by_frames():
+    out = {"all": DF, **top_lists(DF, SPECS)}
+    frames = sum(int(v.memory_usage(index=True, deep=True).sum()) for v in out.values())
+    assert _nbytes(out) >= frames
+    # 상한보다 큰 dict 결과는 보관하지 않음
+    cache = ResultCache(max_bytes=frames // 2)
+    cache.get("k", lambda: out)
+    assert cache.stats()["entries"] == 0 and cache.bytes == 0
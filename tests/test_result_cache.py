@@ -0,0 +1,70 @@
+"""
+ResultCache 검사 — LRU 순서 · 바이트 상한 · (버전, 이름, filter_key) 키 분리 · 통계
+"""
+import numpy as np
+import pytest
+
+import query_layer
+from query_layer import ResultCache, memo
+
+
+def _arr(n):
+    return np.zeros(n, dtype=np.uint8)
+
+
+class Calls:
+    """compute 호출 횟수 기록"""
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, value):
+        def compute():
+            self.n += 1
+            return value
+        return compute
+
+
+def test_lru_order():
+    cache, calls = ResultCache(300), Calls()
+    for k in "abc":
+        cache.get(k, calls(_arr(100)))
+    cache.get("a", calls(None))           # a 를 최근으로
+    cache.get("d", calls(_arr(100)))      # 가장 오래 안 쓴 b 제거
+    assert list(cache._data) == ["c", "a", "d"]
+    assert calls.n == 4
+    s = cache.stats()
+    assert (s["hits"], s["misses"], s["evictions"], s["entries"], s["bytes"]) == (1, 4, 1, 3, 300)
+
+
+def test_byte_cap():
+    cache, calls = ResultCache(250), Calls()
+    cache.get("a", calls(_arr(100)))
+    cache.get("b", calls(_arr(100)))
+    cache.get("c", calls(_arr(200)))      # a · b 모두 밀려나야 상한 이하
+    assert list(cache._data) == ["c"]
+    assert cache.bytes == 200 <= cache.max_bytes
+    big = cache.get("big", calls(_arr(1000)))   # 상한보다 큰 결과는 반환만, 저장하지 않음
+    assert len(big) == 1000
+    assert list(cache._data) == ["c"]
+    cache.get("big", calls(_arr(1000)))
+    assert calls.n == 5
+
+
+def test_key_isolation(monkeypatch):
+    cache = ResultCache(1 << 20)
+    monkeypatch.setattr(query_layer, "result_cache", lambda: cache)
+    flt = dict(ym="2026-01", ym_range=None, brands=["B", "A"], supply="전체")
+    got = {}
+    for version in ("v1", "v2"):
+        for name in ("cells", "brand_agg"):
+            got[version, name] = memo(name, version, flt, lambda: object())
+    assert len(set(map(id, got.values()))) == 4
+
+    # 같은 결과를 뜻하는 필터 표기는 같은 키 (단일 월 = 같은 월 기간, 브랜드 순서, 공급단 '전체')
+    same = dict(ym=None, ym_range=("2026-01", "2026-01"), brands=["A", "B"], supply=None)
+    assert memo("cells", "v1", same, lambda: pytest.fail("recomputed")) is got["v1", "cells"]
+
+    # 필터 · extra 인자가 다르면 다른 키
+    assert memo("cells", "v1", dict(flt, brands=["A"]), lambda: "A") == "A"
+    assert memo("cells", "v1", flt, lambda: "q", query="체어") == "q"
+    assert memo("cells", "v1", flt, lambda: pytest.fail("recomputed"), query="체어") == "q"
@@ -0,0 +1,86 @@
+"""
+SearchIndex 검색 방식 검사 — 부분 일치 · 정규식 · 초성 · 입력 중 음절 · 오타, 일치 없음
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_layer import SearchIndex, _substring_distance, chosung_key, jamo_key, search_regex
+
+DIM = pd.DataFrame({
+    "combo":  ["DHT1200-1", "DHT1200-2", "T500-1", "SPN-1"],
+    "series": ["ALL ROUND", "ALL ROUND", "T50", "SPOON"],
+    "name":   ["올라운드 체어 화이트", "올라운드 체어 블랙", "T50 체어 (블랙", "스푼 의자"],
+})
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex(DIM)
+
+
+def _ids(result):
+    return result[1].tolist()
+
+
+def test_keys():
+    assert chosung_key("올라운드 체어") == "ㅇㄹㅇㄷㅊㅇ"
+    assert jamo_key("체어") == "ㅊㅔㅇㅓ"
+    assert _substring_distance("abc", "xxabcxx") == (0, 5)
+    assert _substring_distance("abd", "xxabcxx")[0] == 1
+    assert _substring_distance("ㅊㅔㅇㅓ", "")[0] == 4
+
+
+@pytest.mark.parametrize("query, ids", [
+    ("DHT", [0, 1]),
+    ("dht1200-2", [1]),
+    ("체어 블랙", [1]),
+    ("all round", [0, 1]),
+    ("DHT.*-2", [1]),        # 정규식
+])
+def test_exact(index, query, ids):
+    mode, got, _ = index.lookup(query)
+    assert mode == "exact"
+    assert got.tolist() == ids
+    assert index.match(query).tolist() == ids
+
+
+def test_invalid_regex_is_literal(index):
+    assert search_regex("(블랙") is None
+    mode, ids, labels = index.lookup("(블랙")
+    assert (mode, ids.tolist(), labels) == ("exact", [2], ["T50 체어 (블랙"])
+
+
+def test_chosung(index):
+    mode, ids, labels = index.lookup("ㅇㄹㅇㄷ")
+    assert mode == "chosung"
+    assert ids.tolist() == [0, 1]
+    assert set(labels) == {"올라운드 체어 화이트", "올라운드 체어 블랙"}
+
+
+def test_partial_syllable(index):
+    """마지막 음절을 입력 중 (받침·모음 전) — 자모 키로 일치"""
+    mode, ids, _ = index.lookup("올라운ㄷ")
+    assert (mode, ids.tolist()) == ("fuzzy", [0, 1])
+
+
+@pytest.mark.parametrize("query, ids", [
+    ("올나운드", [0, 1]),      # 자모 1개 오타
+    ("체어블랙", [1, 2]),      # 띄어쓰기 누락 ('체어 (블랙' 은 괄호 1개 차이)
+])
+def test_fuzzy(index, query, ids):
+    mode, got, _ = index.lookup(query)
+    assert (mode, got.tolist()) == ("fuzzy", ids)
+
+
+@pytest.mark.parametrize("query", ["xyz", "ㅈㅁㅇ", "캐비닛"])
+def test_no_match(index, query):
+    mode, ids, labels = index.lookup(query)
+    assert (mode, ids.tolist(), labels) == (None, [], [])
+
+
+def test_present_limits_matches(index):
+    """조회 행에 없는 콤보의 문자열은 일치로 세지 않고 다음 방식으로 넘어가지도 않음"""
+    present = np.array([False, True, False, False])
+    assert _ids(index.lookup("올라운드", present)) == [1]
+    assert _ids(index.lookup("스푼", present)) == []
@@ -0,0 +1,140 @@
+"""
+정규화 저장소 증분 동기화 검사 — 원본을 한 단계씩 바꾸며 증분 동기화한 저장소가
+같은 원본을 빈 저장소에 처음부터 동기화한 결과와 같은지 비교, 버전별 매니페스트 기록 조건 확인
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import data_layer as dl
+
+pytest.importorskip("pyarrow")
+
+F_HEADER = "ym,brand,series,combo,name,supply,forecast\n"
+A_HEADER = "ym,brand,series,combo,name,supply,actual\n"
+
+FORECAST = [
+    "2026-01,데스커,ALL ROUND,DHT1200-1,올라운드 체어,VN의자,100",
+    "2026-01,데스커,데스커,DSK-X,브랜드명 시리즈,VN의자,5",
+    "2026-01,시디즈,T50,T500-1,T50 체어,제품,200",
+    "2026-02,데스커,ALL ROUND,DHT1200-1,올라운드 체어,VN의자,120",
+    "2026-02,시디즈,T50,T500-1,T50 체어,외산A,210",
+    "2026-02,시디즈,T50,T500-2,T50 체어 화이트,,30",
+]
+ACTUAL = [
+    "2026-01,데스커,ALL ROUND,DHT1200-1,올라운드 체어,VN의자,90",
+    "2026-01,시디즈,T50,T500-1,T50 체어,제품,180",
+    "2026-02,데스커,ALL ROUND,DHT1200-1,올라운드 체어,VN의자,130",
+    "2026-02,시디즈,T50,T500-2,T50 체어 화이트,외산A,25",
+]
+MAP = "raw,supply\n"
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text)
+
+
+@pytest.fixture
+def src(tmp_path, monkeypatch):
+    """평면 원본 CSV 두 개 + 공급단 매핑이 있는 폴더 — 데이터 파일 탐색을 이 폴더로 고정"""
+    d = tmp_path / "src"
+    d.mkdir()
+    _write(d / "forecast_data.csv", F_HEADER + "\n".join(FORECAST) + "\n")
+    _write(d / "actual_data.csv", A_HEADER + "\n".join(ACTUAL) + "\n")
+    _write(d / dl.SUPPLY_MAP_FILE, MAP)
+    monkeypatch.setattr(dl, "_candidate_dirs", lambda: [str(d)])
+    return d
+
+
+def _sync(monkeypatch, root, version=None):
+    """root 아래 저장소로 동기화"""
+    cache = os.path.join(root, ".data_cache")
+    monkeypatch.setattr(dl, "CACHE_DIR", cache)
+    monkeypatch.setattr(dl, "STORE_DIR", os.path.join(cache, "store"))
+    monkeypatch.setattr(dl, "VERSION_DIR", os.path.join(cache, "store", "versions"))
+    return dl.sync_store(dl.find_data_file(dl.SUPPLY_MAP_FILE), version)
+
+
+def _frames(manifest):
+    months = sorted(manifest["months"])
+    out = []
+    for kind in dl.KINDS:
+        df = dl._read_parts(manifest["parts"], kind, months)
+        out.append(df.sort_values(["ym", "combo"], ignore_index=True))
+    return out
+
+
+def _assert_same_as_full(monkeypatch, tmp_path, inc, step):
+    full = _sync(monkeypatch, str(tmp_path / f"full-{step}"))
+    for key in ("sources", "months", "rows", "n_combos", "all_brands", "brands"):
+        assert inc[key] == full[key], key
+    for a, b in zip(_frames(inc), _frames(full)):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_incremental_sync_matches_full_sync(src, tmp_path, monkeypatch):
+    root = str(tmp_path / "inc")
+    first = _sync(monkeypatch, root)
+    assert sorted(first["months"]) == ["2026-01", "2026-02"]
+    _assert_same_as_full(monkeypatch, tmp_path, first, "initial")
+
+    # 실적 한 달 수정 — 첫 행 공급단이 바뀌어 다른 달 예측의 supply 보정도 바뀜
+    actual = ACTUAL[:1] + ["2026-01,시디즈,T50,T500-1,T50 체어,외산A,180"] + ACTUAL[2:]
+    _write(src / "actual_data.csv", A_HEADER + "\n".join(actual) + "\n")
+    inc = _sync(monkeypatch, root)
+    assert inc["months"]["2026-01"] != first["months"]["2026-01"]
+    assert inc["months"]["2026-02"] != first["months"]["2026-02"]
+    _assert_same_as_full(monkeypatch, tmp_path, inc, "edit")
+
+    # 새 달 추가 — 새 브랜드의 브랜드명 시리즈는 기존 달 예측에서도 빠져야 함
+    forecast = FORECAST + ["2026-03,일룸,일룸,ILM-1,일룸 체어,수입상품,40",
+                           "2026-03,일룸,LINK,LNK-1,링크 체어,수입상품,60"]
+    actual += ["2026-03,일룸,LINK,LNK-1,링크 체어,수입상품,55"]
+    _write(src / "forecast_data.csv", F_HEADER + "\n".join(forecast) + "\n")
+    _write(src / "actual_data.csv", A_HEADER + "\n".join(actual) + "\n")
+    prev, inc = inc, _sync(monkeypatch, root)
+    assert sorted(inc["months"]) == ["2026-01", "2026-02", "2026-03"]
+    assert inc["rows"]["2026-03"] == 1   # 브랜드명 시리즈(ILM-1) 제외
+    assert prev["months"]["2026-02"] == inc["months"]["2026-02"]
+    _assert_same_as_full(monkeypatch, tmp_path, inc, "add")
+
+    # 공급단 매핑 변경 — 전체 재구축
+    _write(src / dl.SUPPLY_MAP_FILE, MAP + "외산A,외주/상품\n")
+    prev, inc = inc, _sync(monkeypatch, root)
+    assert inc["map"] != prev["map"]
+    f, _ = _frames(inc)
+    assert set(f.loc[f["combo"] == "T500-1", "supply"]) == {"외주/상품"}
+    _assert_same_as_full(monkeypatch, tmp_path, inc, "map")
+
+
+def test_version_manifest_only_for_matching_sources(src, tmp_path, monkeypatch):
+    root = str(tmp_path / "pin")
+    token = dl.source_token()
+    m = _sync(monkeypatch, root, version=token)
+    assert m["version"] == token
+    assert os.path.exists(dl._manifest_path(token))
+
+    # 이미 바뀐 원본을 이전 버전 이름으로 기록하지 않음
+    stale = _sync(monkeypatch, root, version="0" * 16)
+    assert stale["version"] is None
+    assert not os.path.exists(dl._manifest_path("0" * 16))
+
+    # 원본이 바뀌어도 고정된 버전은 그 버전의 월 파티션을 그대로 가리킴
+    _write(src / "forecast_data.csv", F_HEADER + "\n".join(FORECAST[:3]) + "\n")
+    new = _sync(monkeypatch, root, version=dl.source_token())
+    assert new["months"]["2026-02"] != m["months"]["2026-02"]
+    again = _sync(monkeypatch, root, version=token)
+    assert again["months"] == m["months"]
+    assert dl._complete(again)
+
+
+def test_pin_uses_watcher_signatures(src, tmp_path, monkeypatch):
+    """감시 스레드가 기록한 서명이 있으면 원본을 다시 해시하지 않음"""
+    token = dl.source_token()
+    dl.note_sources(token, {p: dl.file_signature(p) for p in dl.watched_files()})
+    monkeypatch.setattr(dl, "source_token", lambda hashes=None: pytest.fail("re-hashed sources"))
+    assert dl.sources_match(token)
+    os.utime(src / "forecast_data.csv", ns=(0, 0))
+    assert not dl.sources_match(token)
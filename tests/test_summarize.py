@@ -0,0 +1,82 @@
+"""
+summarize 엔진 일치 검사 — 고정된 작은 표를 pandas / Polars 엔진과 내장 DB(sqlite) rollup 으로 집계해
+아래 기대값(손으로 계산한 골든 출력)과 비교
+"""
+import pandas as pd
+import pytest
+
+from query_layer import summarize
+from sql_layer import FactDB
+
+CELLS = pd.DataFrame({
+    "ym":       ["2026-01", "2026-01", "2026-01", "2026-02", "2026-02", "2026-02"],
+    "brand":    ["A", "A", "B", "A", "B", "C"],
+    "series":   ["S1", "S2", "S1", "S1", "S3", "S2"],
+    "supply":   ["X", "Y", "X", None, "Y", "X"],
+    "is_parts": [False, False, False, False, True, False],
+    "forecast": [100, 50, 0, 30, 200, 10],
+    "actual":   [90, 80, 10, 30, 150, 0],
+    "n":        [2, 1, 1, 1, 3, 1],
+}).astype({"brand": "category", "series": "category", "supply": "category"})
+
+DERIVED = ["차이", "오차량", "달성률(%)"]
+
+EXPECTED = {
+    # 큐브 셀 — n 은 셀 n 의 합
+    "brand": pd.DataFrame(
+        [["A", 180, 200, 4, 20, 20, 111.1],
+         ["B", 200, 160, 4, -40, 40, 80.0],
+         ["C", 10, 0, 1, -10, 10, 0.0]],
+        columns=["brand", "forecast", "actual", "n", *DERIVED]),
+    # 키가 결측인 행은 제외
+    "supply": pd.DataFrame(
+        [["X", 110, 100, 4, -10, 10, 90.9],
+         ["Y", 250, 230, 4, -20, 20, 92.0]],
+        columns=["supply", "forecast", "actual", "n", *DERIVED]),
+    # where → 그룹 합계 → having → 오차량 큰 순 상위 2 (동점은 키 순서)
+    "ranked": pd.DataFrame(
+        [["2026-02", "S3", 200, 150, 3, -50, 50, 75.0],
+         ["2026-01", "S1", 100, 100, 3, 0, 0, 100.0]],
+        columns=["ym", "series", "forecast", "actual", "n", *DERIVED]),
+    # 팩트 행 — n 은 행 수
+    "rows_brand": pd.DataFrame(
+        [["A", 180, 200, 3, 20, 20, 111.1],
+         ["B", 200, 160, 2, -40, 40, 80.0],
+         ["C", 10, 0, 1, -10, 10, 0.0]],
+        columns=["brand", "forecast", "actual", "n", *DERIVED]),
+}
+
+def _cases(engine):
+    rows = CELLS.drop(columns="n")
+    return {
+        "brand":  summarize(CELLS, "brand", engine=engine),
+        "supply": summarize(CELLS, "supply", engine=engine),
+        "ranked": summarize(CELLS, ["ym", "series"], where=[("brand", "in", ["A", "B"])],
+                            having=[("달성률(%)", "<=", 100)], sort="오차량", head=2, engine=engine),
+        "rows_brand": summarize(rows, "brand", engine=engine),
+    }
+
+def _same(got, want):
+    got = got.reset_index(drop=True)
+    got = got.astype({c: object for c in got.columns if isinstance(got[c].dtype, pd.CategoricalDtype)})
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+@pytest.mark.parametrize("engine", ["pandas", "polars"])
+def test_summarize_matches_golden(engine):
+    if engine == "polars":
+        pytest.importorskip("polars")
+    for name, got in _cases(engine).items():
+        _same(got, EXPECTED[name])
+
+def test_sqlite_rollup_matches_golden(tmp_path):
+    db = FactDB(str(tmp_path / "facts.sqlite"), "sqlite")
+    wide = CELLS.drop(columns="n").astype({"brand": object, "series": object, "supply": object})
+    wide = wide.assign(combo=wide["series"] + "-01", name=wide["series"])
+    for ym, part in wide.groupby("ym"):
+        db._load_month(ym, part, ym)
+    want = EXPECTED["rows_brand"]
+    _same(db.rollup("brand"), want[["brand", "forecast", "actual", "n"]])
+    _same(db.rollup("brand", ym="2026-01"),
+          pd.DataFrame([["A", 150, 170, 2], ["B", 0, 10, 1]], columns=["brand", "forecast", "actual", "n"]))
+    _same(db.rollup("supply"),
+          pd.DataFrame([["X", 110, 100, 3], ["Y", 250, 230, 2]], columns=["supply", "forecast", "actual", "n"]))
@@ -0,0 +1,34 @@
+"""
+공급단 정규화 검사 — 기본 매핑(SUPPLY_NORM) + supply_map.csv 덮어쓰기, 매핑 없는 원본값 보고
+"""
+import pandas as pd
+
+import data_layer as dl
+from data_layer import SUPPLY_NA, SUPPLY_NORM, load_supply_map, normalize_supply
+
+
+def test_unmapped_values_are_reported():
+    s = pd.Series([" 시디즈 ", "VN의자", "신규공급처", "신규공급처", "베트남", None, "", "외산A"])
+    out, unmapped = normalize_supply(s, SUPPLY_NORM)
+    assert out.tolist() == ["시디즈(평택)", "베트남", SUPPLY_NA, SUPPLY_NA, "베트남",
+                            SUPPLY_NA, SUPPLY_NA, SUPPLY_NA]
+    assert unmapped == {"신규공급처": 2, "외산A": 1}   # 결측 표기 · 표준 공급단은 보고하지 않음
+    assert out.index.equals(s.index)
+
+
+def test_shipped_map_adds_nothing():
+    """배포 파일은 헤더만 — 기본 매핑을 되풀이하지 않음"""
+    assert load_supply_map() == SUPPLY_NORM
+
+
+def test_map_file_overrides_defaults(tmp_path, monkeypatch):
+    monkeypatch.setattr(dl, "_candidate_dirs", lambda: [str(tmp_path)])
+    assert load_supply_map() == SUPPLY_NORM   # 파일 없음
+
+    with open(tmp_path / dl.SUPPLY_MAP_FILE, "w", encoding="utf-8") as fh:
+        fh.write("# 주석\nraw,supply\n수입상품,외주/상품\n신규공급처, 베트남\n")
+    mapping = load_supply_map()
+    assert mapping["수입상품"] == "외주/상품"
+    assert mapping["신규공급처"] == "베트남"
+    assert {k: v for k, v in mapping.items() if k not in ("수입상품", "신규공급처")} == {
+        k: v for k, v in SUPPLY_NORM.items() if k != "수입상품"}
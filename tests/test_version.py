@@ -0,0 +1,97 @@
+"""
+DataVersion 검사 — 내용 없는 touch 는 같은 토큰, 내용 변경은 준비가 끝난 뒤에만 토큰 교체,
+준비 실패 시 이전 토큰 유지 (감시 주기는 길게 두고 refresh() 를 직접 호출)
+"""
+import os
+import threading
+
+import pytest
+
+import version_layer
+from version_layer import DataVersion
+
+
+class Prepare:
+    """준비 호출 기록 — release 가 풀릴 때까지 대기, fail 토큰이면 예외"""
+    def __init__(self, fail=None):
+        self.calls = []
+        self.entered = threading.Event()
+        self.done = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = fail
+
+    def __call__(self, token):
+        self.calls.append(token)
+        self.entered.set()
+        self.release.wait(5)
+        self.done.set()
+        if token == self.fail:
+            raise RuntimeError("prepare failed")
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    p = tmp_path / "forecast_data.csv"
+    p.write_text("ym,combo,forecast\n2026-01,A,1\n", encoding="utf-8")
+    monkeypatch.setattr(version_layer, "watched_files", lambda: [str(p)])
+    return p
+
+
+def _start(prepare):
+    """감시 서비스 시작 — 시작 예열(prepare(현재 토큰))이 끝날 때까지 기다림"""
+    dv = DataVersion(poll_sec=3600, prepare=prepare)
+    assert prepare.done.wait(5)
+    prepare.entered.clear()
+    prepare.done.clear()
+    return dv
+
+
+def test_touch_keeps_token(source):
+    prepare = Prepare()
+    dv = _start(prepare)
+    try:
+        token = dv.token
+        st = os.stat(source)
+        os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert dv.refresh() == token
+        assert prepare.calls == [token]
+    finally:
+        dv.stop()
+
+
+def test_token_swaps_after_prepare(source):
+    prepare = Prepare()
+    dv = _start(prepare)
+    try:
+        old = dv.token
+        source.write_text("ym,combo,forecast\n2026-01,A,2\n", encoding="utf-8")
+        prepare.release.clear()
+        t = threading.Thread(target=dv.refresh)
+        t.start()
+        assert prepare.entered.wait(5)
+        new = prepare.calls[-1]
+        assert new != old
+        assert (dv.token, dv.latest) == (old, new)   # 준비 중에는 이전 버전으로 조회
+        prepare.release.set()
+        t.join(5)
+        assert dv.token == new
+        assert dv.refresh() == new
+        assert prepare.calls == [old, new]
+    finally:
+        prepare.release.set()
+        dv.stop()
+
+
+def test_failed_prepare_keeps_token(source):
+    prepare = Prepare()
+    dv = _start(prepare)
+    try:
+        old = dv.token
+        source.write_text("ym,combo,forecast\n2026-01,A,3\n", encoding="utf-8")
+        prepare.fail = version_layer.source_token({str(source): version_layer.content_hash([str(source)])})
+        assert dv.refresh() == old
+        assert dv.token == old
+        assert prepare.calls == [old, prepare.fail]
+    finally:
+        dv.stop()
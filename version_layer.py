@@ -0,0 +1,148 @@
+"""
+수요예측 대시보드 데이터 버전 서비스
+- 원본(평면 CSV · 월 파티션 파일 · 공급단 매핑)을 백그라운드 스레드가 주기적으로 감시
+- 파일 서명(크기 · 수정시각 ns · inode)이 바뀐 파일만 내용 해시 → 내용이 같으면 토큰 그대로
+- 모든 캐시는 토큰을 버전 키로 사용 — 화면 재실행은 토큰만 읽음 (파일 시스템 접근 없음)
+- 변경 감지 시 다음 버전(저장소 · 큐브 · 기본 조회 월 팩트 · 내장 DB)을 감시 스레드에서 미리 만든 뒤
+  토큰을 교체 — 준비되는 동안 세션은 이전 버전으로 조회 (요청 경로에서 재로드 비용 없음)
+- 시작 직후와 매 교체 전에 자주 쓰는 뷰 집계를 결과 메모에 예열 (query_layer.warm_views)
+"""
+import os
+import logging
+import threading
+import streamlit as st
+
+from data_layer import (watched_files, source_token, content_hash, file_signature, note_sources,
+                        synced_store, load_star, combo_count)
+from query_layer import (load_cube, load_filter_index, load_search_index, load_prefix_index,
+                         warm_views, result_cache)
+from sql_layer import load_db
+
+log = logging.getLogger(__name__)
+
+POLL_ENV = "DASHBOARD_POLL_SEC"
+POLL_SEC = 2.0
+WATCH_THREAD = "data-version"
+SAMPLE_TOKEN = "sample"   # 원본이 없을 때 (샘플 데이터)
+
+
+# ══════════════════════════════════════════════
+#  원본 감시
+# ══════════════════════════════════════════════
+class DataVersion:
+    """
+    데이터 버전 토큰 발행기 — 프로세스당 1개 (data_version_service)
+    · token   : 세션이 쓰는 (준비 완료된) 버전 — 파일 경로 + 내용 해시 기반
+                (같은 초 안의 두 번 변경 · mtime 유지 복사도 구분, 내용 없는 touch 는 같은 토큰)
+    · latest  : 마지막으로 감지한 원본 버전 — prepare(latest) 가 끝나야 token 으로 교체
+    · 감시    : poll_sec 간격 stat 서명 비교 (표준 라이브러리만 사용 — 플랫폼 무관)
+    · refresh : 즉시 재검사 (배치 업로드 직후 등) — 준비가 끝날 때까지 호출 측이 기다림
+    감시 스레드는 시작하자마자 현재 버전도 prepare 로 예열 (첫 세션과 겹치면 같은 캐시를 함께 기다림)
+    """
+    def __init__(self, poll_sec=None, prepare=None):
+        self.poll_sec = float(os.environ.get(POLL_ENV, POLL_SEC)) if poll_sec is None else poll_sec
+        self.prepare  = prepare
+        self._sigs, self._hashes = {}, {}
+        self._lock  = threading.Lock()
+        self._stop  = threading.Event()
+        self.token  = self.latest = self._scan()
+        self._thread = threading.Thread(target=self._run, name=WATCH_THREAD, daemon=True)
+        self._thread.stop_event = self._stop   # stop_watchers 가 이전 인스턴스를 찾아 멈출 수 있도록
+        self._thread.start()
+
+    def _scan(self):
+        """서명이 바뀐 파일만 다시 해시해 토큰 계산 — 서명이 모두 같으면 현재 토큰"""
+        sigs = {}
+        for p in watched_files():
+            try:
+                sigs[p] = file_signature(p)
+            except OSError:   # 목록 조회와 stat 사이에 삭제
+                continue
+        if sigs == self._sigs and self._sigs:
+            return self.latest
+        hashes = {}
+        for p, sig in sigs.items():
+            hashes[p] = self._hashes[p] if self._sigs.get(p) == sig else content_hash([p])
+        self._sigs, self._hashes = sigs, hashes
+        if not sigs:
+            return SAMPLE_TOKEN
+        token = source_token(hashes)
+        note_sources(token, sigs)   # sync_store 가 원본을 다시 해시하지 않고 서명으로 토큰 확인
+        return token
+
+    def refresh(self):
+        """재검사 → 바뀌었으면 다음 버전을 준비한 뒤 토큰 교체 (준비 실패 시 이전 토큰 유지)"""
+        with self._lock:
+            latest = self._scan()
+            if latest == self.latest:
+                return self.token
+            self.latest = latest
+            log.info("데이터 변경 감지: %s → %s (준비 중)", self.token, latest)
+            try:
+                if self.prepare is not None:
+                    self.prepare(latest)
+            except Exception:
+                log.exception("데이터 버전 %s 준비 실패 — 이전 버전 유지", latest)
+                return self.token
+            # 참조 교체 한 번 — 세션은 재실행 시작 시 읽은 토큰으로 끝까지 조회
+            self.token = latest
+            log.info("데이터 버전 교체: %s", latest)
+            return self.token
+
+    def _run(self):
+        if self.prepare is not None and not self._stop.is_set():
+            try:
+                self.prepare(self.token)
+            except Exception:
+                log.exception("시작 예열 실패 — 요청 시 계산")
+        while not self._stop.wait(self.poll_sec):
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("원본 감시 실패 — 다음 주기에 재시도")
+
+    def stop(self):
+        self._stop.set()
+
+
+# ══════════════════════════════════════════════
+#  다음 버전 준비
+# ══════════════════════════════════════════════
+def prepare_version(version):
+    """
+    화면 첫 재실행이 쓰는 캐시를 미리 채움 — 저장소 동기화 · 큐브 · 콤보 수 · 내장 DB,
+    전 기간 팩트(공유 파일)와 필터 · 검색 · 접두어 색인, 최근 월 뷰 집계 (warm_views)
+    """
+    synced_store(version)
+    cube = load_cube(version)
+    combo_count(version)
+    months = cube.options["months"]
+    if load_db(version) is None and months:
+        load_star(version)
+        load_filter_index(version)
+        load_search_index(version)
+        load_prefix_index(version)
+    n = warm_views(cube, version)
+    log.info("데이터 버전 %s 준비 완료 (뷰 예열 %d개 조건) — 결과 메모 %s", version, n, result_cache().stats())
+
+def stop_watchers():
+    """실행 중인 감시 스레드를 모두 멈춤 — 모듈 재적재로 이전 인스턴스 참조를 잃어도 스레드 이름으로 찾음"""
+    for t in threading.enumerate():
+        if t.name == WATCH_THREAD and hasattr(t, "stop_event"):
+            t.stop_event.set()
+
+_SERVICE_LOCK = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def data_version_service():
+    """
+    프로세스당 감시 서비스 1개 — 캐시 비우기 · 코드 재적재로 다시 만들 때 이전 감시 스레드를 먼저 멈춤
+    (남은 스레드가 계속 감시하며 버전마다 prepare_version 을 중복 실행하지 않도록)
+    """
+    with _SERVICE_LOCK:
+        stop_watchers()
+        return DataVersion(prepare=prepare_version)
+
+def data_version():
+    """현재 데이터 버전 토큰 — 모든 캐시의 version 인자"""
+    return data_version_service().token